@@ -0,0 +1,181 @@
+"""Shared business-day calendar for ACH request dates, XML allocation dates and deadlines.
+
+Bank holidays follow the Federal Reserve schedule: a holiday falling on a
+Sunday is observed on Monday, one falling on a Saturday is not observed.
+Each year is compiled once (process-wide) into a business-day bitset plus
+next/previous business-day tables, so every lookup is an index into a list.
+
+Custodian cutoffs live here too, so request-date and deadline logic agree on
+when a custodian's business day ends.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from bluestar.agents.clock import SystemClock
+from bluestar.core.protocols import IClock
+
+CENTRAL = "America/Chicago"
+
+CUSTODIAN_CUTOFFS: dict[str, tuple[time, str]] = {
+    "MATRIX TRUST": (time(15, 30), CENTRAL),
+    "SCHWAB": (time(12, 0), CENTRAL),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class CustodianDeadline:
+    """A custodian's daily cutoff in its own time zone."""
+
+    custodian: str
+    cutoff: time
+    tz: ZoneInfo
+
+    def on(self, day: date) -> datetime:
+        return datetime.combine(day, self.cutoff, tzinfo=self.tz)
+
+
+def custodian_deadline(config: Mapping[str, Any]) -> CustodianDeadline | None:
+    """Resolve the custodian deadline from client config, or None if it has none.
+
+    Reads ``custodian``, ``custodianCutoff`` (``HH:MM``) and
+    ``custodianTimezone``; known custodians supply the defaults.
+    """
+    custodian = str(config.get("custodian") or "").strip()
+    default = CUSTODIAN_CUTOFFS.get(custodian.upper())
+    cutoff_text = str(config.get("custodianCutoff") or "").strip()
+    if cutoff_text:
+        hour, minute = cutoff_text.split(":")
+        cutoff = time(int(hour), int(minute))
+    elif default is not None:
+        cutoff = default[0]
+    else:
+        return None
+    tz = str(config.get("custodianTimezone") or (default[1] if default else CENTRAL))
+    return CustodianDeadline(custodian, cutoff, ZoneInfo(tz))
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """``n``-th ``weekday`` of the month; ``n = -1`` is the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def federal_reserve_holidays(year: int) -> list[date]:
+    """Observed Federal Reserve bank holidays for ``year``."""
+    fixed = [date(year, 1, 1), date(year, 7, 4), date(year, 11, 11), date(year, 12, 25)]
+    if year >= 2022:
+        fixed.append(date(year, 6, 19))
+    floating = [
+        _nth_weekday(year, 1, 0, 3),  # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),  # Washington's Birthday
+        _nth_weekday(year, 5, 0, -1),  # Memorial Day
+        _nth_weekday(year, 9, 0, 1),  # Labor Day
+        _nth_weekday(year, 10, 0, 2),  # Columbus Day
+        _nth_weekday(year, 11, 3, 4),  # Thanksgiving
+    ]
+    observed = [d + timedelta(days=1) if d.weekday() == 6 else d for d in fixed if d.weekday() != 5]
+    return sorted(observed + floating)
+
+
+@dataclass(frozen=True, slots=True)
+class _YearTable:
+    start: int  # ordinal of Jan 1
+    bits: int  # bit i set when day i of the year is a business day
+    next_on_or_after: list[int]  # ordinal; -1 when it falls in the next year
+    prev_on_or_before: list[int]  # ordinal; -1 when it falls in the previous year
+
+
+@lru_cache(maxsize=64)
+def _year_table(year: int, holidays: Callable[[int], Iterable[date]]) -> _YearTable:
+    start = date(year, 1, 1).toordinal()
+    days = date(year + 1, 1, 1).toordinal() - start
+    closed = {d.toordinal() - start for d in holidays(year) if d.year == year}
+    open_days = [(start + i) % 7 not in (6, 0) and i not in closed for i in range(days)]  # ordinal % 7: 0 = Sunday
+    bits = sum(1 << i for i, is_open in enumerate(open_days) if is_open)
+
+    nxt = [-1] * days
+    upcoming = -1
+    for i in range(days - 1, -1, -1):
+        if open_days[i]:
+            upcoming = start + i
+        nxt[i] = upcoming
+    prev = [-1] * days
+    latest = -1
+    for i in range(days):
+        if open_days[i]:
+            latest = start + i
+        prev[i] = latest
+    return _YearTable(start, bits, nxt, prev)
+
+
+class BusinessCalendar:
+    """O(1) business-day lookups over precomputed per-year tables."""
+
+    def __init__(
+        self,
+        clock: IClock | None = None,
+        holidays: Callable[[int], Iterable[date]] = federal_reserve_holidays,
+        tz: str = CENTRAL,
+    ) -> None:
+        self._clock = clock or SystemClock()
+        self._holidays = holidays
+        self._tz = ZoneInfo(tz)
+
+    def _table(self, year: int) -> _YearTable:
+        return _year_table(year, self._holidays)
+
+    def is_business_day(self, d: date) -> bool:
+        table = self._table(d.year)
+        return bool(table.bits >> (d.toordinal() - table.start) & 1)
+
+    def on_or_after(self, d: date) -> date:
+        """``d`` if it is a business day, else the next one."""
+        table = self._table(d.year)
+        found = table.next_on_or_after[d.toordinal() - table.start]
+        return date.fromordinal(found) if found >= 0 else self.on_or_after(date(d.year + 1, 1, 1))
+
+    def on_or_before(self, d: date) -> date:
+        """``d`` if it is a business day, else the previous one."""
+        table = self._table(d.year)
+        found = table.prev_on_or_before[d.toordinal() - table.start]
+        return date.fromordinal(found) if found >= 0 else self.on_or_before(date(d.year - 1, 12, 31))
+
+    def next_business_day(self, d: date) -> date:
+        """The first business day strictly after ``d``."""
+        return self.on_or_after(d + timedelta(days=1))
+
+    def previous_business_day(self, d: date) -> date:
+        """The last business day strictly before ``d``."""
+        return self.on_or_before(d - timedelta(days=1))
+
+    def now(self, tz: ZoneInfo | None = None) -> datetime:
+        return self._clock.now().astimezone(tz or self._tz)
+
+    def today(self) -> date:
+        """Today's date in the calendar's time zone."""
+        return self.now().date()
+
+    def request_date(self, deadline: CustodianDeadline | None = None) -> date:
+        """ACH request date: today, rolled to the next business day on
+        weekends/holidays or once the custodian's cutoff has passed."""
+        if deadline is None:
+            return self.on_or_after(self.today())
+        now = self.now(deadline.tz)
+        today = now.date()
+        if not self.is_business_day(today) or now >= deadline.on(today):
+            return self.next_business_day(today)
+        return today
+
+    def next_deadline(self, deadline: CustodianDeadline) -> datetime:
+        """The custodian cutoff that work arriving now is due against."""
+        return deadline.on(self.request_date(deadline))
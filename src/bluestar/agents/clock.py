@@ -0,0 +1,12 @@
+"""Production ``IClock``."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime
+
+
+class SystemClock:
+    """Timezone-aware UTC wall clock."""
+
+    def now(self) -> datetime:
+        return datetime.now(UTC)
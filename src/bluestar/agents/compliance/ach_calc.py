@@ -2,13 +2,122 @@
 
 NACHA COMPLIANCE: Bank data from Token Service is held in memory ONLY.
 NEVER cached, logged, or written to any persistent storage.
+
+Records are collapsed by SEFA IDs (plus achpayroll, or lastpd when
+``collapseByACHPayroll`` is "False") with the shared aggregation operator;
+groups whose 12 contribution sources are all zero are dropped.
 """
 
 from __future__ import annotations
 
-# TODO: Implement ACH calculation
-# Collapse by SEFA IDs, drop zero-total records
-# Calculate: TotalAmt, ERAmt, EEAmt, LoanPymtAmt, RothAmt, AfterTaxAmt
-# Resolve bank data via on-prem Token Service — IN MEMORY ONLY
-# Format bankaba as 9-digit zero-padded
-# Output: ACHFile{date}-{planId}_{freq}.txt/.csv
+from collections.abc import Callable, Mapping
+
+from pydantic import BaseModel, Field
+
+from bluestar.core.protocols import ITokenService
+from bluestar.models.aggregate import AggregateSpec, aggregate
+from bluestar.models.outputs import ACHRecord
+from bluestar.models.payroll_batch import CONTRIBUTION_FIELDS, PayrollBatch, from_cents
+
+SEFA_FIELDS: tuple[str, ...] = ("sefaid1", "sefaid2", "sefaid3")
+
+ER_AMT_FIELDS: tuple[str, ...] = (
+    "match", "shmatch", "shne", "pshare", "shmatchqaca", "shneqaca", "prevwageer", "prevwageqnec",
+)
+
+ACH_AMOUNTS: dict[str, tuple[str, ...]] = {
+    "total_amt": CONTRIBUTION_FIELDS,
+    "er_amt": ER_AMT_FIELDS,
+    "ee_amt": ("deferral",),
+    "loan_pymt_amt": ("loan",),
+    "roth_amt": ("rothdeferral",),
+    "after_tax_amt": ("aftertax",),
+}
+
+_SIGNED_AMOUNTS: tuple[str, ...] = ("er_amt", "ee_amt", "roth_amt", "loan_pymt_amt", "after_tax_amt")
+
+
+def ach_spec(collapse_by_ach_payroll: bool = True) -> AggregateSpec:
+    """Collapse by SEFA IDs and achpayroll (or lastpd)."""
+    period = "achpayroll" if collapse_by_ach_payroll else "lastpd"
+    return AggregateSpec(
+        group_by=(*SEFA_FIELDS, period),
+        first=("planid", "achpayroll"),
+        outputs=ACH_AMOUNTS,
+        drop_if_zero=CONTRIBUTION_FIELDS,
+    )
+
+
+class ACHCalcResult(BaseModel):
+    """ACH records and the SEFA tuples the Token Service could not resolve."""
+
+    records: list[ACHRecord] = Field(default_factory=list)
+    missing_sefa: list[tuple[str, str, str]] = Field(default_factory=list)
+
+
+class ACHCalcService:
+    """Build ACH records from the batch and pair them with bank data in memory."""
+
+    def __init__(self, token_service: ITokenService) -> None:
+        self._tokens = token_service
+
+    @staticmethod
+    def calculate(
+        batch: PayrollBatch,
+        collapse_by_ach_payroll: bool = True,
+        trust_description_prefix: str = "",
+        request_date: str = "",
+    ) -> list[ACHRecord]:
+        """Single-scan SEFA collapse and amount calculation (no bank data)."""
+        groups = aggregate(batch, ach_spec(collapse_by_ach_payroll))
+        cols = groups.columns
+        records = []
+        for i in range(len(groups)):
+            amounts = {name: cols[name][i] for name in ACH_AMOUNTS}
+            payroll = cols["achpayroll"][i]
+            records.append(
+                ACHRecord(
+                    plan_id=cols["planid"][i],
+                    sefa_id1=cols["sefaid1"][i],
+                    sefa_id2=cols["sefaid2"][i],
+                    sefa_id3=cols["sefaid3"][i],
+                    request_date=request_date,
+                    trust_description=(
+                        f"{trust_description_prefix} - Payroll {payroll}" if trust_description_prefix
+                        else f"Payroll {payroll}"
+                    ),
+                    negative_source_ind=int(any(amounts[a] < 0 for a in _SIGNED_AMOUNTS)),
+                    **{name: from_cents(v) for name, v in amounts.items()},
+                )
+            )
+        return records
+
+    def generate(
+        self,
+        records: list[ACHRecord],
+        emit: Callable[[ACHRecord, Mapping[str, str]], None],
+        deadline: float | None = None,
+    ) -> ACHCalcResult:
+        """Resolve bank data for all records in one batch and hand each pair to ``emit``.
+
+        Bank data lives only inside the vault for the duration of this call;
+        ``bankaba`` is zero-padded to 9 digits. Records whose SEFA tuple could
+        not be resolved are returned as ``missing_sefa`` and not emitted.
+        """
+        keys = [(r.sefa_id1, r.sefa_id2, r.sefa_id3) for r in records]
+        vault = self._tokens.resolve_many(keys, deadline=deadline)
+        missing: list[tuple[str, str, str]] = []
+        try:
+            for record, key in zip(records, keys):
+                if key not in vault:
+                    missing.append(key)
+                    continue
+                bank = dict(vault[key])
+                bank["bankaba"] = str(bank.get("bankaba", "")).strip().zfill(9)
+                emit(record, bank)
+                del bank
+        finally:
+            close = getattr(vault, "close", None)
+            if close is not None:
+                close()
+        return ACHCalcResult(records=records, missing_sefa=list(dict.fromkeys(missing)))
@@ -2,7 +2,33 @@
 
 from __future__ import annotations
 
-# TODO: Implement ACH preparation
-# Calculate request date (weekend/after-hours adjustment)
-# SEFA validation, plan name lookup
+from datetime import date, time
+
+from bluestar.agents.business_calendar import BusinessCalendar
+
 # NOT cached in Redis — depends on current time
+
+ACH_HOURS_END = time(18, 0)
+
+
+class ACHPrepService:
+    """ACH request preparation."""
+
+    def __init__(self, calendar: BusinessCalendar | None = None) -> None:
+        self._calendar = calendar or BusinessCalendar()
+
+    def request_date(self, payroll_date: date) -> date:
+        """ACH request date for a payroll.
+
+        Starts at the payroll date and moves forward over weekends and bank
+        holidays, then is floored at the first business day on or after today.
+        When processing after 6 PM, a request that lands on today, or on a
+        payroll date that was itself a business day, moves to the next
+        business day.
+        """
+        now = self._calendar.now()
+        today = now.date()
+        request = max(self._calendar.on_or_after(payroll_date), self._calendar.on_or_after(today))
+        if now.time() >= ACH_HOURS_END and request in (payroll_date, today):
+            request = self._calendar.next_business_day(request)
+        return request
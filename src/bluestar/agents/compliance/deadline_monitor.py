@@ -1,8 +1,193 @@
-"""DeadlineMonitorService — continuous monitoring during processing window."""
+"""DeadlineMonitorService — custodian deadline monitoring during the processing window.
+
+Each pending batch is kept in a min-heap keyed on its next escalation: first
+DEADLINE_AT_RISK at the custodian cutoff minus 30 minutes, then
+DEADLINE_MISSED at the cutoff itself. A batch stays tracked until it finishes
+or misses. The monitor sleeps until the earliest escalation time (at most
+``tick`` of real time, so a clock that jumps is noticed) instead of polling,
+and is woken whenever a batch is tracked, updated or finishes so the next
+wake-up is recomputed incrementally. Escalation callbacks run without the
+monitor's lock held.
+
+Custodian cutoff and time zone come from client config (``custodian``,
+``custodianCutoff`` as ``HH:MM``, ``custodianTimezone``); the known custodians
+default to Matrix Trust 3:30 PM Central and Schwab 12:00 PM Central. A batch
+is due against the cutoff of the current request date from the shared
+business calendar, so weekends and bank holidays roll to the next cutoff.
+Client deadlines are re-read from config after ``DEADLINE_CACHE_TTL``.
+"""
 
 from __future__ import annotations
 
-# TODO: Implement custodian deadline monitoring
-# Matrix Trust: 3:30 PM Central, Schwab: 12:00 PM Central
-# Escalate at 30 min before deadline if pending batches exist
-# Poll every 60 seconds during processing window
+import heapq
+import itertools
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from bluestar.agents.business_calendar import BusinessCalendar, CustodianDeadline, custodian_deadline
+from bluestar.core.exceptions import DeadlineAtRiskError, DeadlineMissedError
+from bluestar.core.protocols import IClock, IRulesStore
+from bluestar.models.pipeline import BatchState, BatchStatus, EscalationPayload
+
+ESCALATION_LEAD = timedelta(minutes=30)
+DEADLINE_CACHE_TTL = timedelta(hours=1)
+DEFAULT_TICK = 60.0  # seconds of real time between clock re-reads while idle
+
+_PENDING = (BatchStatus.RECEIVED, BatchStatus.PROCESSING)
+
+
+@dataclass(slots=True)
+class _Tracked:
+    batch: BatchState
+    deadline: CustodianDeadline
+    due_at: datetime
+    escalate_at: datetime
+    seq: int
+    at_risk_sent: bool = False
+
+
+class DeadlineMonitorService:
+    """Heap-scheduled escalation of pending batches ahead of custodian cutoffs."""
+
+    def __init__(
+        self,
+        rules: IRulesStore,
+        clock: IClock,
+        escalate: Callable[[EscalationPayload], None],
+        lead: timedelta = ESCALATION_LEAD,
+        calendar: BusinessCalendar | None = None,
+        tick: float = DEFAULT_TICK,
+    ) -> None:
+        self._rules = rules
+        self._clock = clock
+        self._calendar = calendar or BusinessCalendar(clock)
+        self._escalate = escalate
+        self._lead = lead
+        self._tick = tick
+        self._deadlines: dict[tuple[str, str], tuple[datetime, CustodianDeadline | None]] = {}
+        self._tracked: dict[str, _Tracked] = {}
+        self._heap: list[tuple[datetime, int, str]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition(threading.RLock())
+        self._stopped = False
+
+    def deadline_for(self, plan_id: str, pay_freq: str) -> CustodianDeadline | None:
+        """Custodian deadline for a plan/frequency, re-read from client config after the cache TTL."""
+        key = (plan_id, pay_freq)
+        now = self._clock.now()
+        cached = self._deadlines.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        deadline = custodian_deadline(self._rules.get_client_config(plan_id, pay_freq))
+        self._deadlines[key] = (now + DEADLINE_CACHE_TTL, deadline)
+        return deadline
+
+    def track(self, batch: BatchState) -> datetime | None:
+        """Schedule (or reschedule) a pending batch; returns its escalation time.
+
+        Batches that are no longer pending, or whose plan has no custodian
+        deadline, are untracked and None is returned.
+        """
+        with self._cond:
+            deadline = self.deadline_for(batch.plan_id, batch.pay_freq) if batch.status in _PENDING else None
+            if deadline is None:
+                self.untrack(batch.batch_id)
+                return None
+            current = self._tracked.get(batch.batch_id)
+            if current is not None and current.deadline == deadline:
+                current.batch = batch
+                return current.escalate_at
+            due_at = self._calendar.next_deadline(deadline)
+            entry = _Tracked(batch, deadline, due_at, due_at - self._lead, next(self._seq))
+            self._tracked[batch.batch_id] = entry
+            heapq.heappush(self._heap, (entry.escalate_at, entry.seq, batch.batch_id))
+            self._cond.notify_all()
+            return entry.escalate_at
+
+    def untrack(self, batch_id: str) -> None:
+        """Stop monitoring a batch; its heap entry is discarded lazily."""
+        with self._cond:
+            if self._tracked.pop(batch_id, None) is not None:
+                self._cond.notify_all()
+
+    def pending(self) -> list[str]:
+        with self._cond:
+            return list(self._tracked)
+
+    def wake(self) -> None:
+        """Re-read the clock now (e.g. after a fake clock was advanced)."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def next_wakeup(self) -> datetime | None:
+        """Earliest escalation time among tracked batches."""
+        with self._cond:
+            while self._heap:
+                at, seq, batch_id = self._heap[0]
+                entry = self._tracked.get(batch_id)
+                if entry is not None and entry.seq == seq:
+                    return at
+                heapq.heappop(self._heap)
+            return None
+
+    def poll(self) -> list[EscalationPayload]:
+        """Send every escalation whose time has been reached.
+
+        A batch gets DEADLINE_AT_RISK, stays tracked, and gets DEADLINE_MISSED
+        once the cutoff passes (both at once if the monitor wakes up late).
+        """
+        fired: list[EscalationPayload] = []
+        with self._cond:
+            now = self._clock.now()
+            while (at := self.next_wakeup()) is not None and at <= now:
+                _, _, batch_id = heapq.heappop(self._heap)
+                entry = self._tracked[batch_id]
+                if not entry.at_risk_sent:
+                    entry.at_risk_sent = True
+                    fired.append(self._payload(entry, now, missed=False))
+                    if entry.due_at > now:
+                        entry.escalate_at, entry.seq = entry.due_at, next(self._seq)
+                        heapq.heappush(self._heap, (entry.escalate_at, entry.seq, batch_id))
+                        continue
+                del self._tracked[batch_id]
+                fired.append(self._payload(entry, now, missed=True))
+        for payload in fired:
+            self._escalate(payload)
+        return fired
+
+    def run(self) -> None:
+        """Sleep until the next escalation time, firing on wake; returns after ``stop``."""
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+            self.poll()
+            with self._cond:
+                if self._stopped:
+                    return
+                at = self.next_wakeup()
+                timeout = self._tick if at is None else (at - self._clock.now()).total_seconds()
+                if timeout > 0:
+                    self._cond.wait(min(timeout, self._tick))
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    @staticmethod
+    def _payload(entry: _Tracked, now: datetime, missed: bool) -> EscalationPayload:
+        minutes = int((entry.due_at - now).total_seconds() // 60)
+        batch = entry.batch
+        custodian = entry.deadline.custodian
+        reason = DeadlineMissedError(custodian, -minutes) if missed else DeadlineAtRiskError(custodian, minutes)
+        return EscalationPayload(
+            batch_id=batch.batch_id,
+            plan_id=batch.plan_id,
+            escalation_reason=str(reason),
+            record_count=batch.record_count,
+            custodian_deadline=entry.due_at.isoformat(),
+            time_remaining=f"{minutes} min",
+        )
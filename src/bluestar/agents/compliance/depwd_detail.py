@@ -1,9 +1,151 @@
-"""DepWDDetailService — step 2400 (subroutine-DepWDDetailPopulate.do)."""
+"""DepWDDetailService — step 2400 (subroutine-DepWDDetailPopulate.do).
+
+Amounts are aggregated by PlanIdRelius/EffectiveDate/Description with the
+shared aggregation operator. Existing DepWDDetailIDs are fetched with a
+set-based query on exactly the batch's (PlanNumId, EffectiveDate,
+Description) keys, and all saves go to ``Stata_Save_DepWDDetail`` in a
+single bulk, all-or-nothing call. If that call fails the error is logged and
+every detail goes to DetailNeedsManuallyUpdated; the batch continues. The
+DepWD rules differ from ACH: Roth includes after-tax, SH match combines both
+SH match types, PShare includes prevailing wage ER and SHNE combines both
+SHNE types.
+"""
 
 from __future__ import annotations
 
-# TODO: Implement DepWDDetail population
-# Aggregate by PlanIdRelius/EffectiveDate/Description
-# Calculate DepWD amounts (note: aggregation rules differ from ACH)
-# Look up existing DepWDDetailID via ODBC
-# Execute stored procedure: Stata_Save_DepWDDetail
+import logging
+from datetime import date
+
+from pydantic import BaseModel, Field
+
+from bluestar.core.exceptions import SQLServerError
+from bluestar.core.protocols import ISQLClient
+from bluestar.models.aggregate import AggregateSpec, aggregate
+from bluestar.models.outputs import DepWDDetail
+from bluestar.models.payroll_batch import CONTRIBUTION_FIELDS, PayrollBatch, from_cents
+
+DEPWD_GROUP_KEY: tuple[str, ...] = ("planidrelius", "effectivedate", "description")
+
+DEPWD_AMOUNTS: dict[str, tuple[str, ...]] = {
+    "total_amt": CONTRIBUTION_FIELDS,
+    "deferral_amt": ("deferral",),
+    "roth_amt": ("rothdeferral", "aftertax"),
+    "match_amt": ("match",),
+    "shmatch_amt": ("shmatch", "shmatchqaca"),
+    "pshare_amt": ("pshare", "prevwageer", "prevwageqnec"),
+    "shne_amt": ("shne", "shneqaca"),
+    "loan_amt": ("loan",),
+}
+
+DEPWD_SPEC = AggregateSpec(group_by=DEPWD_GROUP_KEY, outputs=DEPWD_AMOUNTS)
+
+SAVE_DEPWD_SP = "Stata_Save_DepWDDetail"
+
+# Keys per lookup query: three parameters each, well under SQL Server's 2100.
+LOOKUP_CHUNK = 500
+
+logger = logging.getLogger(__name__)
+
+
+def depwd_lookup_sql(key_count: int) -> str:
+    """Set-based DepWDDetail lookup for ``key_count`` (PlanNumId, EffectiveDate, Description) keys."""
+    match = " OR ".join(["(PlanNumId = ? AND EffectiveDate = ? AND Description = ?)"] * key_count)
+    return (
+        "SELECT DepWDDetailID, PlanNumId, EffectiveDate, Description FROM DepWDDetail "
+        f"WHERE {match}"
+    )
+
+
+def _key(detail: DepWDDetail) -> tuple[str, str, str]:
+    return detail.plan_id_relius, detail.effective_date[:10], detail.description
+
+
+class DepWDResult(BaseModel):
+    """Details updated in PlanConnect and those needing a manual update."""
+
+    updated: list[DepWDDetail] = Field(default_factory=list)
+    needs_manual_update: list[DepWDDetail] = Field(default_factory=list)
+    error: str = ""  # set when the bulk save failed and nothing was updated
+
+
+def sp_params(detail: DepWDDetail, request_date: date) -> dict[str, object]:
+    """``Stata_Save_DepWDDetail`` parameters for one detail row."""
+    return {
+        "DepWDDetailID": detail.dep_wd_detail_id,
+        "RequestDate": request_date.isoformat(),
+        "TotalAmt": detail.total_amt,
+        "DeferralAmt": detail.deferral_amt,
+        "RothAmt": detail.roth_amt,
+        "MatchAmt": detail.match_amt,
+        "SHMatchAmt": detail.shmatch_amt,
+        "PShareAmt": detail.pshare_amt,
+        "SHNEAmt": detail.shne_amt,
+        "LoanAmt": detail.loan_amt,
+        "CompleteOrCancelDesc": "",
+    }
+
+
+class DepWDDetailService:
+    """Aggregate DepWD amounts and save them to PlanConnect."""
+
+    def __init__(self, sql: ISQLClient) -> None:
+        self._sql = sql
+
+    @staticmethod
+    def aggregate(batch: PayrollBatch) -> list[DepWDDetail]:
+        """Single-scan DepWD aggregation."""
+        groups = aggregate(batch, DEPWD_SPEC)
+        cols = groups.columns
+        return [
+            DepWDDetail(
+                plan_id_relius=str(cols["planidrelius"][i]),
+                effective_date=str(cols["effectivedate"][i]),
+                description=str(cols["description"][i]),
+                **{name: from_cents(cols[name][i]) for name in DEPWD_AMOUNTS},
+            )
+            for i in range(len(groups))
+        ]
+
+    def lookup_ids(self, details: list[DepWDDetail]) -> dict[tuple[str, str, str], list[int]]:
+        """Existing DepWDDetailIDs for the batch's detail keys, ``LOOKUP_CHUNK`` keys per query."""
+        keys = list(dict.fromkeys(_key(d) for d in details))
+        ids: dict[tuple[str, str, str], list[int]] = {}
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[start:start + LOOKUP_CHUNK]
+            params = tuple(v for key in chunk for v in key)
+            for row in self._sql.query(depwd_lookup_sql(len(chunk)), params):
+                eff = row["EffectiveDate"]
+                key = (
+                    str(row["PlanNumId"]).strip(),
+                    eff.isoformat()[:10] if hasattr(eff, "isoformat") else str(eff).strip()[:10],
+                    str(row["Description"]).strip(),
+                )
+                ids.setdefault(key, []).append(int(row["DepWDDetailID"]))
+        return ids
+
+    def execute(self, batch: PayrollBatch, request_date: date) -> DepWDResult:
+        """Save every matched detail in one transaction.
+
+        Details with no DepWDDetailID, or more than one, need a manual update.
+        The save is all-or-nothing: if the bulk call fails, the error is
+        logged and recorded on the result and every detail needs a manual
+        update.
+        """
+        result = DepWDResult()
+        details = self.aggregate(batch)
+        ids = self.lookup_ids(details)
+        for detail in details:
+            found = ids.get(_key(detail), [])
+            if len(found) != 1:
+                result.needs_manual_update.append(detail)
+                continue
+            detail.dep_wd_detail_id = found[0]
+            result.updated.append(detail)
+        try:
+            self._sql.execute_sp_many(SAVE_DEPWD_SP, [sp_params(d, request_date) for d in result.updated])
+        except SQLServerError as exc:
+            logger.error("DepWDDetail save failed; %d details need a manual update: %s", len(details), exc)
+            result.needs_manual_update = details
+            result.updated = []
+            result.error = str(exc)
+        return result
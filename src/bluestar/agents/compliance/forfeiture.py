@@ -1,9 +1,106 @@
-"""ForfeitureService — step 2200 (subroutine-Forfeitures.do)."""
+"""ForfeitureService — step 2200 (subroutine-Forfeitures.do).
+
+ERTotal = match + shmatch + shmatchqaca + shne + shneqaca + pshare; prevwageer
+and prevwageqnec are EXCLUDED (Davis-Bacon Act). ``UseForfs = -MIN(ERTotal,
+ForfAvail)`` per plan, with ForfAvail for every plan in the batch fetched from
+``PayrollForfs`` in one query. Only plans with UseForfs < 0 are reported. For
+multi-identifier plans the plan's UseForfs is allocated across identifiers in
+proportion to their ERTotal using largest-remainder cent rounding, so the
+identifier amounts always sum to the plan amount exactly.
+"""
 
 from __future__ import annotations
 
-# TODO: Implement forfeiture application
-# ERTotal = match + shmatch + shmatchqaca + shne + shneqaca + pshare
-# EXCLUDED: prevwageer, prevwageqnec (Davis-Bacon Act)
-# UseForfs = -MIN(ERTotal, ForfAvail from PayrollForfs ODBC)
-# Multi-identifier proportional allocation
+from collections.abc import Iterable
+
+from bluestar.core.protocols import ISQLClient
+from bluestar.models.aggregate import AggregateSpec, aggregate
+from bluestar.models.outputs import ForfeitureResult
+from bluestar.models.payroll_batch import ER_FIELDS, PayrollBatch, from_cents, to_cents
+
+FORFEITURE_SPEC = AggregateSpec(group_by=("planid", "identifier"), outputs={"er_total": ER_FIELDS})
+
+
+def payroll_forfs_sql(plan_count: int) -> str:
+    """Set-based ForfAvail lookup for ``plan_count`` plans."""
+    marks = ", ".join("?" * plan_count)
+    return f"SELECT planid, forfavail FROM PayrollForfs WHERE planid IN ({marks})"
+
+
+def allocate_largest_remainder(total: int, weights: list[int]) -> list[int]:
+    """Split ``total`` cents in proportion to ``weights`` so the parts sum to ``total``.
+
+    Each part gets the floor of its exact share; the leftover cents go to the
+    largest fractional remainders (earlier entries win ties).
+    """
+    weight_sum = sum(weights)
+    if weight_sum <= 0 or total == 0:
+        return [0] * len(weights)
+    quotas = [divmod(total * w, weight_sum) for w in weights]
+    parts = [q for q, _ in quotas]
+    leftover = total - sum(parts)
+    order = sorted(range(len(weights)), key=lambda i: -quotas[i][1])
+    for i in order[:leftover]:
+        parts[i] += 1
+    return parts
+
+
+class ForfeitureService:
+    """Batch forfeiture application and per-identifier allocation."""
+
+    def __init__(self, sql: ISQLClient) -> None:
+        self._sql = sql
+
+    def load_available(self, plan_ids: Iterable[str]) -> dict[str, int]:
+        """ForfAvail in cents for every plan, one query."""
+        plans = list(dict.fromkeys(plan_ids))
+        available = dict.fromkeys(plans, 0)
+        if not plans:
+            return available
+        for row in self._sql.query(payroll_forfs_sql(len(plans)), tuple(plans)):
+            plan = str(row["planid"]).strip()
+            if plan in available:
+                available[plan] += to_cents(row.get("forfavail") or 0)
+        return available
+
+    def execute(self, batch: PayrollBatch) -> list[ForfeitureResult]:
+        """Results for plans that use forfeitures, each followed by its identifier breakdown when it has several."""
+        groups = aggregate(batch, FORFEITURE_SPEC)
+        planids = groups.column("planid")
+        identifiers = groups.column("identifier")
+        er = groups.column("er_total")
+        available = self.load_available(planids)
+
+        by_plan: dict[str, list[int]] = {}
+        for i, plan in enumerate(planids):
+            by_plan.setdefault(plan, []).append(i)
+
+        results: list[ForfeitureResult] = []
+        for plan, rows in by_plan.items():
+            er_total = sum(er[i] for i in rows)
+            avail = available[plan]
+            use = max(min(er_total, avail), 0)
+            if use == 0:
+                continue
+            results.append(
+                ForfeitureResult(
+                    plan_id=plan,
+                    er_total=from_cents(er_total),
+                    forfeiture_available=from_cents(avail),
+                    forfeiture_applied=from_cents(-use),
+                )
+            )
+            if len(rows) < 2:
+                continue
+            parts = allocate_largest_remainder(use, [max(er[i], 0) for i in rows])
+            results.extend(
+                ForfeitureResult(
+                    plan_id=plan,
+                    identifier=identifiers[i],
+                    er_total=from_cents(er[i]),
+                    forfeiture_available=from_cents(avail),
+                    forfeiture_applied=from_cents(-part),
+                )
+                for i, part in zip(rows, parts)
+            )
+        return results
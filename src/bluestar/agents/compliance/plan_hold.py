@@ -1,8 +1,205 @@
-"""PlanHoldService — step 2000 (subroutine-planholdPC.do)."""
+"""PlanHoldService — step 2000 (subroutine-planholdPC.do).
+
+Each plan's hold rules from ``get_plan_holds`` are compiled once per load into
+``HoldWindows``: per clientid, the holds sorted by the start of the item's
+own validity period (startDate..endDate, open when missing). Within that
+period a hold applies when either of its conditions does — holdAfter
+(``holdAsOfDate <= payrollDate``) or holdUntil (``maxStartDate >
+payrollDate``); an item with neither date always applies. Compiled windows
+are kept for the same 15 minutes as the ``hold:{planId}`` cache. Evaluation
+is then one window lookup per distinct (planid, clientid) group, broadcast to
+every record in the group.
+
+A hold is "True-Revoked" when its reason is "Revoked", "TrueEligRun" for
+holdReasonCd AC/NC, and "True" otherwise (code "O" notes "Other-{addlInfo}");
+the highest of those wins when several holds apply. The EligRun override
+then releases an EligRun hold ("False") when the planid has no contributions
+in the batch (``planidtotal == 0``) and turns it into "True" when it has.
+"""
 
 from __future__ import annotations
 
-# TODO: Implement plan hold evaluation
-# Query bluestar-plan-hold-rules (PK=PLAN#{planId}), 15-min Redis TTL
-# New client auto-detection, hold conditions (holdUntil, holdAfter, EligRun, Revoked)
-# EligRun zero-total override, multiple hold handling
+from bisect import bisect_right
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+from bluestar.agents.clock import SystemClock
+from bluestar.core.protocols import IClock, IRulesStore
+from bluestar.models.payroll_batch import CONTRIBUTION_FIELDS, PayrollBatch
+from bluestar.models.rules import HoldRule
+from bluestar.models.util import as_date
+
+HOLD_CACHE_TTL = timedelta(minutes=15)
+
+NOT_HELD = "False"
+HELD = "True"
+HELD_ELIGRUN = "TrueEligRun"
+HELD_REVOKED = "True-Revoked"
+
+MULTIPLE_CLIENTIDS_ON_HOLD = "Research-Multiple Clientids On Hold"
+
+_PRECEDENCE = {HELD_REVOKED: 3, HELD: 2, HELD_ELIGRUN: 1}
+ELIGRUN_REASON_CODES = frozenset({"AC", "NC"})
+REVOKED_REASON = "revoked"
+OTHER_REASON_CODE = "O"
+
+# DynamoDB attribute -> HoldRule field
+_HOLD_KEYS = {
+    "planId": "plan_id",
+    "clientId": "client_id",
+    "holdReasonCd": "hold_reason_cd",
+    "holdReason": "hold_reason",
+    "holdAsOfDate": "hold_as_of_date",
+    "maxStartDate": "max_start_date",
+    "startDate": "start_date",
+    "endDate": "end_date",
+    "addlInfo": "addl_info",
+}
+
+
+def hold_rule(item: Mapping[str, Any]) -> HoldRule:
+    """Build a ``HoldRule`` from a DynamoDB item (camelCase or snake_case keys)."""
+    data = {f: item.get(k, item.get(f)) for k, f in _HOLD_KEYS.items()}
+    return HoldRule.model_validate({k: str(v) for k, v in data.items() if v is not None})
+
+
+def hold_status(rule: HoldRule) -> str:
+    if rule.hold_reason.strip().lower() == REVOKED_REASON:
+        return HELD_REVOKED
+    if rule.hold_reason_cd.strip().upper() in ELIGRUN_REASON_CODES:
+        return HELD_ELIGRUN
+    return HELD
+
+
+def hold_note(rule: HoldRule) -> str:
+    if rule.hold_reason_cd.strip().upper() == OTHER_REASON_CODE:
+        return f"Other-{rule.addl_info.strip()}"
+    return "; ".join(s for s in (rule.hold_reason.strip(), rule.addl_info.strip()) if s)
+
+
+@dataclass(frozen=True, slots=True)
+class HoldWindow:
+    """One hold item: its validity period and its holdAfter/holdUntil conditions."""
+
+    start: date
+    end: date
+    hold_after: date | None
+    hold_until: date | None
+    status: str
+    note: str
+
+    def applies(self, on: date) -> bool:
+        if not self.start <= on <= self.end:
+            return False
+        if self.hold_after is None and self.hold_until is None:
+            return True
+        return (self.hold_after is not None and self.hold_after <= on) or (
+            self.hold_until is not None and self.hold_until > on
+        )
+
+
+@dataclass(slots=True)
+class HoldWindows:
+    """One plan's holds as date windows per clientid, sorted by start."""
+
+    starts: dict[str, list[date]] = field(default_factory=dict)
+    windows: dict[str, list[HoldWindow]] = field(default_factory=dict)
+
+    @classmethod
+    def compile(cls, rules: Iterable[HoldRule]) -> HoldWindows:
+        by_client: dict[str, list[HoldWindow]] = {}
+        for rule in rules:
+            window = HoldWindow(
+                start=as_date(rule.start_date) or date.min,
+                end=as_date(rule.end_date) or date.max,
+                hold_after=as_date(rule.hold_as_of_date),
+                hold_until=as_date(rule.max_start_date),
+                status=hold_status(rule),
+                note=hold_note(rule),
+            )
+            by_client.setdefault(rule.client_id.strip(), []).append(window)
+        compiled = cls()
+        for client, windows in by_client.items():
+            windows.sort(key=lambda w: w.start)
+            compiled.starts[client] = [w.start for w in windows]
+            compiled.windows[client] = windows
+        return compiled
+
+    def lookup(self, client_id: str, on: date) -> tuple[str, str]:
+        """``(planhold, planholdnote)`` for a client on a payroll date."""
+        starts = self.starts.get(client_id)
+        if not starts:
+            return NOT_HELD, ""
+        active = [w for w in self.windows[client_id][: bisect_right(starts, on)] if w.applies(on)]
+        if not active:
+            return NOT_HELD, ""
+        status = max((w.status for w in active), key=_PRECEDENCE.__getitem__)
+        return status, "; ".join(dict.fromkeys(w.note for w in active if w.note))
+
+
+class PlanHoldResult(BaseModel):
+    """Hold evaluation summary for a batch."""
+
+    held_records: int = 0
+    held_clients: list[tuple[str, str]] = Field(default_factory=list)
+    escalations: dict[str, str] = Field(default_factory=dict)  # plan_id -> reason
+
+
+class PlanHoldService:
+    """Evaluate plan holds per (planid, clientid) group."""
+
+    def __init__(self, rules: IRulesStore, clock: IClock | None = None, ttl: timedelta = HOLD_CACHE_TTL) -> None:
+        self._rules = rules
+        self._clock = clock or SystemClock()
+        self._ttl = ttl
+        self._compiled: dict[str, tuple[datetime, HoldWindows]] = {}
+
+    def windows(self, plan_id: str) -> HoldWindows:
+        """Compiled hold windows for a plan, reloaded after the cache TTL."""
+        now = self._clock.now()
+        cached = self._compiled.get(plan_id)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        compiled = HoldWindows.compile(hold_rule(item) for item in self._rules.get_plan_holds(plan_id))
+        self._compiled[plan_id] = (now + self._ttl, compiled)
+        return compiled
+
+    def execute(self, batch: PayrollBatch, payroll_date: date) -> PlanHoldResult:
+        """Write ``planhold``/``planholdnote`` for every record."""
+        groups: dict[tuple[str, str], list[int]] = {}
+        for i, key in enumerate(zip(batch.column("planid"), batch.column("clientid"))):
+            groups.setdefault(key, []).append(i)
+        amounts = [batch.column(f) for f in CONTRIBUTION_FIELDS]
+        planidtotal: dict[str, int] = {}
+        for i, plan in enumerate(batch.column("planid")):
+            planidtotal[plan] = planidtotal.get(plan, 0) + sum(col[i] for col in amounts)
+
+        planhold = [NOT_HELD] * len(batch)
+        notes = [""] * len(batch)
+        result = PlanHoldResult()
+        for (plan, client), rows in groups.items():
+            status, note = self.windows(plan).lookup(client, payroll_date)
+            if status == HELD_ELIGRUN:
+                if planidtotal[plan] == 0:
+                    status, note = NOT_HELD, ""
+                else:
+                    status = HELD
+            if status == NOT_HELD:
+                continue
+            for i in rows:
+                planhold[i] = status
+                notes[i] = note
+            result.held_records += len(rows)
+            result.held_clients.append((plan, client))
+
+        held_plans = [plan for plan, _ in result.held_clients]
+        for plan in dict.fromkeys(held_plans):
+            if held_plans.count(plan) > 1:
+                result.escalations[plan] = MULTIPLE_CLIENTIDS_ON_HOLD
+        batch.columns["planhold"] = planhold
+        batch.columns["planholdnote"] = notes
+        return result
@@ -0,0 +1,248 @@
+"""Admission control for resources shared by every batch in flight.
+
+Steps from many batches compete for a few shared resources: the SQL Server
+connection pool, the on-prem Token Service, the in-process SLMs and the
+Bedrock quota. Each resource has a ``ResourceGate`` that bounds concurrent
+holders (a semaphore) and, optionally, the admission rate (a token bucket).
+Waiters are admitted in priority order — lower first, FIFO on ties — so
+the batch nearest its custodian deadline gets the next free slot.
+
+A step's resources come from ``parameters["resources"]`` when set, else from
+``STEP_RESOURCES``; a step that needs a model (``parameters["requiresModel"]``)
+also takes its agent's model resource.
+
+The per-agent step concurrency gates live here too, so an agent's limit
+bounds its steps across every batch sharing the admission, not per batch.
+Agent-slot priorities are ``(batch priority, step rank)`` tuples.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections.abc import AsyncIterator, Callable, Iterable, Mapping
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any
+
+from bluestar.core.config import SQLServerConfig
+from bluestar.models.pipeline import PipelineStep
+
+SQL = "sql"
+TOKEN_SERVICE = "token_service"
+SLM = "slm"
+BEDROCK = "bedrock"
+
+STEP_RESOURCES: dict[str, tuple[str, ...]] = {
+    "FILE_INGEST": (SLM,),
+    "CALC_MATCH": (SQL,),
+    "CALC_ER_CONTRIB": (SQL,),
+    "EMPLOYMENT_STATUS": (SQL,),
+    "FORFEITURES": (SQL,),
+    "GENERATE_XML": (SQL,),
+    "DEPWD_DETAIL_UPDATE": (SQL,),
+    "ACH_CALC": (SQL, TOKEN_SERVICE),
+}
+
+# Model resource used by an agent's steps when they require a model.
+MODEL_RESOURCES: dict[str, str] = {
+    "IDP": SLM,
+    "VALIDATOR": SLM,
+    "TRANSFORMATION": SLM,
+    "COMPLIANCE": BEDROCK,
+    "ORCHESTRATOR": BEDROCK,
+}
+
+
+# Lower is admitted first. One gate compares like with like: resource gates
+# take a batch's float priority, agent gates ``(batch priority, step rank)``.
+Priority = float | tuple[float, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class ResourceLimit:
+    """``concurrency`` holders at once; at most ``rate`` admissions/second, bursting to ``burst``."""
+
+    concurrency: int | None = None
+    rate: float | None = None
+    burst: int = 1
+
+
+def default_limits(sql: SQLServerConfig | None = None) -> dict[str, ResourceLimit]:
+    return {
+        SQL: ResourceLimit(concurrency=(sql or SQLServerConfig()).pool_size),
+        TOKEN_SERVICE: ResourceLimit(concurrency=2),
+        SLM: ResourceLimit(concurrency=2),
+        BEDROCK: ResourceLimit(concurrency=4, rate=2.0, burst=4),
+    }
+
+
+class ResourceGate:
+    """Priority-ordered semaphore with an optional token bucket."""
+
+    def __init__(self, name: str, limit: ResourceLimit, timer: Callable[[], float] = time.monotonic) -> None:
+        self.name = name
+        self._limit = limit
+        self._timer = timer
+        self._free = limit.concurrency if limit.concurrency is not None else math.inf
+        self._tokens = float(limit.burst)
+        self._stamp = timer()
+        self._waiters: list[tuple[Priority, int, asyncio.Future[None]]] = []
+        self._seq = itertools.count()
+        self._refill: asyncio.TimerHandle | None = None
+        self.in_use = 0
+        self.admitted = 0
+        self.wait_s_total = 0.0
+        self.wait_s_max = 0.0
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    async def acquire(self, priority: Priority = math.inf) -> float:
+        """Wait for admission; returns the seconds spent waiting."""
+        started = self._timer()
+        if not self._waiters and self._admissible():
+            self._take()
+        else:
+            fut: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+            self._wake()
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    self.release()
+                raise
+        waited = self._timer() - started
+        self.admitted += 1
+        self.wait_s_total += waited
+        self.wait_s_max = max(self.wait_s_max, waited)
+        return waited
+
+    def release(self) -> None:
+        self.in_use -= 1
+        self._free += 1
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = math.inf) -> AsyncIterator[float]:
+        """Hold one admission for the body of the ``async with``; yields the wait."""
+        waited = await self.acquire(priority)
+        try:
+            yield waited
+        finally:
+            self.release()
+
+    def _admissible(self) -> bool:
+        if self._free <= 0:
+            return False
+        if self._limit.rate is None:
+            return True
+        now = self._timer()
+        self._tokens = min(float(self._limit.burst), self._tokens + (now - self._stamp) * self._limit.rate)
+        self._stamp = now
+        return self._tokens >= 1
+
+    def _take(self) -> None:
+        self._free -= 1
+        self.in_use += 1
+        if self._limit.rate is not None:
+            self._tokens -= 1
+
+    def _wake(self) -> None:
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        while self._waiters and self._admissible():
+            _, _, fut = heapq.heappop(self._waiters)
+            if fut.done():
+                continue
+            self._take()
+            fut.set_result(None)
+        if self._waiters and self._free > 0 and self._refill is None and self._limit.rate:
+            delay = (1 - self._tokens) / self._limit.rate
+            self._refill = asyncio.get_running_loop().call_later(delay, self._refilled)
+
+    def _refilled(self) -> None:
+        self._refill = None
+        self._wake()
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "wait_ms_avg": int(self.wait_s_total * 1000 / self.admitted) if self.admitted else 0,
+            "wait_ms_max": int(self.wait_s_max * 1000),
+        }
+
+
+class ResourceAdmission:
+    """The shared gates, and each batch's admission priority."""
+
+    def __init__(
+        self,
+        limits: Mapping[str, ResourceLimit] | None = None,
+        step_resources: Mapping[str, Iterable[str]] = STEP_RESOURCES,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        limits = default_limits() if limits is None else limits
+        self._timer = timer
+        self._gates = {name: ResourceGate(name, limit, timer) for name, limit in limits.items()}
+        self._agent_gates: dict[str, ResourceGate] = {}
+        self._step_resources = {name: tuple(r) for name, r in step_resources.items()}
+        self._priorities: dict[str, float] = {}
+
+    def gate(self, name: str) -> ResourceGate:
+        return self._gates[name]
+
+    def agent_gate(self, agent: str, concurrency: int) -> ResourceGate:
+        """The shared step-concurrency gate for ``agent``; the first caller's ``concurrency`` sets its limit."""
+        gate = self._agent_gates.get(agent)
+        if gate is None:
+            gate = ResourceGate(f"agent:{agent}", ResourceLimit(concurrency=concurrency), self._timer)
+            self._agent_gates[agent] = gate
+        return gate
+
+    def priority(self, batch_id: str) -> float:
+        """The batch's admission priority; ``inf`` (last) when none is set."""
+        return self._priorities.get(batch_id, math.inf)
+
+    def set_priority(self, batch_id: str, priority: float) -> None:
+        self._priorities[batch_id] = priority
+
+    def clear(self, batch_id: str) -> None:
+        self._priorities.pop(batch_id, None)
+
+    def resources_for(self, steps: Iterable[PipelineStep]) -> tuple[str, ...]:
+        """Gated resources the given (possibly fused) steps use, in a fixed acquisition order."""
+        needed: set[str] = set()
+        for step in steps:
+            declared = step.parameters.get("resources")
+            needed.update(declared if declared is not None else self._step_resources.get(step.subroutine_name, ()))
+            if step.parameters.get("requiresModel") and step.agent in MODEL_RESOURCES:
+                needed.add(MODEL_RESOURCES[step.agent])
+        return tuple(sorted(needed & self._gates.keys()))
+
+    @asynccontextmanager
+    async def hold(self, batch_id: str, resources: Iterable[str]) -> AsyncIterator[float]:
+        """Hold every resource in ``resources`` (acquired in order); yields the total wait."""
+        priority = self.priority(batch_id)
+        held: list[ResourceGate] = []
+        waited = 0.0
+        try:
+            for name in resources:
+                gate = self._gates[name]
+                waited += await gate.acquire(priority)
+                held.append(gate)
+            yield waited
+        finally:
+            for gate in reversed(held):
+                gate.release()
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        gates = [*self._gates.values(), *self._agent_gates.values()]
+        return {gate.name: gate.metrics() for gate in gates}
@@ -0,0 +1,152 @@
+"""BatchScheduler — runs many batches at once above ``IOrchestrator.run_pipeline``.
+
+Submitted batches wait in a queue ordered by custodian deadline (the next
+cutoff from the shared business calendar; plans without a custodian deadline
+go last, FIFO among equals). Up to ``max_batches`` run concurrently. The
+same deadline is registered as the batch's priority with the shared
+``ResourceAdmission``, so a batch close to its cutoff also goes first when
+steps queue for the SQL pool, Token Service or models.
+
+``metrics`` reports queue depth, running and finished counts, queue wait
+times and each resource gate's occupancy and wait times.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from bluestar.agents.business_calendar import BusinessCalendar, CustodianDeadline, custodian_deadline
+from bluestar.agents.orchestrator.admission import ResourceAdmission
+from bluestar.core.protocols import IClock, IOrchestrator, IRulesStore
+from bluestar.models.pipeline import BatchStatus
+
+DEFAULT_MAX_BATCHES = 8
+
+
+@dataclass(frozen=True, slots=True)
+class BatchRequest:
+    batch_id: str
+    plan_id: str
+    pay_freq: str
+    s3_path: str
+
+
+@dataclass(order=True, slots=True)
+class _Queued:
+    priority: float
+    seq: int
+    request: BatchRequest = field(compare=False)
+    deadline: datetime | None = field(compare=False)
+    submitted: float = field(compare=False)
+    future: asyncio.Future[dict[str, Any]] = field(compare=False)
+
+
+class BatchScheduler:
+    """Deadline-ordered, concurrency-bounded execution of batch pipelines."""
+
+    def __init__(
+        self,
+        orchestrator: IOrchestrator,
+        rules: IRulesStore,
+        admission: ResourceAdmission | None = None,
+        calendar: BusinessCalendar | None = None,
+        clock: IClock | None = None,
+        max_batches: int = DEFAULT_MAX_BATCHES,
+        timer: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._orchestrator = orchestrator
+        self._rules = rules
+        self._admission = admission
+        self._calendar = calendar or BusinessCalendar(clock)
+        self._max_batches = max_batches
+        self._timer = timer
+        self._deadlines: dict[tuple[str, str], CustodianDeadline | None] = {}
+        self._queue: list[_Queued] = []
+        self._seq = itertools.count()
+        self._running: dict[str, asyncio.Task[None]] = {}
+        self.completed = 0
+        self.failed = 0
+        self._started = 0
+        self._wait_s_total = 0.0
+        self._wait_s_max = 0.0
+
+    def deadline_for(self, plan_id: str, pay_freq: str) -> CustodianDeadline | None:
+        """Custodian deadline for a plan/frequency, read from client config once."""
+        key = (plan_id, pay_freq)
+        if key not in self._deadlines:
+            self._deadlines[key] = custodian_deadline(self._rules.get_client_config(plan_id, pay_freq))
+        return self._deadlines[key]
+
+    async def submit(self, request: BatchRequest) -> dict[str, Any]:
+        """Queue a batch and wait for its pipeline result."""
+        deadline = self.deadline_for(request.plan_id, request.pay_freq)
+        due_at = self._calendar.next_deadline(deadline) if deadline is not None else None
+        entry = _Queued(
+            priority=due_at.timestamp() if due_at is not None else math.inf,
+            seq=next(self._seq),
+            request=request,
+            deadline=due_at,
+            submitted=self._timer(),
+            future=asyncio.get_running_loop().create_future(),
+        )
+        heapq.heappush(self._queue, entry)
+        self._pump()
+        return await entry.future
+
+    async def run(self, requests: Iterable[BatchRequest]) -> list[dict[str, Any] | BaseException]:
+        """Submit every request; results (or the exception a batch raised) in request order."""
+        return await asyncio.gather(*(self.submit(r) for r in requests), return_exceptions=True)
+
+    def _pump(self) -> None:
+        while self._queue and len(self._running) < self._max_batches:
+            entry = heapq.heappop(self._queue)
+            waited = self._timer() - entry.submitted
+            self._started += 1
+            self._wait_s_total += waited
+            self._wait_s_max = max(self._wait_s_max, waited)
+            batch_id = entry.request.batch_id
+            if self._admission is not None:
+                self._admission.set_priority(batch_id, entry.priority)
+            self._running[batch_id] = asyncio.create_task(self._run(entry))
+
+    async def _run(self, entry: _Queued) -> None:
+        request = entry.request
+        try:
+            result = await self._orchestrator.run_pipeline(
+                request.batch_id, request.plan_id, request.pay_freq, request.s3_path
+            )
+        except Exception as exc:
+            self.failed += 1
+            if not entry.future.done():
+                entry.future.set_exception(exc)
+        else:
+            if result.get("status") == BatchStatus.COMPLETED:
+                self.completed += 1
+            else:
+                self.failed += 1
+            if not entry.future.done():
+                entry.future.set_result(result)
+        finally:
+            self._running.pop(request.batch_id, None)
+            if self._admission is not None:
+                self._admission.clear(request.batch_id)
+            self._pump()
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "queue_depth": len(self._queue),
+            "running": len(self._running),
+            "completed": self.completed,
+            "failed": self.failed,
+            "queue_wait_ms_avg": int(self._wait_s_total * 1000 / self._started) if self._started else 0,
+            "queue_wait_ms_max": int(self._wait_s_max * 1000),
+            "resources": self._admission.metrics() if self._admission is not None else {},
+        }
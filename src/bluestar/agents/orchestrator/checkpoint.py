@@ -0,0 +1,210 @@
+"""Batch checkpoints — resume a failed batch from its last saved record set.
+
+After selected steps the in-memory ``PayrollBatch`` is snapshotted to the file
+store under ``checkpoints/{batchId}/{sha256}.bsck``. The object name is the
+digest of its content, so an unchanged record set is stored once and a
+damaged object is detected on load. ``manifest.json`` beside the snapshots
+lists them in order with the steps that had completed when each was taken.
+
+A restarted batch loads the newest checkpoint that verifies, treats exactly
+its completed steps as done, and re-runs the rest. Once a batch completes,
+its checkpoints are deleted.
+
+Snapshot format: a 5-byte magic, then zlib over a JSON document holding each
+column once with a type tag (integer cents and ints stay ints, dates become
+ordinals), so repeated values compress well and nothing is pickled. A column
+mixing numeric types is promoted: to Decimal when it holds any Decimal,
+otherwise to float.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import zlib
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+from bluestar.core.exceptions import BlueStarError, PipelineError
+from bluestar.core.protocols import IFileStore
+from bluestar.models.payroll_batch import PayrollBatch
+
+CHECKPOINT_PREFIX = "checkpoints/"
+MAGIC = b"BSCK\x01"
+
+# Default steps to checkpoint after: model-driven ingest, the SQL-heavy
+# employment status join, and the last step before the deliverables.
+CHECKPOINT_STEPS: frozenset[str] = frozenset({"FILE_INGEST", "EMPLOYMENT_STATUS", "PLAN_HOLD_CHECK"})
+
+_ENCODERS: dict[str, Callable[[Any], Any]] = {
+    "i": lambda v: v,
+    "b": lambda v: v,
+    "s": lambda v: v,
+    "f": float,
+    "d": date.toordinal,
+    "t": datetime.isoformat,
+    "n": str,
+}
+_DECODERS: dict[str, Callable[[Any], Any]] = {
+    "i": lambda v: v,
+    "b": lambda v: v,
+    "s": lambda v: v,
+    "f": float,
+    "d": date.fromordinal,
+    "t": datetime.fromisoformat,
+    "n": Decimal,
+}
+_TAGS = (("b", bool), ("i", int), ("f", float), ("s", str), ("t", datetime), ("d", date), ("n", Decimal))
+_NUMERIC = frozenset({int, float, Decimal})
+
+
+def _tag(name: str, values: list[Any]) -> str:
+    kinds = {type(v) for v in values if v is not None}
+    if not kinds:
+        return "s"
+    if len(kinds) == 1:
+        [kind] = kinds
+        for tag, typ in _TAGS:
+            if kind is typ:
+                return tag
+    elif kinds <= _NUMERIC:
+        return "n" if Decimal in kinds else "f"
+    raise PipelineError(f"Cannot checkpoint column {name!r} with values of type {sorted(k.__name__ for k in kinds)}")
+
+
+def encode_batch(batch: PayrollBatch) -> bytes:
+    """Canonical uncompressed encoding of the live rows (deterministic for equal batches)."""
+    rows = batch.selection
+    columns = []
+    for name in sorted(batch.columns):
+        values = batch.raw_column(name)
+        if rows is not None:
+            values = [values[i] for i in rows]
+        tag = _tag(name, values)
+        encode = _ENCODERS[tag]
+        columns.append([name, tag, [None if v is None else encode(v) for v in values]])
+    return json.dumps({"length": len(batch), "columns": columns}, separators=(",", ":")).encode()
+
+
+def decode_batch(raw: bytes) -> PayrollBatch:
+    doc = json.loads(raw)
+    columns = {}
+    for name, tag, values in doc["columns"]:
+        decode = _DECODERS[tag]
+        columns[name] = [None if v is None else decode(v) for v in values]
+    return PayrollBatch(columns, doc["length"])
+
+
+@dataclass(frozen=True, slots=True)
+class Checkpoint:
+    """One saved record set and the steps it reflects."""
+
+    path: str
+    digest: str
+    step_order: int
+    completed: frozenset[int]
+    record_count: int
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "path": self.path,
+            "digest": self.digest,
+            "stepOrder": self.step_order,
+            "completed": sorted(self.completed),
+            "recordCount": self.record_count,
+        }
+
+    @classmethod
+    def from_json(cls, item: Mapping[str, Any]) -> Checkpoint:
+        return cls(
+            item["path"], item["digest"], int(item["stepOrder"]),
+            frozenset(int(o) for o in item["completed"]), int(item["recordCount"]),
+        )
+
+
+class CheckpointStore:
+    """Content-addressed batch checkpoints in an ``IFileStore``."""
+
+    def __init__(
+        self,
+        files: IFileStore,
+        prefix: str = CHECKPOINT_PREFIX,
+        steps: Iterable[str] = CHECKPOINT_STEPS,
+        level: int = 6,
+    ) -> None:
+        self._files = files
+        self._prefix = prefix
+        self._steps = frozenset(steps)
+        self._level = level
+        self._manifests: dict[str, list[Checkpoint]] = {}
+
+    def wants(self, subroutine_name: str, parameters: Mapping[str, Any]) -> bool:
+        """Whether to checkpoint after this step; ``parameters["checkpoint"]`` overrides the default set."""
+        return bool(parameters.get("checkpoint", subroutine_name in self._steps))
+
+    def save(self, batch_id: str, step_order: int, batch: PayrollBatch, completed: Iterable[int]) -> Checkpoint:
+        raw = encode_batch(batch)
+        digest = hashlib.sha256(raw).hexdigest()
+        path = f"{self._folder(batch_id)}{digest}.bsck"
+        manifest = self.manifest(batch_id)
+        if all(c.path != path for c in manifest):
+            self._files.write(path, MAGIC + zlib.compress(raw, self._level))
+        checkpoint = Checkpoint(path, digest, step_order, frozenset(completed), len(batch))
+        manifest.append(checkpoint)
+        self._files.write(
+            self._manifest_path(batch_id),
+            json.dumps({"checkpoints": [c.to_json() for c in manifest]}).encode(),
+            content_type="application/json",
+        )
+        return checkpoint
+
+    def manifest(self, batch_id: str) -> list[Checkpoint]:
+        """Checkpoints for ``batch_id``, oldest first."""
+        manifest = self._manifests.get(batch_id)
+        if manifest is None:
+            path = self._manifest_path(batch_id)
+            manifest = []
+            if path in self._files.list_files(path):
+                doc = json.loads(self._files.read(path))
+                manifest = [Checkpoint.from_json(item) for item in doc["checkpoints"]]
+            self._manifests[batch_id] = manifest
+        return manifest
+
+    def load(self, checkpoint: Checkpoint) -> PayrollBatch:
+        """Read and verify one checkpoint; raises ``PipelineError`` if it is damaged."""
+        data = self._files.read(checkpoint.path)
+        if not data.startswith(MAGIC):
+            raise PipelineError(f"Checkpoint {checkpoint.path} has an unknown format")
+        try:
+            raw = zlib.decompress(data[len(MAGIC):])
+        except zlib.error as exc:
+            raise PipelineError(f"Checkpoint {checkpoint.path} is corrupt: {exc}") from exc
+        if hashlib.sha256(raw).hexdigest() != checkpoint.digest:
+            raise PipelineError(f"Checkpoint {checkpoint.path} does not match its digest")
+        return decode_batch(raw)
+
+    def latest(self, batch_id: str) -> tuple[Checkpoint, PayrollBatch] | None:
+        """The newest checkpoint that loads and verifies, with its records."""
+        for checkpoint in reversed(self.manifest(batch_id)):
+            try:
+                return checkpoint, self.load(checkpoint)
+            except (BlueStarError, KeyError):
+                continue
+        return None
+
+    def purge(self, batch_id: str) -> int:
+        """Delete every checkpoint for ``batch_id``; returns the number of objects removed."""
+        paths = self._files.list_files(self._folder(batch_id))
+        for path in paths:
+            self._files.delete(path)
+        self._manifests.pop(batch_id, None)
+        return len(paths)
+
+    def _folder(self, batch_id: str) -> str:
+        return f"{self._prefix}{batch_id}/"
+
+    def _manifest_path(self, batch_id: str) -> str:
+        return f"{self._folder(batch_id)}manifest.json"
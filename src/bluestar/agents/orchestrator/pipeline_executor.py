@@ -1,9 +1,438 @@
-"""PipelineExecutor service — loads and executes the ordered pipeline for a client."""
+"""PipelineExecutor service — runs a client's pipeline as a dependency graph.
+
+Steps come from ``bluestar-processing-pipeline`` (PK=CLIENT#{planId}_{payFreq}),
+cached in Redis as ``pipeline:{planId}:{payFreq}`` for one hour. ``dependsOn``
+names the subroutines (or step orders) a step waits for; a pipeline that
+declares no dependencies at all runs strictly in ``stepOrder``. Disabled steps
+are SKIPPED and satisfy their dependents immediately.
+
+Every step whose dependencies are done is dispatched at once, bounded by a
+per-agent concurrency limit and, with a ``ResourceAdmission``, by the shared
+resources (SQL pool, Token Service, models) the step uses. With an admission
+the agent limits are its shared agent gates, so they hold across batches.
+Required steps go ahead of optional ones, both in dispatch order and when
+queued for an agent slot. Only a ``RetryableStepError`` (the step never ran)
+is retried, with exponential backoff; any other error fails the step at once,
+since the step may already have changed the batch. A failed required step
+stops new dispatches; a failed optional step does not block its dependents.
+Steps passed as ``completed`` (a resumed batch's checkpoint) are not
+dispatched. When the batch finishes, its critical path (the longest chain of
+step durations through the graph) is recorded on the ``BatchState``.
+
+Deadline-aware mode (``speculate_within``): once the batch is that close to
+its custodian cutoff, a required step may start before an optional step it
+depends on when that dependency is soft — the optional step is
+``reportOnly``, or its declared ``outputs`` do not meet the dependent's
+declared ``inputs``. Optional steps whose every dependency edge is soft are
+held back while required work is ready or running, so they finish after the
+deliverables.
+"""
 
 from __future__ import annotations
 
-# TODO: Implement PipelineExecutor
-# - Query bluestar-processing-pipeline table (PK=CLIENT#{planId}_{payFreq})
-# - Cache in Redis: pipeline:{planId}:{payFreq} / 1 hr TTL
-# - Execute steps in order, respecting dependsOn and enabled flags
-# - Dispatch to agent SQS queues, wait for completion callbacks
+import asyncio
+import contextlib
+import json
+import math
+from collections.abc import Collection, Mapping
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any
+
+from bluestar.agents.business_calendar import BusinessCalendar, custodian_deadline
+from bluestar.agents.clock import SystemClock
+from bluestar.agents.orchestrator.admission import Priority, ResourceAdmission, ResourceGate, ResourceLimit
+from bluestar.core.exceptions import PipelineError, RetryableStepError
+from bluestar.core.protocols import ICacheBackend, IClock, IOrchestrator, IRulesStore, IWorkflowState
+from bluestar.models.pipeline import BatchState, BatchStatus, PipelineStep, StepState, StepStatus
+
+PIPELINE_CACHE_TTL = 3600
+DEFAULT_AGENT_CONCURRENCY = 2
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 1.0  # seconds before the first retry; doubles on each further one
+
+# DynamoDB attribute -> PipelineStep field
+_STEP_KEYS = {
+    "stepOrder": "step_order",
+    "subroutineName": "subroutine_name",
+    "agent": "agent",
+    "enabled": "enabled",
+    "required": "required",
+    "dependsOn": "depends_on",
+    "parameters": "parameters",
+}
+
+
+def pipeline_step(item: Mapping[str, Any]) -> PipelineStep:
+    """Build a ``PipelineStep`` from a DynamoDB item (camelCase or snake_case keys)."""
+    data = {f: item.get(k, item.get(f)) for k, f in _STEP_KEYS.items()}
+    return PipelineStep.model_validate({k: v for k, v in data.items() if v is not None})
+
+
+@dataclass(frozen=True, slots=True)
+class PipelineGraph:
+    """Steps keyed by step order with their resolved dependencies.
+
+    A fused node (see ``step_fusion``) lists the logical steps it runs in
+    ``members``; every other node stands for itself.
+    """
+
+    steps: dict[int, PipelineStep]
+    deps: dict[int, tuple[int, ...]]
+    dependents: dict[int, tuple[int, ...]]
+    topo_order: tuple[int, ...]
+    members: dict[int, tuple[PipelineStep, ...]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, steps: list[PipelineStep]) -> PipelineGraph:
+        """Resolve ``depends_on`` and check the graph is acyclic.
+
+        Raises ``PipelineError`` for an unknown dependency or a cycle.
+        """
+        ordered = sorted(steps, key=lambda s: s.step_order)
+        by_order = {s.step_order: s for s in ordered}
+        by_name = {s.subroutine_name: s.step_order for s in ordered}
+        declared = any(s.depends_on for s in ordered)
+
+        deps: dict[int, tuple[int, ...]] = {}
+        previous: int | None = None
+        for step in ordered:
+            if declared:
+                resolved = []
+                for name in step.depends_on:
+                    order = by_name.get(name)
+                    if order is None and name.isdigit() and int(name) in by_order:
+                        order = int(name)
+                    if order is None:
+                        raise PipelineError(f"Step {step.step_order} depends on unknown step {name!r}")
+                    resolved.append(order)
+                deps[step.step_order] = tuple(dict.fromkeys(resolved))
+            else:
+                deps[step.step_order] = () if previous is None else (previous,)
+            previous = step.step_order
+        return cls.link(by_order, deps)
+
+    @classmethod
+    def link(
+        cls,
+        steps: dict[int, PipelineStep],
+        deps: dict[int, tuple[int, ...]],
+        members: dict[int, tuple[PipelineStep, ...]] | None = None,
+    ) -> PipelineGraph:
+        """Derive dependents and a topological order; raises ``PipelineError`` on a cycle."""
+        by_order = steps
+        dependents: dict[int, list[int]] = {o: [] for o in by_order}
+        for order, needs in deps.items():
+            for need in needs:
+                dependents[need].append(order)
+
+        waiting = {o: len(needs) for o, needs in deps.items()}
+        ready = [o for o, n in waiting.items() if n == 0]
+        topo: list[int] = []
+        while ready:
+            order = ready.pop(0)
+            topo.append(order)
+            for nxt in dependents[order]:
+                waiting[nxt] -= 1
+                if waiting[nxt] == 0:
+                    ready.append(nxt)
+        if len(topo) != len(by_order):
+            cyclic = sorted(o for o, n in waiting.items() if n)
+            raise PipelineError(f"Pipeline dependency cycle among steps {cyclic}")
+        return cls(by_order, deps, {o: tuple(d) for o, d in dependents.items()}, tuple(topo), members or {})
+
+    def members_of(self, order: int) -> tuple[PipelineStep, ...]:
+        """The logical steps a node runs."""
+        return self.members.get(order) or (self.steps[order],)
+
+    def soft_edges(self) -> frozenset[tuple[int, int]]:
+        """``(optional, dependent)`` edges the dependent does not need the outputs of."""
+        edges: set[tuple[int, int]] = set()
+        for order, step in self.steps.items():
+            outputs = step.parameters.get("outputs")
+            report_only = bool(step.parameters.get("reportOnly"))
+            if step.required or (outputs is None and not report_only):
+                continue
+            for nxt in self.dependents[order]:
+                inputs = self.steps[nxt].parameters.get("inputs")
+                if report_only or (inputs is not None and not set(outputs or ()) & set(inputs)):
+                    edges.add((order, nxt))
+        return frozenset(edges)
+
+    def critical_path(self, durations: Mapping[int, int]) -> tuple[list[int], int]:
+        """Longest chain of ``durations`` (ms) through the graph, and its length."""
+        finish: dict[int, int] = {}
+        via: dict[int, int | None] = {}
+        for order in self.topo_order:
+            parent = max(self.deps[order], key=finish.__getitem__, default=None)
+            finish[order] = (finish[parent] if parent is not None else 0) + durations.get(order, 0)
+            via[order] = parent
+        if not finish:
+            return [], 0
+        end = max(finish, key=lambda o: (finish[o], o))
+        path: list[int] = []
+        node: int | None = end
+        while node is not None:
+            path.append(node)
+            node = via[node]
+        return path[::-1], finish[end]
+
+
+class PipelineExecutor:
+    """Dispatch a batch's pipeline steps in dependency order, in parallel where possible."""
+
+    def __init__(
+        self,
+        rules: IRulesStore,
+        orchestrator: IOrchestrator,
+        state: IWorkflowState | None = None,
+        cache: ICacheBackend | None = None,
+        agent_limits: Mapping[str, int] | None = None,
+        default_limit: int = DEFAULT_AGENT_CONCURRENCY,
+        max_attempts: int = MAX_ATTEMPTS,
+        retry_backoff: float = RETRY_BACKOFF,
+        clock: IClock | None = None,
+        admission: ResourceAdmission | None = None,
+        speculate_within: timedelta | None = None,
+        calendar: BusinessCalendar | None = None,
+    ) -> None:
+        self._rules = rules
+        self._orchestrator = orchestrator
+        self._state = state
+        self._cache = cache
+        self._agent_limits = dict(agent_limits or {})
+        self._default_limit = default_limit
+        self._max_attempts = max_attempts
+        self._retry_backoff = retry_backoff
+        self._clock = clock or SystemClock()
+        self._admission = admission
+        self._speculate_within = speculate_within
+        self._calendar = calendar or BusinessCalendar(self._clock)
+
+    def load_steps(self, plan_id: str, pay_freq: str) -> list[PipelineStep]:
+        """Pipeline steps for a client, via the one-hour Redis cache."""
+        key = f"pipeline:{plan_id}:{pay_freq}"
+        cached = self._cache.get(key) if self._cache is not None else None
+        if cached is not None:
+            items = json.loads(cached)
+        else:
+            items = self._rules.get_pipeline_steps(plan_id, pay_freq)
+            if self._cache is not None:
+                self._cache.setex(key, PIPELINE_CACHE_TTL, json.dumps(items, default=str))
+        return [pipeline_step(item) for item in items]
+
+    def load_graph(self, plan_id: str, pay_freq: str) -> PipelineGraph:
+        return PipelineGraph.build(self.load_steps(plan_id, pay_freq))
+
+    async def execute(
+        self, batch: BatchState, graph: PipelineGraph | None = None, completed: Collection[int] = ()
+    ) -> BatchState:
+        """Run every step of ``batch``'s pipeline not in ``completed`` and return the updated state."""
+        graph = graph or self.load_graph(batch.plan_id, batch.pay_freq)
+        limits = {agent: self._agent_gate(agent) for agent in {s.agent for s in graph.steps.values()}}
+        batch_priority = self._admission.priority(batch.batch_id) if self._admission is not None else math.inf
+        states = {
+            m.step_order: StepState(step_order=m.step_order, agent_name=m.agent)
+            for o in graph.steps
+            for m in graph.members_of(o)
+        }
+        batch.status = BatchStatus.PROCESSING
+        batch.start_time = self._clock.now()
+        await self._batch_update(batch)
+
+        speculate_from = self._speculation_start(batch)
+        soft = graph.soft_edges() if speculate_from is not None else frozenset()
+        deferrable = {
+            o for o, step in graph.steps.items()
+            if soft and not step.required and all((o, nxt) in soft for nxt in graph.dependents[o])
+        }
+        rank = {o: i if graph.steps[o].required else len(graph.topo_order) + i for i, o in enumerate(graph.topo_order)}
+        waiting = {o: len(needs) for o, needs in graph.deps.items()}
+        hard = {o: sum((d, o) not in soft for d in needs) for o, needs in graph.deps.items()}
+        started: set[int] = set()
+        running: dict[asyncio.Task[bool], int] = {}
+        failed: int | None = None
+
+        def release(order: int) -> None:
+            for nxt in graph.dependents[order]:
+                waiting[nxt] -= 1
+                hard[nxt] -= (order, nxt) not in soft
+
+        def dispatchable() -> list[int]:
+            speculating = speculate_from is not None and self._clock.now() >= speculate_from
+            ready = [
+                o for o in graph.topo_order
+                if o not in started and (waiting[o] == 0 or (speculating and hard[o] == 0))
+            ]
+            if speculating and any(graph.steps[o].required for o in (*ready, *running.values())):
+                ready = [o for o in ready if o not in deferrable]
+            return sorted(ready, key=rank.__getitem__)
+
+        while True:
+            ready = dispatchable() if failed is None else []
+            while ready:
+                for order in ready:
+                    started.add(order)
+                    step = graph.steps[order]
+                    members = [states[m.step_order] for m in graph.members_of(order)]
+                    if all(m.step_order in completed for m in members):
+                        for state in members:
+                            state.status = StepStatus.COMPLETED
+                        release(order)
+                        continue
+                    if not step.enabled:
+                        states[order].status = StepStatus.SKIPPED
+                        await self._step_update(batch.batch_id, states[order])
+                        release(order)
+                        continue
+                    if waiting[order]:
+                        batch.speculated.append(order)
+                    resources = self._admission.resources_for(graph.members_of(order)) if self._admission else ()
+                    task = asyncio.create_task(
+                        self._run_step(
+                            batch, step, members, limits[step.agent], (batch_priority, rank[order]), resources
+                        )
+                    )
+                    running[task] = order
+                ready = dispatchable()
+            if not running:
+                break
+            timeout = None
+            if speculate_from is not None and failed is None and self._clock.now() < speculate_from:
+                # Wake when the window opens, not only when a running step finishes.
+                timeout = max(0.0, (speculate_from - self._clock.now()).total_seconds())
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            crashed = False
+            for task in done:
+                order = running.pop(task)
+                try:
+                    ok = task.result()
+                except Exception as exc:
+                    # Bookkeeping for the step failed (state write, result shape): stop the batch.
+                    self._mark_failed(graph, states, order, f"{type(exc).__name__}: {exc}")
+                    failed, crashed = order, True
+                    continue
+                if ok or not graph.steps[order].required:
+                    release(order)
+                elif failed is None:
+                    failed = order
+            if crashed:
+                await self._cancel(running, graph, states)
+                break
+
+        batch.steps = [states[o] for o in sorted(states)]
+        batch.critical_path, batch.critical_path_ms = graph.critical_path(
+            {o: sum(states[m.step_order].duration_ms or 0 for m in graph.members_of(o)) for o in graph.steps}
+        )
+        batch.end_time = self._clock.now()
+        batch.status = BatchStatus.FAILED if failed is not None else BatchStatus.COMPLETED
+        await self._batch_update(batch, critical_path=batch.critical_path, critical_path_ms=batch.critical_path_ms)
+        return batch
+
+    @staticmethod
+    def _mark_failed(
+        graph: PipelineGraph, states: Mapping[int, StepState], order: int, error: str, keep_completed: bool = False
+    ) -> None:
+        for member in graph.members_of(order):
+            state = states[member.step_order]
+            if keep_completed and state.status == StepStatus.COMPLETED:
+                continue
+            state.status = StepStatus.FAILED
+            state.error_details = state.error_details or error
+
+    async def _cancel(
+        self, running: dict[asyncio.Task[bool], int], graph: PipelineGraph, states: Mapping[int, StepState]
+    ) -> None:
+        """Cancel and await the steps still running after the batch failed."""
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        for order in running.values():
+            self._mark_failed(graph, states, order, "Cancelled after another step failed", keep_completed=True)
+        running.clear()
+
+    async def _run_step(
+        self,
+        batch: BatchState,
+        step: PipelineStep,
+        states: list[StepState],
+        limit: ResourceGate,
+        priority: Priority,
+        resources: tuple[str, ...] = (),
+    ) -> bool:
+        """Dispatch one node; a fused node reports each member's counts under ``result["steps"]``."""
+        held = (
+            self._admission.hold(batch.batch_id, resources)
+            if self._admission is not None and resources
+            else contextlib.nullcontext()
+        )
+        async with limit.slot(priority), held:
+            start = self._clock.now()
+            for state in states:
+                state.status = StepStatus.DISPATCHED
+                state.start_time = start
+                await self._step_update(batch.batch_id, state)
+            parameters = {"subroutine_name": step.subroutine_name, **step.parameters}
+            result: dict[str, Any] | None = None
+            retries, error = 0, ""
+            for attempt in range(self._max_attempts):
+                try:
+                    result = await self._orchestrator.dispatch_step(
+                        batch.batch_id, step.step_order, step.agent, parameters
+                    )
+                    break
+                except RetryableStepError as exc:
+                    retries, error = attempt + 1, str(exc)
+                    if retries < self._max_attempts:
+                        await asyncio.sleep(self._retry_backoff * 2**attempt)
+                except Exception as exc:
+                    error = str(exc)  # not retried, so retry_count is unchanged
+                    break
+            end = self._clock.now()
+            elapsed = int((end - start).total_seconds() * 1000)
+            fused = len(states) > 1
+            for i, state in enumerate(states):
+                state.end_time = end
+                state.retry_count = retries
+                state.error_details = error
+                state.duration_ms = elapsed
+                if result is None:
+                    state.status = StepStatus.FAILED
+                else:
+                    metrics = result["steps"][i] if fused else result
+                    state.status = StepStatus.COMPLETED
+                    state.record_count = int(metrics.get("record_count", 0))
+                    state.error_count = int(metrics.get("error_count", 0))
+                    state.warning_count = int(metrics.get("warning_count", 0))
+                    if fused:
+                        state.duration_ms = int(metrics.get("duration_ms", 0))
+                await self._step_update(batch.batch_id, state)
+            return result is not None
+
+    def _agent_gate(self, agent: str) -> ResourceGate:
+        concurrency = self._agent_limits.get(agent, self._default_limit)
+        if self._admission is not None:
+            return self._admission.agent_gate(agent, concurrency)
+        return ResourceGate(agent, ResourceLimit(concurrency=concurrency))
+
+    def _speculation_start(self, batch: BatchState) -> datetime | None:
+        """When deadline-aware speculation starts for ``batch``; None if it never does."""
+        if self._speculate_within is None:
+            return None
+        deadline = custodian_deadline(self._rules.get_client_config(batch.plan_id, batch.pay_freq))
+        if deadline is None:
+            return None
+        return self._calendar.next_deadline(deadline) - self._speculate_within
+
+    async def _step_update(self, batch_id: str, state: StepState) -> None:
+        if self._state is not None:
+            await self._state.update_step_state(
+                batch_id,
+                state.step_order,
+                state.status,
+                **state.model_dump(exclude={"step_order", "status"}, exclude_none=True),
+            )
+
+    async def _batch_update(self, batch: BatchState, **metadata: Any) -> None:
+        if self._state is not None:
+            await self._state.update_batch_state(batch.batch_id, batch.status, **metadata)
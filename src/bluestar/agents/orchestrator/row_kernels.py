@@ -0,0 +1,175 @@
+"""Row kernels for the fusible IDP and Validator steps.
+
+``DEFAULT_KERNELS`` is the registry to pass to ``StepFusionPlanner``. Each
+kernel is the per-row form of a pipeline step from the agent skills:
+
+- 0300 MERGE_PAYROLL_FIELDS: every canonical field exists; nulls take the
+  payroll fields template default (0 for amounts, "" for strings).
+- 0400 DROP_V_VARIABLES: Stata ``v1``, ``v2``, ... overflow columns are
+  dropped, with a warning, since the file may have shifted columns.
+- 0500 DESTRING_NUMBERS: string amounts are cleaned (ignore characters,
+  trailing or parenthesized negatives) and stored as integer cents; a value
+  that does not parse becomes 0 and counts as a warning.
+- 0900 BAD_SSN: the seven SSN checks; failures set ``badssn = "Y"`` and count
+  as errors. SSNs are stored as ``%09d`` strings.
+- 1000 FORMAT_DATES_STRINGS: timestamp suffixes are stripped, known invalid
+  dates cleared, and MDY/YMD/Y-M-D strings parsed; an unparseable date is
+  cleared and counts as a warning.
+
+CALC_COMPENSATION has no kernel: its formula is compiled per plan, so it runs
+through ``CompensationCalcService`` as its own column pass. Per-schema
+destring settings, multi-instance sums, DMY date overrides and the sequence
+SSN for missing SSNs need the vendor schema or row position, so the full
+services keep those.
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import date, datetime
+from decimal import InvalidOperation
+from typing import Any
+
+from bluestar.agents.orchestrator.step_fusion import ROW_ERROR, ROW_WARNING, RowKernel
+from bluestar.models.payroll_batch import FIXED_POINT_FIELDS, RECORD_FIELDS, to_cents
+from bluestar.models.payroll_record import CanonicalPayrollRecord
+
+# Template defaults for nulls; dates stay null.
+_TEMPLATE: dict[str, Any] = {
+    name: 0 if name in FIXED_POINT_FIELDS else info.default
+    for name, info in CanonicalPayrollRecord.model_fields.items()
+    if info.default is not None
+}
+
+V_VARIABLE = re.compile(r"v\d+")
+
+AMOUNT_FIELDS: tuple[str, ...] = tuple(sorted(FIXED_POINT_FIELDS))
+DESTRING_IGNORE_CHARS = frozenset("$, *xX")
+
+SSN_IGNORE_CHARS = frozenset("-. \u00a0*xX")
+INVALID_SSNS: frozenset[int] = frozenset({
+    123456789, 12345678, 1234567, 987654321, 876543210, 0,
+    111111111, 222222222, 333333333, 444444444, 555555555, 666666666, 777777777, 888888888, 999999999,
+})
+
+DATE_FIELDS: tuple[str, ...] = ("dob", "doh", "dot", "dor")
+TIMESTAMP_SUFFIXES: tuple[str, ...] = (" 12:00:00 AM", " 00:00:00.000", " 0:00")
+_TERM_INVALID = frozenset({"01/01/1900", "00/00/0000", "N/A", "NA", "/  /", "//", "0/0/0000", "01/01/0001"})
+INVALID_DATES: dict[str, frozenset[str]] = {
+    "dob": frozenset({"0/0/0000", "01/01/0001"}),
+    "doh": frozenset({"0/0/0000"}),
+    "dot": _TERM_INVALID,
+    "dor": _TERM_INVALID,
+}
+DATE_FORMATS: tuple[str, ...] = ("%m/%d/%Y", "%Y%m%d", "%Y-%m-%d")
+
+
+def merge_payroll_fields(row: dict[str, Any]) -> None:
+    for name, default in _TEMPLATE.items():
+        if row[name] is None:
+            row[name] = default
+
+
+def is_v_variable(name: str) -> bool:
+    return V_VARIABLE.fullmatch(name) is not None
+
+
+def drop_v_variables(row: dict[str, Any]) -> None:
+    """No per-row work; the planner drops the ``v`` columns before the pass."""
+
+
+def destring_amount(value: Any) -> int | None:
+    """Integer cents for a raw amount, or ``None`` if it does not parse."""
+    if value is None or isinstance(value, int):
+        return value or 0
+    if not isinstance(value, str):
+        return to_cents(value)
+    text = "".join(ch for ch in value if ch not in DESTRING_IGNORE_CHARS)
+    negative = text.startswith("(") and text.endswith(")")
+    if negative:
+        text = text[1:-1]
+    elif text.endswith("-"):  # trailing negative, moved to the front before conversion
+        negative, text = True, text[:-1]
+    if not text:
+        return 0
+    try:
+        cents = to_cents(text)
+    except InvalidOperation:
+        return None
+    return -cents if negative else cents
+
+
+def destring_numbers(row: dict[str, Any]) -> str | None:
+    outcome = None
+    for name in AMOUNT_FIELDS:
+        cents = destring_amount(row[name])
+        if cents is None:
+            cents, outcome = 0, ROW_WARNING
+        row[name] = cents
+    return outcome
+
+
+def strip_ssn(value: Any) -> str:
+    return "".join(ch for ch in str(value or "") if ch not in SSN_IGNORE_CHARS)
+
+
+def format_ssn(cleaned: str) -> str:
+    """``%09d`` for a numeric SSN; anything else is left as cleaned."""
+    return cleaned.zfill(9) if cleaned.isdigit() else cleaned
+
+
+def is_bad_ssn(cleaned: str) -> bool:
+    """The BadSSNs.do checks on an SSN with the cleaning characters stripped."""
+    if not cleaned.isdigit() or not 7 <= len(cleaned) <= 9:
+        return True
+    number = int(cleaned)
+    return number < 999999 or cleaned[-6:-4] == "00" or cleaned[-4:] == "0000" or number in INVALID_SSNS
+
+
+def bad_ssn(row: dict[str, Any]) -> str | None:
+    cleaned = strip_ssn(row["ssn"])
+    bad = is_bad_ssn(cleaned)
+    row["ssn"] = format_ssn(cleaned)
+    row["badssn"] = "Y" if bad else ""
+    return ROW_ERROR if bad else None
+
+
+def parse_date(field: str, value: Any) -> date | None:
+    """A cleaned date, or ``None`` for a null or known-invalid value; raises ``ValueError`` if unparseable."""
+    if value is None or isinstance(value, date):
+        return value
+    text = str(value).strip()
+    for suffix in TIMESTAMP_SUFFIXES:
+        text = text.removesuffix(suffix)
+    if not text or text in INVALID_DATES.get(field, ()):
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unparseable {field} {text!r}")
+
+
+def format_dates_strings(row: dict[str, Any]) -> str | None:
+    outcome = None
+    for name in DATE_FIELDS:
+        try:
+            row[name] = parse_date(name, row[name])
+        except ValueError:
+            row[name], outcome = None, ROW_WARNING
+    if row["dor"] is not None and row["dor"] == row["doh"]:
+        row["dor"] = None  # not a true rehire
+    row["ssn"] = format_ssn(strip_ssn(row["ssn"]))
+    return outcome
+
+
+DEFAULT_KERNELS: dict[str, RowKernel] = {
+    "MERGE_PAYROLL_FIELDS": RowKernel(merge_payroll_fields, reads=RECORD_FIELDS, writes=RECORD_FIELDS, cost=2),
+    "DROP_V_VARIABLES": RowKernel(drop_v_variables, reads=(), drops=is_v_variable, cost=0),
+    "DESTRING_NUMBERS": RowKernel(destring_numbers, reads=AMOUNT_FIELDS, writes=AMOUNT_FIELDS, cost=3),
+    "BAD_SSN": RowKernel(bad_ssn, reads=("ssn",), writes=("ssn", "badssn")),
+    "FORMAT_DATES_STRINGS": RowKernel(
+        format_dates_strings, reads=("ssn", *DATE_FIELDS), writes=("ssn", *DATE_FIELDS), cost=2
+    ),
+}
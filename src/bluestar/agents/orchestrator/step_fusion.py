@@ -0,0 +1,172 @@
+"""Step fusion — consecutive row-local steps run as one pass over the batch.
+
+Many adjacent steps (MERGE_PAYROLL_FIELDS, DROP_V_VARIABLES, DESTRING_NUMBERS,
+CALC_COMPENSATION, BAD_SSN, FORMAT_DATES_STRINGS, ...) are per-row maps over
+the same records. When each has a registered ``RowKernel`` (the built-in
+ones are ``row_kernels.DEFAULT_KERNELS``), the planner collapses a run of
+them, in step order, into a single fused graph node. A step joins the run
+only if it belongs to the same agent as the run, so the fused node is still
+scheduled under that agent's concurrency limit, and only if everything it
+depends on is in the run or comes before it, so fusing never changes what a
+step can see. Disabled steps in between do not break a run.
+
+The fused pass visits each row once and applies every kernel in step order.
+It still reports one result per logical step (record count, error and warning
+counts, and its cost-weighted share of the pass duration), so the executor
+records a ``StepState`` per step.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from bluestar.agents.orchestrator.pipeline_executor import PipelineGraph
+from bluestar.models.payroll_batch import PayrollBatch
+from bluestar.models.pipeline import PipelineStep
+
+FUSED_PREFIX = "FUSED:"
+
+logger = logging.getLogger(__name__)
+
+ROW_ERROR = "error"
+ROW_WARNING = "warning"
+
+
+@dataclass(frozen=True, slots=True)
+class RowKernel:
+    """A row-local step.
+
+    ``fn`` updates the row dict in place and may return ``ROW_ERROR`` or
+    ``ROW_WARNING``. Only ``reads`` and ``writes`` columns are in the row;
+    ``writes`` are stored back. ``cost`` weights the step's share of the pass.
+    Batch columns matching ``drops`` are removed before the pass unless a
+    kernel in the run reads or writes them.
+    """
+
+    fn: Callable[[dict[str, Any]], str | None]
+    reads: tuple[str, ...]
+    writes: tuple[str, ...] = ()
+    cost: int = 1
+    drops: Callable[[str], bool] | None = None
+
+
+class StepFusionPlanner:
+    """Find fusible runs in a pipeline graph and execute them in one pass."""
+
+    def __init__(self, kernels: Mapping[str, RowKernel], timer: Callable[[], float] = time.perf_counter) -> None:
+        self._kernels = dict(kernels)
+        self._timer = timer
+
+    def groups(self, graph: PipelineGraph) -> list[tuple[int, ...]]:
+        """Runs of two or more consecutive enabled row-local steps of one agent."""
+        groups: list[tuple[int, ...]] = []
+        current: list[int] = []
+        for order in sorted(graph.steps):
+            step = graph.steps[order]
+            if not step.enabled:
+                continue
+            fusible = step.subroutine_name in self._kernels and order not in graph.members
+            if (
+                fusible
+                and current
+                and step.agent == graph.steps[current[0]].agent
+                and all(d in current or d < current[0] for d in graph.deps[order])
+            ):
+                current.append(order)
+                continue
+            if len(current) > 1:
+                groups.append(tuple(current))
+            current = [order] if fusible else []
+        if len(current) > 1:
+            groups.append(tuple(current))
+        return groups
+
+    def fuse(self, graph: PipelineGraph) -> PipelineGraph:
+        """A graph where each fusible run is a single node."""
+        groups = self.groups(graph)
+        if not groups:
+            return graph
+        node_of = {m: group[0] for group in groups for m in group}
+        leaders = {group[0]: group for group in groups}
+
+        steps: dict[int, PipelineStep] = {}
+        deps: dict[int, tuple[int, ...]] = {}
+        members = dict(graph.members)
+        for order, step in graph.steps.items():
+            node = node_of.get(order, order)
+            if node != order:
+                continue
+            group = leaders.get(order, (order,))
+            needs = {node_of.get(d, d) for m in group for d in graph.deps[m]} - {node}
+            deps[node] = tuple(sorted(needs))
+            if len(group) == 1:
+                steps[node] = step
+                continue
+            fused = tuple(graph.steps[m] for m in group)
+            names = [s.subroutine_name for s in fused]
+            steps[node] = PipelineStep(
+                step_order=node,
+                subroutine_name=FUSED_PREFIX + "+".join(names),
+                agent=step.agent,
+                required=any(s.required for s in fused),
+                parameters={"fused_steps": names},
+            )
+            members[node] = fused
+        return PipelineGraph.link(steps, deps, members)
+
+    def run(self, batch: PayrollBatch, names: Sequence[str]) -> list[dict[str, Any]]:
+        """Apply the named kernels in one pass; returns per-step results in order."""
+        kernels = [self._kernels[name] for name in names]
+        columns = list(dict.fromkeys(c for k in kernels for c in (*k.reads, *k.writes)))
+        for name, kernel in zip(names, kernels):
+            if kernel.drops is not None:
+                self._drop_columns(batch, name, kernel.drops, frozenset(columns))
+        n = len(batch)
+        data = {
+            c: batch.column(c) if batch.has_column(c) else batch.add_column(c, [None] * n)
+            for c in columns
+        }
+        writes = [(c, data[c]) for c in dict.fromkeys(c for k in kernels for c in k.writes)]
+        fns = [k.fn for k in kernels]
+        errors = [0] * len(kernels)
+        warnings = [0] * len(kernels)
+
+        started = self._timer()
+        items = list(data.items())
+        for i in range(n):
+            row = {c: col[i] for c, col in items}
+            for k, fn in enumerate(fns):
+                outcome = fn(row)
+                if outcome == ROW_ERROR:
+                    errors[k] += 1
+                elif outcome == ROW_WARNING:
+                    warnings[k] += 1
+            for c, col in writes:
+                col[i] = row[c]
+        elapsed_ms = (self._timer() - started) * 1000
+
+        total_cost = sum(k.cost for k in kernels) or 1
+        return [
+            {
+                "subroutine_name": name,
+                "record_count": n,
+                "error_count": errors[k],
+                "warning_count": warnings[k],
+                "duration_ms": int(elapsed_ms * kernel.cost / total_cost),
+            }
+            for k, (name, kernel) in enumerate(zip(names, kernels))
+        ]
+
+    @staticmethod
+    def _drop_columns(
+        batch: PayrollBatch, step: str, drops: Callable[[str], bool], keep: frozenset[str]
+    ) -> None:
+        dropped = [c for c in batch.columns if c not in keep and drops(c)]
+        for c in dropped:
+            del batch.columns[c]
+        if dropped:
+            logger.warning("%s dropped columns %s; the file may have shifted columns", step, dropped)
@@ -1,11 +1,363 @@
-"""WorkflowStateManager — tracks execution state for batches and steps."""
+"""WorkflowStateManager — tracks execution state for batches and steps.
+
+State lives in ``bluestar-processing-metadata`` (PK=BATCH#{batchId},
+SK=STEP#{stepOrder:04d} or STATE) and is mirrored to Redis as
+``session:{batchId}:state`` for four hours.
+
+Transitions are checked against the batch and step state machines as they
+arrive, applied to an in-memory view, and written through to Redis at once.
+DynamoDB writes are coalesced: an item's transitions within
+``coalesce_window`` seconds collapse into one update (DISPATCHED→PROCESSING→
+COMPLETED becomes a single write of COMPLETED), and each batch's buffered
+items are flushed in their own ``TransactWriteItems`` call. Each update is
+conditional on the status the item had before the coalesced chain began, so a
+concurrent writer makes that batch's transaction fail instead of being
+overwritten; the failure is raised only to callers working on that batch, and
+other batches' writes go ahead. A terminal batch status flushes immediately
+and then drops the batch's in-memory view.
+
+``get_batch_state`` reads the in-memory view, then Redis, then DynamoDB.
+"""
 
 from __future__ import annotations
 
-# TODO: Implement WorkflowStateManager
-# - DynamoDB table: bluestar-processing-metadata (PK=BATCH#{batchId}, SK=STEP#{stepOrder} or STATE)
-# - State machine: RECEIVED→PROCESSING→COMPLETED|FAILED|ESCALATED (batch)
-#                  PENDING→DISPATCHED→PROCESSING→COMPLETED|FAILED|SKIPPED (step)
-# - Redis cache: session:{batchId}:state / 4 hr TTL
-# - Conditional writes for atomic state transitions
-# - Resume-from-failure: skip COMPLETED steps on restart
+import asyncio
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+
+import boto3
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+from bluestar.agents.clock import SystemClock
+from bluestar.core.exceptions import BlueStarError, StateTransitionError
+from bluestar.core.protocols import ICacheBackend, IClock
+from bluestar.models.pipeline import BatchStatus, StepStatus
+
+METADATA_TABLE = "bluestar-processing-metadata"
+SESSION_TTL = 4 * 3600
+COALESCE_WINDOW = 0.25  # seconds
+MAX_TRANSACT_ITEMS = 100
+
+STATE_SK = "STATE"
+
+BATCH_TRANSITIONS: dict[str, frozenset[str]] = {
+    BatchStatus.RECEIVED: frozenset({BatchStatus.PROCESSING, BatchStatus.FAILED, BatchStatus.ESCALATED}),
+    BatchStatus.PROCESSING: frozenset({BatchStatus.COMPLETED, BatchStatus.FAILED, BatchStatus.ESCALATED}),
+    BatchStatus.FAILED: frozenset({BatchStatus.PROCESSING, BatchStatus.ESCALATED}),  # restart
+    BatchStatus.ESCALATED: frozenset({BatchStatus.PROCESSING}),  # released by review
+    BatchStatus.COMPLETED: frozenset(),
+}
+
+STEP_TRANSITIONS: dict[str, frozenset[str]] = {
+    StepStatus.PENDING: frozenset({StepStatus.DISPATCHED, StepStatus.SKIPPED}),
+    StepStatus.DISPATCHED: frozenset({StepStatus.PROCESSING, StepStatus.COMPLETED, StepStatus.FAILED}),
+    StepStatus.PROCESSING: frozenset({StepStatus.COMPLETED, StepStatus.FAILED}),
+    StepStatus.FAILED: frozenset({StepStatus.DISPATCHED}),  # restart
+    StepStatus.COMPLETED: frozenset({StepStatus.DISPATCHED}),  # re-run when newer than the resume checkpoint
+    StepStatus.SKIPPED: frozenset(),
+}
+
+_TERMINAL_BATCH = frozenset({BatchStatus.COMPLETED, BatchStatus.FAILED, BatchStatus.ESCALATED})
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def step_key(step_order: int) -> str:
+    return f"STEP#{step_order:04d}"
+
+
+def _camel(name: str) -> str:
+    head, *rest = name.split("_")
+    return head + "".join(part.title() for part in rest)
+
+
+def _plain(value: Any) -> Any:
+    """JSON-ready form of a metadata value."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return int(value) if value == int(value) else float(value)
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+def _attribute_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, float):
+        value = Decimal(str(value))
+    return dict(_serializer.serialize(value))
+
+
+@dataclass(slots=True)
+class _PendingWrite:
+    """Coalesced update for one item: ``previous`` is its status before the chain."""
+
+    batch_id: str
+    sk: str
+    previous: str | None
+    attributes: dict[str, Any]
+
+
+class WorkflowStateManager:
+    """``IWorkflowState`` backed by DynamoDB with a Redis session mirror."""
+
+    def __init__(
+        self,
+        client: Any = None,
+        cache: ICacheBackend | None = None,
+        clock: IClock | None = None,
+        table_suffix: str = "",
+        region: str = "us-east-1",
+        endpoint_url: str | None = None,
+        coalesce_window: float = COALESCE_WINDOW,
+    ) -> None:
+        if client is None:
+            kwargs: dict[str, Any] = {"region_name": region}
+            if endpoint_url:
+                kwargs["endpoint_url"] = endpoint_url
+            client = boto3.client("dynamodb", **kwargs)
+        self._client = client
+        self._cache = cache
+        self._clock = clock or SystemClock()
+        self._table = f"{METADATA_TABLE}{table_suffix}"
+        self._window = coalesce_window
+        self._views: dict[str, dict[str, Any]] = {}
+        self._pending: dict[tuple[str, str], _PendingWrite] = {}
+        self._lock = asyncio.Lock()
+        self._flusher: asyncio.Task[None] | None = None
+        self._failures: dict[str, BlueStarError] = {}
+        self.transitions = 0
+        self.items_written = 0
+        self.transactions = 0
+
+    # ---- IWorkflowState ----
+
+    async def get_batch_state(self, batch_id: str) -> dict[str, Any]:
+        """Batch attributes plus ``steps`` (sorted by step order); ``{}`` if unknown."""
+        view = self._views.get(batch_id)
+        if view is None:
+            view = await self._read(batch_id)
+        return self._document(batch_id, view) if view else {}
+
+    async def update_step_state(self, batch_id: str, step_order: int, status: str, **metadata: Any) -> None:
+        view = await self._view(batch_id)
+        current = view["steps"].get(step_order, {})
+        self._check(STEP_TRANSITIONS, current.get("status", StepStatus.PENDING), status, f"step {step_order}")
+        attributes = {"stepOrder": step_order, **self._attributes(status, metadata)}
+        view["steps"][step_order] = {**current, **attributes}
+        self._publish(batch_id)
+        await self._apply(batch_id, step_key(step_order), current.get("status"), attributes)
+
+    async def update_batch_state(self, batch_id: str, status: str, **metadata: Any) -> None:
+        view = await self._view(batch_id)
+        current = view["state"]
+        self._check(BATCH_TRANSITIONS, current.get("status", BatchStatus.RECEIVED), status, "batch")
+        attributes = self._attributes(status, metadata)
+        view["state"] = {**current, **attributes}
+        self._publish(batch_id)
+        await self._apply(batch_id, STATE_SK, current.get("status"), attributes)
+        if status in _TERMINAL_BATCH:
+            await self.flush(batch_id)
+            self.forget(batch_id)
+
+    # ---- Coalescing ----
+
+    async def flush(self, batch_id: str | None = None) -> None:
+        """Write every buffered transition now, one transaction per batch.
+
+        Raises the failure of ``batch_id`` (of any batch when None) if its
+        writes were rejected, now or by an earlier background flush.
+        """
+        await self._write()
+        self._raise_failure(batch_id)
+
+    def forget(self, batch_id: str) -> None:
+        """Drop the in-memory view of a finished batch (Redis and DynamoDB keep it)."""
+        if not any(key[0] == batch_id for key in self._pending):
+            self._views.pop(batch_id, None)
+
+    async def _apply(self, batch_id: str, sk: str, previous: str | None, attributes: dict[str, Any]) -> None:
+        self.transitions += 1
+        pending = self._pending.get((batch_id, sk))
+        if pending is None:
+            self._pending[(batch_id, sk)] = _PendingWrite(batch_id, sk, previous, dict(attributes))
+        else:
+            pending.attributes.update(attributes)
+        if self._window <= 0:
+            await self.flush(batch_id)
+        elif self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self._window)
+        await self._write()
+
+    async def _write(self) -> None:
+        """Flush each batch's buffered items (``MAX_TRANSACT_ITEMS`` per transaction).
+
+        A rejected batch is discarded and its failure parked for its own
+        callers; the remaining batches are still written.
+        """
+        async with self._lock:
+            while self._pending:
+                batch_id = next(iter(self._pending))[0]
+                writes = [w for w in self._pending.values() if w.batch_id == batch_id][:MAX_TRANSACT_ITEMS]
+                for write in writes:
+                    del self._pending[(write.batch_id, write.sk)]
+                try:
+                    await asyncio.to_thread(self._transact, writes)
+                except BlueStarError as exc:
+                    self._discard(batch_id)
+                    self._failures[batch_id] = exc
+                    continue
+                self.transactions += 1
+                self.items_written += len(writes)
+
+    def _raise_failure(self, batch_id: str | None) -> None:
+        if batch_id is None:
+            batch_id = next(iter(self._failures), None)
+        failure = self._failures.pop(batch_id, None) if batch_id is not None else None
+        if failure is not None:
+            raise failure
+
+    def _discard(self, batch_id: str) -> None:
+        """After a rejected write our view of the batch is stale; reread it from DynamoDB."""
+        for key in [k for k in self._pending if k[0] == batch_id]:
+            del self._pending[key]
+        self._views.pop(batch_id, None)
+        if self._cache is not None:
+            self._cache.delete(self._session_key(batch_id))
+
+    # ---- DynamoDB ----
+
+    def _transact(self, writes: list[_PendingWrite]) -> None:
+        items = [self._update_item(w) for w in writes]
+        try:
+            self._client.transact_write_items(TransactItems=items)
+        except ClientError as exc:
+            code = exc.response.get("Error", {}).get("Code", "")
+            keys = ", ".join(f"{w.batch_id}/{w.sk}" for w in writes)
+            if code in ("TransactionCanceledException", "ConditionalCheckFailedException"):
+                raise StateTransitionError(f"Conditional state write rejected for {keys}: {exc}") from exc
+            raise BlueStarError(f"DynamoDB transact_write_items failed for {keys}: {exc}") from exc
+
+    def _update_item(self, write: _PendingWrite) -> dict[str, Any]:
+        names = {"#status": "status"}
+        values: dict[str, Any] = {}
+        assignments = []
+        for i, (name, value) in enumerate(write.attributes.items()):
+            alias = "#status" if name == "status" else f"#a{i}"
+            names[alias] = name
+            values[f":a{i}"] = _attribute_value(value)
+            assignments.append(f"{alias} = :a{i}")
+        if write.previous is None:
+            condition = "attribute_not_exists(#status)"
+        else:
+            condition = "#status = :previous"
+            values[":previous"] = _attribute_value(write.previous)
+        return {
+            "Update": {
+                "TableName": self._table,
+                "Key": {"PK": {"S": f"BATCH#{write.batch_id}"}, "SK": {"S": write.sk}},
+                "UpdateExpression": "SET " + ", ".join(assignments),
+                "ConditionExpression": condition,
+                "ExpressionAttributeNames": names,
+                "ExpressionAttributeValues": values,
+            }
+        }
+
+    def _query(self, batch_id: str) -> list[dict[str, Any]]:
+        kwargs: dict[str, Any] = {
+            "TableName": self._table,
+            "KeyConditionExpression": "PK = :pk",
+            "ExpressionAttributeValues": {":pk": {"S": f"BATCH#{batch_id}"}},
+            "ConsistentRead": True,
+        }
+        items: list[dict[str, Any]] = []
+        try:
+            while True:
+                resp = self._client.query(**kwargs)
+                items.extend(
+                    {k: _plain(_deserializer.deserialize(v)) for k, v in item.items()}
+                    for item in resp.get("Items", [])
+                )
+                if "LastEvaluatedKey" not in resp:
+                    return items
+                kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+        except ClientError as exc:
+            raise BlueStarError(f"DynamoDB query failed for {self._table}, batch {batch_id!r}: {exc}") from exc
+
+    # ---- Views ----
+
+    async def _view(self, batch_id: str) -> dict[str, Any]:
+        """The batch's writable view, loaded from DynamoDB so conditions match what is stored."""
+        self._raise_failure(batch_id)
+        view = self._views.get(batch_id)
+        if view is None:
+            view = await self._read(batch_id, cached=False) or {"state": {}, "steps": {}}
+            self._views[batch_id] = view
+        return view
+
+    async def _read(self, batch_id: str, cached: bool = True) -> dict[str, Any] | None:
+        """Redis first (unless ``cached`` is false), then DynamoDB, which repopulates Redis."""
+        if cached and self._cache is not None:
+            session = self._cache.get(self._session_key(batch_id))
+            if session is not None:
+                doc = json.loads(session)
+                steps = {int(s["stepOrder"]): s for s in doc.pop("steps", [])}
+                doc.pop("batchId", None)
+                return {"state": doc, "steps": steps}
+        items = await asyncio.to_thread(self._query, batch_id)
+        if not items:
+            return None
+        view: dict[str, Any] = {"state": {}, "steps": {}}
+        for item in items:
+            sk = item.pop("SK")
+            item.pop("PK", None)
+            if sk == STATE_SK:
+                view["state"] = item
+            else:
+                view["steps"][int(item["stepOrder"])] = item
+        if self._cache is not None:
+            self._cache.setex(self._session_key(batch_id), SESSION_TTL, json.dumps(self._document(batch_id, view)))
+        return view
+
+    def _publish(self, batch_id: str) -> None:
+        if self._cache is not None:
+            doc = self._document(batch_id, self._views[batch_id])
+            self._cache.setex(self._session_key(batch_id), SESSION_TTL, json.dumps(doc))
+
+    @staticmethod
+    def _document(batch_id: str, view: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "batchId": batch_id,
+            **view["state"],
+            "steps": [dict(view["steps"][o]) for o in sorted(view["steps"])],
+        }
+
+    @staticmethod
+    def _session_key(batch_id: str) -> str:
+        return f"session:{batch_id}:state"
+
+    def _attributes(self, status: str, metadata: dict[str, Any]) -> dict[str, Any]:
+        attributes = {_camel(k): _plain(v) for k, v in metadata.items() if v is not None}
+        attributes["status"] = _plain(status)
+        attributes["updatedAt"] = self._clock.now().isoformat()
+        return attributes
+
+    @staticmethod
+    def _check(transitions: dict[str, frozenset[str]], current: str, status: str, what: str) -> None:
+        if status == current:
+            return
+        if status not in transitions.get(current, frozenset()):
+            raise StateTransitionError(f"Invalid {what} transition {current} -> {status}")
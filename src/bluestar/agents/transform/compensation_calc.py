@@ -1,8 +1,157 @@
-"""CompensationCalcService — step 0600 CALC_COMPENSATION."""
+"""CompensationCalcService — step 0600 CALC_COMPENSATION.
+
+Each client's ``compensationFormula`` is compiled into a column plan — an
+ordered list of adjustments followed by a column sum for each of plancomp,
+matchcomp and ercomp. The service caches compiled plans by (plan_id,
+pay_freq, formula content) for the rules-store TTL, so an edited formula is
+picked up even if its version is unchanged. Evaluation is one pass over the
+batch.
+
+Adjustments are applied in order before the sums, e.g.
+``{"target": "salary", "op": "subtract", "source": "exclcomp"}`` then
+``{"target": "bonus", "op": "add", "source": "exclcomp"}``. ``amount`` may be
+given instead of ``source`` for a constant. Extra source columns hold integer
+cents like the canonical money fields; an adjustment whose source column is
+missing from the batch raises ``PipelineError`` rather than reading as zero.
+"""
 
 from __future__ import annotations
 
-# TODO: Implement compensation calculation
-# Read compensationFormula from client config
-# Default: plancomp = matchcomp = ercomp = salary + bonus + commissions + overtime
-# Custom formulas per client (exclude components, custom adjustments)
+import hashlib
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+from bluestar.agents.clock import SystemClock
+from bluestar.core.exceptions import PipelineError
+from bluestar.core.protocols import IClock, IRulesStore
+from bluestar.models.payroll_batch import FIXED_POINT_FIELDS, PayrollBatch, to_cents
+from bluestar.models.rules import CompensationFormula
+
+COMP_OUTPUTS: tuple[str, ...] = ("plancomp", "matchcomp", "ercomp")
+FORMULA_CACHE_TTL = timedelta(hours=1)
+
+_SIGNS = {"add": 1, "subtract": -1}
+
+
+@dataclass(frozen=True, slots=True)
+class Adjustment:
+    """``target = target ± (source | amount)`` on integer-cent columns."""
+
+    target: str
+    sign: int
+    source: str | None = None
+    amount: int = 0
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledCompFormula:
+    """A compensation formula resolved to column names and integer operations."""
+
+    plan_id: str
+    version: int
+    adjustments: tuple[Adjustment, ...]
+    components: dict[str, tuple[str, ...]]
+
+    def evaluate(self, batch: PayrollBatch) -> None:
+        """Apply the adjustments and write plancomp/matchcomp/ercomp in place."""
+        n = len(batch)
+        zeros = [0] * n
+        for adj in self.adjustments:
+            target = batch.column(adj.target)
+            if adj.source is not None:
+                src = batch.columns.get(adj.source)
+                if src is None:
+                    raise PipelineError(
+                        f"Compensation adjustment for {self.plan_id} needs column {adj.source!r}, "
+                        "which the batch does not have"
+                    )
+                batch.columns[adj.target] = [t + adj.sign * s for t, s in zip(target, src)]
+            else:
+                delta = adj.sign * adj.amount
+                batch.columns[adj.target] = [t + delta for t in target]
+
+        # Distinct component sets are summed once each, in a single scan.
+        distinct = list(dict.fromkeys(self.components.values()))
+        fields = list(dict.fromkeys(f for comps in distinct for f in comps))
+        cols = [batch.columns.get(f, zeros) for f in fields]
+        index = [[fields.index(f) for f in comps] for comps in distinct]
+        sums: list[list[int]] = [[] for _ in distinct]
+        for row in zip(*cols) if cols else ((),) * n:
+            for out, idx in zip(sums, index):
+                out.append(sum(row[i] for i in idx))
+        for name, comps in self.components.items():
+            batch.columns[name] = list(sums[distinct.index(comps)])
+
+
+def compile_formula(plan_id: str, formula: CompensationFormula) -> CompiledCompFormula:
+    """Resolve a formula's names and operations once; raises on unknown operations."""
+    adjustments = []
+    for spec in formula.custom_adjustments:
+        op = str(spec.get("op", "")).lower()
+        if op not in _SIGNS or not spec.get("target"):
+            raise ValueError(f"Unsupported compensation adjustment for {plan_id}: {spec}")
+        source = spec.get("source")
+        adjustments.append(
+            Adjustment(
+                target=spec["target"],
+                sign=_SIGNS[op],
+                source=source,
+                amount=0 if source else to_cents(spec.get("amount", 0)),
+            )
+        )
+    components = dict(zip(COMP_OUTPUTS, (
+        tuple(formula.plancomp_components),
+        tuple(formula.matchcomp_components),
+        tuple(formula.ercomp_components),
+    )))
+    for comps in components.values():
+        unknown = [c for c in comps if c not in FIXED_POINT_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown compensation components for {plan_id}: {unknown}")
+    return CompiledCompFormula(plan_id, formula.version, tuple(adjustments), components)
+
+
+class CompensationCalcService:
+    """Compute plancomp/matchcomp/ercomp from the client's compiled formula."""
+
+    def __init__(
+        self, rules_store: IRulesStore, clock: IClock | None = None, ttl: timedelta = FORMULA_CACHE_TTL
+    ) -> None:
+        self._rules = rules_store
+        self._clock = clock or SystemClock()
+        self._ttl = ttl
+        self._compiled: dict[tuple[str, str, str], tuple[datetime, CompiledCompFormula]] = {}
+
+    def compiled(self, plan_id: str, pay_freq: str, formula: CompensationFormula) -> CompiledCompFormula:
+        """Compiled plan for this formula content, recompiled after the cache TTL."""
+        digest = hashlib.sha256(formula.model_dump_json().encode()).hexdigest()
+        key = (plan_id, pay_freq, digest)
+        now = self._clock.now()
+        cached = self._compiled.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        plan = compile_formula(plan_id, formula)
+        self._compiled = {k: v for k, v in self._compiled.items() if v[0] > now}
+        self._compiled[key] = (now + self._ttl, plan)
+        return plan
+
+    def clear_cache(self) -> None:
+        self._compiled.clear()
+
+    def load_formula(self, plan_id: str, pay_freq: str) -> CompensationFormula:
+        config: Mapping[str, Any] = self._rules.get_client_config(plan_id, pay_freq)
+        return CompensationFormula.model_validate(config.get("compensationFormula") or {})
+
+    def execute(
+        self,
+        batch: PayrollBatch,
+        plan_id: str,
+        pay_freq: str = "",
+        formula: CompensationFormula | None = None,
+    ) -> int:
+        """Calculate compensation in place; returns the number of records."""
+        formula = formula or self.load_formula(plan_id, pay_freq)
+        self.compiled(plan_id, pay_freq, formula).evaluate(batch)
+        return len(batch)
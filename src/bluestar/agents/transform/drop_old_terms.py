@@ -0,0 +1,32 @@
+"""DropOldTermsService — step 1400 DROP_OLD_TERMS.
+
+Removes fully-terminated employees: no salary, no hours, all 12 contribution
+sources zero and a termination date more than 180 days before the payroll
+date. Rows are dropped lazily through the batch's selection vector.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from bluestar.models.payroll_batch import CONTRIBUTION_FIELDS, PayrollBatch
+
+DEFAULT_TERM_DAYS = 180
+
+
+class DropOldTermsService:
+    """Filter stage over the physical columns; never copies the batch."""
+
+    def __init__(self, days: int = DEFAULT_TERM_DAYS) -> None:
+        self._days = days
+
+    def execute(self, batch: PayrollBatch, payroll_date: date) -> int:
+        """Deselect old terms; returns the number of rows dropped."""
+        cutoff = payroll_date - timedelta(days=self._days)
+        keep = [
+            t is None or t >= cutoff or s != 0 or h != 0
+            for t, s, h in zip(batch.raw_column("dot"), batch.raw_column("salary"), batch.raw_column("hours"))
+        ]
+        for field in CONTRIBUTION_FIELDS:
+            keep = [k or v != 0 for k, v in zip(keep, batch.raw_column(field))]
+        return batch.select(keep)
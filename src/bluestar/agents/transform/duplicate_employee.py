@@ -1,7 +1,116 @@
-"""DuplicateEmployeeService — step 1300 (subroutine-DuplicateEmployees.do)."""
+"""DuplicateEmployeeService — step 1300 (subroutine-DuplicateEmployees.do).
+
+Single-pass hash aggregation over the columnar batch. Rows are grouped by a
+configurable key (planid+ssn by default, ssn alone with ``MEP_GROUP_KEY``);
+the financial fields are summed as integer cents, dob/doh take the MIN,
+dot/dor take the MAX (a null dot in any row means the employee is active). The
+surviving row is the first in the Stata sort order ``+dot +salaryiszero
++skipexcleecoding -holdtotalcomp`` within the group, where a null dot sorts
+last like a Stata missing value.
+"""
 
 from __future__ import annotations
 
-# TODO: Implement duplicate consolidation
-# Tag duplicates by planid+ssn, aggregate financial fields (SUM),
-# MIN for dob/doh, MAX for dot/dor, keep row with non-zero salary + highest comp
+from collections.abc import Sequence
+from datetime import date
+from typing import Any
+
+from bluestar.models.payroll_batch import COMP_FIELDS, CONTRIBUTION_FIELDS, PayrollBatch
+
+DEFAULT_GROUP_KEY: tuple[str, ...] = ("planid", "ssn")
+MEP_GROUP_KEY: tuple[str, ...] = ("ssn",)
+
+SUM_FIELDS: tuple[str, ...] = (
+    "hours", *COMP_FIELDS, "plancomp", "matchcomp", "ercomp", "grosscomp", "annualcomp", *CONTRIBUTION_FIELDS,
+)
+MIN_DATE_FIELDS: tuple[str, ...] = ("dob", "doh")
+MAX_DATE_FIELDS: tuple[str, ...] = ("dot", "dor")
+
+
+def _min_date(a: date | None, b: date | None) -> date | None:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+def _max_date(a: date | None, b: date | None) -> date | None:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b)
+
+
+class DuplicateEmployeeService:
+    """Consolidate duplicate employees in one pass over the batch."""
+
+    def __init__(self, group_key: Sequence[str] = DEFAULT_GROUP_KEY) -> None:
+        self._group_key = tuple(group_key)
+
+    @property
+    def group_key(self) -> tuple[str, ...]:
+        return self._group_key
+
+    def execute(self, batch: PayrollBatch) -> int:
+        """Consolidate duplicates in place; return the number of rows removed."""
+        n = len(batch)
+        key_cols = [batch.column(c) for c in self._group_key]
+        keys = list(zip(*key_cols)) if len(key_cols) > 1 else key_cols[0]
+
+        # Fast path: one set-size comparison, no aggregation work.
+        if len(set(keys)) == n:
+            return 0
+
+        sums = {f: batch.column(f) for f in SUM_FIELDS}
+        mins = {f: batch.column(f) for f in MIN_DATE_FIELDS}
+        maxs = {f: batch.column(f) for f in MAX_DATE_FIELDS}
+        salary = batch.column("salary")
+        dot = batch.column("dot")
+        skip = batch.column("skipexcleecoding") if "skipexcleecoding" in batch.columns else [0] * n
+        comp_cols = [batch.column(f) for f in COMP_FIELDS]
+
+        slot_of: dict[Any, int] = {}
+        keeper: list[int] = []
+        keeper_rank: list[tuple[bool, date, bool, Any, int]] = []
+        acc_sum: dict[str, list[int]] = {f: [] for f in SUM_FIELDS}
+        acc_min: dict[str, list[date | None]] = {f: [] for f in MIN_DATE_FIELDS}
+        acc_max: dict[str, list[date | None]] = {f: [] for f in MAX_DATE_FIELDS}
+        active: list[bool] = []  # any row in the group has a null dot
+
+        for i, key in enumerate(keys):
+            rank = (
+                dot[i] is None, dot[i] or date.max, salary[i] == 0, skip[i] or 0, -sum(col[i] for col in comp_cols),
+            )
+            slot = slot_of.get(key)
+            if slot is None:
+                slot_of[key] = len(keeper)
+                keeper.append(i)
+                keeper_rank.append(rank)
+                for f, col in sums.items():
+                    acc_sum[f].append(col[i])
+                for f, col in mins.items():
+                    acc_min[f].append(col[i])
+                for f, col in maxs.items():
+                    acc_max[f].append(col[i])
+                active.append(maxs["dot"][i] is None)
+                continue
+            if rank < keeper_rank[slot]:
+                keeper[slot] = i
+                keeper_rank[slot] = rank
+            for f, col in sums.items():
+                acc_sum[f][slot] += col[i]
+            for f, col in mins.items():
+                acc_min[f][slot] = _min_date(acc_min[f][slot], col[i])
+            for f, col in maxs.items():
+                acc_max[f][slot] = _max_date(acc_max[f][slot], col[i])
+            active[slot] = active[slot] or maxs["dot"][i] is None
+
+        acc_max["dot"] = [None if a else d for a, d in zip(active, acc_max["dot"])]
+        result = batch.take(keeper)
+        result.columns.update(acc_sum)
+        result.columns.update(acc_min)
+        result.columns.update(acc_max)
+        batch.assign(result)
+        return n - len(result)
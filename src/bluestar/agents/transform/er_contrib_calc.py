@@ -1,9 +1,140 @@
-"""ERContribCalcService — step 0800 CALC_ER_CONTRIB (subroutine-calcERamt.do)."""
+"""ERContribCalcService — step 0800 CALC_ER_CONTRIB (subroutine-calcERamt.do).
+
+Flat-rate employer contribution ``ROUND(level1upto * ercomp, 0.01)`` computed
+over the whole batch. Plan entry dates (``PlanEECodeHistExport``) and
+ERContribYTD (source "Ba") are loaded in bulk per plan and hash-joined by SSN;
+``maxEr = MIN(maxErPct * 401a17comp, 415c - 402g)`` is a plan/year constant
+cached by the service instance for the rules-store TTL. Off-calendar plans use
+the prior year for every IRS limit and YTD lookup, as in the match calculation.
+"""
 
 from __future__ import annotations
 
-# TODO: Implement flat-rate ER contribution
-# ercalc = ROUND(level1upto * ercomp, 0.01)
-# Eligibility check: planentry > payroll → ercalc = 0
-# Annual limit check against 415c and 402g limits
-# Target: pshare, shne, or shneqaca
+from collections.abc import Iterable
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from bluestar.agents.clock import SystemClock
+from bluestar.agents.transform.match_calc import (
+    CalcResult,
+    apply_annual_limit,
+    assign_where_zero,
+    limitation_year,
+    load_irs_limits,
+    prefetch_ytd,
+)
+from bluestar.core.protocols import IClock, IRulesStore, ISQLClient
+from bluestar.models.payroll_batch import PayrollBatch, from_cents, mul_cents
+from bluestar.models.rules import ERContribFormula, IRSLimits
+from bluestar.models.util import as_date, ssn_key
+
+ER_CALC_TYPE = "ER_CONTRIBUTION"
+ER_YTD_SOURCE = "Ba"
+
+PLAN_ENTRY_SQL = "SELECT ssn, planentrydate FROM PlanEECodeHistExport WHERE planid = ?"
+
+LIMIT_CACHE_TTL = timedelta(hours=1)
+
+_HUNDRED = Decimal(100)
+
+
+def max_er(formula: ERContribFormula, limits: IRSLimits) -> Decimal:
+    """Annual ER limit in cents: MIN(maxErPct * 401(a)(17) comp, 415(c) - 402(g))."""
+    pct = formula.level1upto / _HUNDRED
+    return min(
+        pct * limits.limit_401a17_comp,
+        limits.limit_415c_defined_contrib - limits.limit_402g_deferral,
+    ) * _HUNDRED
+
+
+class ERContribCalcService:
+    """Batch flat-rate ER contribution with eligibility and annual limit."""
+
+    def __init__(
+        self,
+        rules_store: IRulesStore,
+        sql: ISQLClient,
+        clock: IClock | None = None,
+        ttl: timedelta = LIMIT_CACHE_TTL,
+    ) -> None:
+        self._rules = rules_store
+        self._sql = sql
+        self._clock = clock or SystemClock()
+        self._ttl = ttl
+        self._max_er: dict[tuple[str, int, Decimal], tuple[datetime, Decimal]] = {}
+
+    def load_formula(self, plan_id: str) -> ERContribFormula:
+        """CLIENT → GLOBAL ER formula from the calculation rules table."""
+        return ERContribFormula.model_validate(self._rules.get_calculation_rule(plan_id, ER_CALC_TYPE))
+
+    def plan_limit(
+        self, plan_id: str, year: int, formula: ERContribFormula, limits: IRSLimits | None = None
+    ) -> Decimal:
+        """``maxEr`` for a plan/year.
+
+        Limits passed in explicitly are used as-is; otherwise the value built
+        from the rules store is cached for the TTL.
+        """
+        if limits is not None:
+            return max_er(formula, limits)
+        key = (plan_id, year, formula.level1upto)
+        now = self._clock.now()
+        cached = self._max_er.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        value = max_er(formula, load_irs_limits(self._rules, year))
+        self._max_er = {k: v for k, v in self._max_er.items() if v[0] > now}
+        self._max_er[key] = (now + self._ttl, value)
+        return value
+
+    def clear_cache(self) -> None:
+        self._max_er.clear()
+
+    def load_plan_entry(self, plan_ids: Iterable[str]) -> dict[tuple[str, str], date]:
+        """Most recent plan entry date per (planid, ssn)."""
+        entry: dict[tuple[str, str], date] = {}
+        for plan_id in plan_ids:
+            for row in self._sql.query(PLAN_ENTRY_SQL, (plan_id,)):
+                d = as_date(row.get("planentrydate"))
+                if d is None:
+                    continue
+                key = (plan_id, ssn_key(row["ssn"]))
+                if key not in entry or d > entry[key]:
+                    entry[key] = d
+        return entry
+
+    def execute(
+        self,
+        batch: PayrollBatch,
+        plan_id: str,
+        payroll_date: date,
+        formula: ERContribFormula | None = None,
+        limits: IRSLimits | None = None,
+    ) -> CalcResult:
+        """Calculate the ER contribution and assign it to ``formula.target_field``."""
+        formula = formula or self.load_formula(plan_id)
+        if not formula.enabled or formula.level1upto <= 0:
+            return CalcResult(enabled=False, target_field=formula.target_field)
+
+        planids = batch.column("planid")
+        plans = dict.fromkeys(planids)
+        year = limitation_year(payroll_date, formula.off_calendar_year)
+        entry = self.load_plan_entry(plans)
+        ytd = prefetch_ytd(self._sql, plans, ER_YTD_SOURCE, year)
+
+        rate = formula.level1upto / _HUNDRED
+        eligible = [
+            (d := entry.get((p, ssn_key(s)))) is not None and d <= payroll_date
+            for p, s in zip(planids, batch.column("ssn"))
+        ]
+        calc = [mul_cents(c, rate) if e else 0 for c, e in zip(batch.column("ercomp"), eligible)]
+
+        limit = self.plan_limit(plan_id, year, formula, limits)
+        limited, reductions = apply_annual_limit(batch, calc, limit, ytd, formula.target_field)
+        assigned, total = assign_where_zero(batch, formula.target_field, limited)
+        return CalcResult(
+            target_field=formula.target_field,
+            records_assigned=assigned,
+            total_assigned=from_cents(total),
+            reductions=reductions,
+        )
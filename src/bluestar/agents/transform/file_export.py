@@ -1,9 +1,196 @@
-"""FileExportService — step 2100 EXPORT_FILES (subroutine-exportingfiles.do)."""
+"""FileExportService — step 2100 EXPORT_FILES (subroutine-exportingfiles.do).
+
+Single-scan exporter: every row is encoded to CSV once and the same bytes are
+fanned out to each output it belongs to — PayrollALL (not held) or
+HOLD-PayrollALL (held), BadSSN, Loans and, for multi-planId batches, the
+per-planId files under ``files/``. Each output streams straight to an
+``IFileStore.open_write`` stream (multipart upload on S3), so no file is
+built in memory. Held records are also tallied per planid/clientid/reason
+into the PlanHOLD summary, written after the scan.
+
+The export is all-or-nothing: if the scan or any close fails, the streams
+not yet committed are aborted and the files already committed are deleted.
+
+Old terms (step 1400) are expected to have been deselected already; the
+scan reads only the batch's live rows.
+"""
 
 from __future__ import annotations
 
-# TODO: Implement file export
-# Split by planhold status: PayrollALL (not held), HOLD-PayrollALL (held)
-# Always: BadSSN.csv, Loans.csv
-# Drop old terms (step 1400) before export
-# Multi-planId: per-planId files in files/ subdirectory
+import contextlib
+import csv
+import io
+from collections.abc import Callable
+from datetime import date
+from typing import Any
+
+from bluestar.core.protocols import IFileStore, IFileWriter
+from bluestar.models.outputs import ExportFile
+from bluestar.models.payroll_batch import FIXED_POINT_FIELDS, RECORD_FIELDS, PayrollBatch
+
+CSV_CONTENT_TYPE = "text/csv"
+PLAN_HOLD_FIELDS: tuple[str, ...] = ("planid", "clientid", "planhold", "planholdnote", "records")
+
+
+def _format_cents(cents: int) -> str:
+    sign = "-" if cents < 0 else ""
+    whole, frac = divmod(abs(cents), 100)
+    return f"{sign}{whole}.{frac:02d}"
+
+
+class CsvRowEncoder:
+    """Reusable CSV encoder for batch rows.
+
+    Column formatters are resolved once; dates and repeated values share a
+    per-encoder pool of already-formatted strings, and a single ``csv.writer``
+    over a reused buffer does the quoting.
+    """
+
+    def __init__(self, fields: tuple[str, ...] = RECORD_FIELDS) -> None:
+        self.fields = fields
+        self._pool: dict[Any, str] = {}
+        self._buf = io.StringIO()
+        self._writer = csv.writer(self._buf, lineterminator="\n")
+        self._formatters: list[Callable[[Any], str]] = [
+            self._money if f in FIXED_POINT_FIELDS else self._value for f in fields
+        ]
+
+    def _money(self, cents: int) -> str:
+        return _format_cents(cents)
+
+    def _value(self, value: Any) -> Any:
+        if value is None:
+            return ""
+        if isinstance(value, date):
+            text = self._pool.get(value)
+            if text is None:
+                text = self._pool[value] = value.isoformat()
+            return text
+        return value
+
+    def _encode(self, row: list[Any]) -> bytes:
+        self._buf.seek(0)
+        self._buf.truncate()
+        self._writer.writerow(row)
+        return self._buf.getvalue().encode()
+
+    def header(self) -> bytes:
+        return self._encode(list(self.fields))
+
+    def encode(self, values: tuple[Any, ...]) -> bytes:
+        return self._encode([fmt(v) for fmt, v in zip(self._formatters, values)])
+
+
+class _Output:
+    __slots__ = ("meta", "writer")
+
+    def __init__(self, meta: ExportFile, writer: IFileWriter) -> None:
+        self.meta = meta
+        self.writer = writer
+
+
+class FileExportService:
+    """Stream the batch to all of its export files in one pass."""
+
+    def __init__(self, file_store: IFileStore) -> None:
+        self._files = file_store
+
+    @staticmethod
+    def filename(payroll_date: date, plan_id: str, freq: str, kind: str, held: bool = False) -> str:
+        name = f"{payroll_date.isoformat()} {plan_id}_{freq}_{kind}.csv"
+        return f"HOLD-{name}" if held else name
+
+    def execute(
+        self, batch: PayrollBatch, plan_id: str, freq: str, payroll_date: date, prefix: str = ""
+    ) -> list[ExportFile]:
+        """Write the export files under ``prefix``; returns one ``ExportFile`` per output."""
+        encoder = CsvRowEncoder()
+        header = encoder.header()
+        outputs: dict[str, _Output] = {}
+
+        def output(name: str, out_plan: str, description: str) -> _Output:
+            out = outputs.get(name)
+            if out is None:
+                path = f"{prefix}{name}"
+                writer = self._files.open_write(path, CSV_CONTENT_TYPE)
+                writer.write(header)
+                out = outputs[name] = _Output(
+                    ExportFile(filename=name, file_type="csv", s3_path=path, plan_id=out_plan,
+                               description=description),
+                    writer,
+                )
+            return out
+
+        planids = batch.column("planid")
+        multi_plan = len(set(planids)) > 1
+        try:
+            payroll = output(self.filename(payroll_date, plan_id, freq, "PayrollALL"), plan_id, "Not on hold")
+            bad_ssn = output(self.filename(payroll_date, plan_id, freq, "BadSSN"), plan_id, "badssn == Y")
+            loans = output(self.filename(payroll_date, plan_id, freq, "Loans"), plan_id, "loan > 0")
+
+            cols = [batch.column(f) for f in encoder.fields]
+            clientids = batch.column("clientid")
+            notes = batch.column("planholdnote")
+            hold_summary: dict[tuple[str, str, str, str], int] = {}
+            planhold = batch.column("planhold")
+            badssn = batch.column("badssn")
+            loan = batch.column("loan")
+            for i, values in enumerate(zip(*cols)):
+                targets = []
+                held = planhold[i].startswith("True")
+                if held:
+                    key = (planids[i], clientids[i], planhold[i], notes[i])
+                    hold_summary[key] = hold_summary.get(key, 0) + 1
+                    targets.append(output(
+                        self.filename(payroll_date, plan_id, freq, "PayrollALL", held=True), plan_id, "On hold"
+                    ))
+                else:
+                    targets.append(payroll)
+                if multi_plan:
+                    targets.append(output(
+                        f"files/{self.filename(payroll_date, planids[i], freq, 'PayrollALL', held)}",
+                        planids[i], "On hold" if held else "Not on hold",
+                    ))
+                if badssn[i] == "Y":
+                    targets.append(bad_ssn)
+                if loan[i] > 0:
+                    targets.append(loans)
+
+                line = encoder.encode(values)
+                for out in targets:
+                    out.writer.write(line)
+                    out.meta.record_count += 1
+
+            if hold_summary:
+                summary = CsvRowEncoder(PLAN_HOLD_FIELDS)
+                name = self.filename(payroll_date, plan_id, freq, "PlanHOLD")
+                out = outputs[name] = _Output(
+                    ExportFile(filename=name, file_type="csv", s3_path=f"{prefix}{name}", plan_id=plan_id,
+                               description="Hold reasons"),
+                    self._files.open_write(f"{prefix}{name}", CSV_CONTENT_TYPE),
+                )
+                out.writer.write(summary.header())
+                for key, count in hold_summary.items():
+                    out.writer.write(summary.encode((*key, count)))
+                    out.meta.record_count += 1
+        except BaseException:
+            for out in outputs.values():
+                out.writer.abort()
+            raise
+
+        self._commit(list(outputs.values()))
+        return [out.meta for out in outputs.values()]
+
+    def _commit(self, outputs: list[_Output]) -> None:
+        """Close every stream; on the first failure abort the rest and delete the ones committed."""
+        for n, out in enumerate(outputs):
+            try:
+                out.writer.close()
+            except BaseException:
+                for rest in outputs[n + 1:]:
+                    with contextlib.suppress(Exception):
+                        rest.writer.abort()
+                for done in outputs[:n]:
+                    with contextlib.suppress(Exception):
+                        self._files.delete(done.meta.s3_path)
+                raise
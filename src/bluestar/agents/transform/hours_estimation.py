@@ -1,8 +1,49 @@
-"""HoursEstimationService — step 1500 FIX_HOURS (subroutine-fixinghours.do)."""
+"""HoursEstimationService — step 1500 FIX_HOURS (subroutine-fixinghours.do).
+
+Mask-and-assign kernel over the whole batch: ``hoursComp = salary +
+commissions + overtime`` and ``estimatedHours = hoursComp / 10`` capped by a
+pay-frequency lookup table, applied where hours are missing but comp exists;
+hours are removed from bonus-only rows. Runs on the physical columns, so a
+pending DROP_OLD_TERMS selection is not materialized; the returned counts
+cover only the selected rows.
+"""
 
 from __future__ import annotations
 
-# TODO: Implement hours estimation
-# estimatedHours = hoursComp / 10, capped by payfreq (W:45, B:90, S:95, M:190)
-# Apply only if hours == 0 and hoursComp > 0
-# Bonus-only: remove hours if hoursComp == 0
+from bluestar.models.payroll_batch import PayrollBatch
+
+# Hours cap per pay period, by payfreq code (hours, not cents).
+PAYFREQ_HOURS_CAP: dict[str, int] = {"W": 45, "B": 90, "S": 95, "M": 190}
+DEFAULT_HOURS_CAP = 90
+
+HOURS_COMP_FIELDS: tuple[str, ...] = ("salary", "commissions", "overtime")
+
+
+class HoursEstimationService:
+    """Estimate missing hours and strip hours from bonus-only records."""
+
+    def __init__(self, caps: dict[str, int] | None = None, default_cap: int = DEFAULT_HOURS_CAP) -> None:
+        # Cap lookup in cents, resolved once per service.
+        self._caps = {k: v * 100 for k, v in (caps or PAYFREQ_HOURS_CAP).items()}
+        self._default = default_cap * 100
+
+    def execute(self, batch: PayrollBatch) -> dict[str, int]:
+        """Fix hours in place; returns counts for ``estimated`` and ``bonus_only`` rows."""
+        salary, commissions, overtime = (batch.raw_column(f) for f in HOURS_COMP_FIELDS)
+        hours = batch.raw_column("hours")
+        caps, default = self._caps, self._default
+        cap = [caps.get(f, default) for f in batch.raw_column("payfreq")]
+        comp = [s + c + o for s, c, o in zip(salary, commissions, overtime)]
+
+        estimate = [h == 0 and c > 0 for h, c in zip(hours, comp)]
+        bonus_only = [h > 0 and c == 0 for h, c in zip(hours, comp)]
+        # hoursComp / 10 in cents, rounded half up (comp > 0 wherever it is used)
+        batch.columns["hours"] = [
+            min((c + 5) // 10, m) if e else 0 if b else h
+            for e, b, h, c, m in zip(estimate, bonus_only, hours, comp, cap)
+        ]
+        rows = batch.selection
+        if rows is not None:
+            estimate = [estimate[i] for i in rows]
+            bonus_only = [bonus_only[i] for i in rows]
+        return {"estimated": sum(estimate), "bonus_only": sum(bonus_only)}
@@ -1,13 +1,190 @@
 """MatchCalcService — step 0700 CALC_MATCH (subroutine-calcmatch.do).
 
-Two-tier employer match formula with IRS annual limit check.
+Two-tier employer match formula with IRS annual limit check, run as a
+whole-batch kernel: ERContribYTD (source "Ma") is prefetched for every SSN of
+a plan in one query, the formula is evaluated over the integer-cent columns
+with exact Decimal rates, and the limit clip is applied to the target column.
+
+The deferral rate is never materialized: ``rate > upto`` is evaluated as
+``deferral > upto * matchcomp`` and ``matchcomp * rate`` is the deferral
+itself, so the only rounding is the final ``ROUND(…, 0.01)``.
 """
 
 from __future__ import annotations
 
-# TODO: Implement two-tier match calculation
-# Level 1: deferralRate vs level1upto → matchLevel1
-# Level 2: deferralRate vs level2upto → matchLevel2
-# matchcalc = ROUND(matchLevel1 + matchLevel2, 0.01)
-# Annual limit check: maxMatch - (matchcalc + ytdSourceTotal)
-# Target field: match, shmatch, or shmatchqaca per config
+from collections.abc import Iterable
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+
+from pydantic import BaseModel, Field
+
+from bluestar.core.protocols import IRulesStore, ISQLClient
+from bluestar.models.outputs import LimitReduction
+from bluestar.models.payroll_batch import PayrollBatch, from_cents, to_cents
+from bluestar.models.rules import IRSLimits, MatchFormula
+from bluestar.models.util import ssn_key
+
+MATCH_CALC_TYPE = "MATCH_FORMULA"
+MATCH_YTD_SOURCE = "Ma"
+
+ER_CONTRIB_YTD_SQL = (
+    "SELECT ssn, SUM(amount) AS ytd FROM ERContribYTD "
+    "WHERE planid = ? AND source = ? AND limitationyear = ? GROUP BY ssn"
+)
+
+_HUNDRED = Decimal(100)
+
+
+def _round(value: Decimal) -> int:
+    return int(value.to_integral_value(ROUND_HALF_UP))
+
+
+def limitation_year(payroll_date: date, off_calendar_year: bool) -> int:
+    """IRS limit year: off-calendar plans use the prior calendar year."""
+    return payroll_date.year - 1 if off_calendar_year else payroll_date.year
+
+
+def load_irs_limits(rules: IRSLimits | IRulesStore, year: int) -> IRSLimits:
+    """Validate the bluestar-irs-limits item for ``year``."""
+    if isinstance(rules, IRSLimits):
+        return rules
+    return IRSLimits.model_validate({**rules.get_irs_limits(year), "year": year})
+
+
+def prefetch_ytd(sql: ISQLClient, plan_ids: Iterable[str], source: str, year: int) -> dict[tuple[str, str], int]:
+    """ERContribYTD for every SSN of each plan, one query per plan, as (planid, ssn) → cents."""
+    ytd: dict[tuple[str, str], int] = {}
+    for plan_id in plan_ids:
+        for row in sql.query(ER_CONTRIB_YTD_SQL, (plan_id, source, year)):
+            key = (plan_id, ssn_key(row["ssn"]))
+            ytd[key] = ytd.get(key, 0) + to_cents(row.get("ytd") or 0)
+    return ytd
+
+
+def apply_annual_limit(
+    batch: PayrollBatch,
+    calc: list[int],
+    annual_limit: Decimal,
+    ytd: dict[tuple[str, str], int],
+    target_field: str,
+) -> tuple[list[int], list[LimitReduction]]:
+    """Clip calculated cents to ``annual_limit - ytd`` (never below zero).
+
+    ``annual_limit`` is in cents and may carry fractional cents; the clipped
+    amount is rounded once, matching ``MAX(ROUND(calc + over, 0.01), 0)``.
+    """
+    planids = batch.column("planid")
+    ssns = batch.column("ssn")
+    ytd_col = [ytd.get((p, ssn_key(s)), 0) for p, s in zip(planids, ssns)]
+    over = [c + y > annual_limit for c, y in zip(calc, ytd_col)]
+    limited = [max(_round(annual_limit - y), 0) if o else c for o, c, y in zip(over, calc, ytd_col)]
+    limit_dollars = annual_limit / _HUNDRED
+    reductions = [
+        LimitReduction(
+            plan_id=planids[i],
+            ssn=ssns[i],
+            target_field=target_field,
+            calculated=from_cents(calc[i]),
+            ytd_source_total=from_cents(ytd_col[i]),
+            annual_limit=limit_dollars,
+            applied=from_cents(limited[i]),
+        )
+        for i, o in enumerate(over)
+        if o
+    ]
+    return limited, reductions
+
+
+def assign_where_zero(batch: PayrollBatch, target_field: str, values: list[int]) -> tuple[int, int]:
+    """``replace target = value if target == 0``; returns the records set and the cents assigned to them."""
+    target = batch.column(target_field)
+    mask = [t == 0 and v != 0 for t, v in zip(target, values)]
+    batch.columns[target_field] = [v if m else t for m, t, v in zip(mask, target, values)]
+    return sum(mask), sum(v for m, v in zip(mask, values) if m)
+
+
+class CalcResult(BaseModel):
+    """Outcome of a batch ER calculation step (0700 / 0800)."""
+
+    enabled: bool = True
+    target_field: str = ""
+    records_assigned: int = 0
+    total_assigned: Decimal = Decimal("0")
+    reductions: list[LimitReduction] = Field(default_factory=list)
+
+
+class MatchCalcService:
+    """Batch two-tier match calculation."""
+
+    def __init__(self, rules_store: IRulesStore, sql: ISQLClient) -> None:
+        self._rules = rules_store
+        self._sql = sql
+
+    def load_formula(self, plan_id: str) -> MatchFormula:
+        """CLIENT → GLOBAL match formula from the calculation rules table."""
+        return MatchFormula.model_validate(self._rules.get_calculation_rule(plan_id, MATCH_CALC_TYPE))
+
+    @staticmethod
+    def max_match(formula: MatchFormula, limits: IRSLimits) -> Decimal:
+        """Plan/year annual match limit in cents: maxMatchPct * 401(a)(17) comp."""
+        l1pct, l1upto = formula.level1pct / _HUNDRED, formula.level1upto / _HUNDRED
+        l2pct, l2upto = formula.level2pct / _HUNDRED, formula.level2upto / _HUNDRED
+        pct = l1pct * l1upto
+        if l2pct != 0:
+            pct += l2pct * (l2upto - l1upto)
+        return pct * limits.limit_401a17_comp * _HUNDRED
+
+    @staticmethod
+    def calculate(batch: PayrollBatch, formula: MatchFormula) -> list[int]:
+        """Unlimited ``matchcalc`` in cents for every row."""
+        l1pct, l1upto = formula.level1pct / _HUNDRED, formula.level1upto / _HUNDRED
+        l2pct, l2upto = formula.level2pct / _HUNDRED, formula.level2upto / _HUNDRED
+        tier2 = l2pct != 0 and l2upto != 0
+
+        comp = batch.column("matchcomp")
+        deferral = [d + r for d, r in zip(batch.column("deferral"), batch.column("rothdeferral"))]
+        # Thresholds in cents: rate > upto  <=>  deferral > upto * matchcomp (matchcomp > 0)
+        t1 = [c * l1upto for c in comp]
+        level1 = [
+            Decimal(0) if c <= 0 or d <= 0 else (t * l1pct if d > t else d * l1pct)
+            for c, d, t in zip(comp, deferral, t1)
+        ]
+        if tier2:
+            level2 = [
+                Decimal(0) if c <= 0
+                else c * (l2upto - l1upto) * l2pct if d > c * l2upto
+                else (d - t) * l2pct if d > t
+                else Decimal(0)
+                for c, d, t in zip(comp, deferral, t1)
+            ]
+            return [_round(a + b) for a, b in zip(level1, level2)]
+        return [_round(a) for a in level1]
+
+    def execute(
+        self,
+        batch: PayrollBatch,
+        plan_id: str,
+        payroll_date: date,
+        formula: MatchFormula | None = None,
+        limits: IRSLimits | None = None,
+    ) -> CalcResult:
+        """Calculate match for the batch and assign it to ``formula.target_source``."""
+        formula = formula or self.load_formula(plan_id)
+        if not formula.enabled:
+            return CalcResult(enabled=False, target_field=formula.target_source)
+
+        year = limitation_year(payroll_date, formula.off_calendar_year)
+        limits = load_irs_limits(limits or self._rules, year)
+        ytd = prefetch_ytd(self._sql, dict.fromkeys(batch.column("planid")), MATCH_YTD_SOURCE, year)
+
+        calc = self.calculate(batch, formula)
+        limited, reductions = apply_annual_limit(
+            batch, calc, self.max_match(formula, limits), ytd, formula.target_source
+        )
+        assigned, total = assign_where_zero(batch, formula.target_source, limited)
+        return CalcResult(
+            target_field=formula.target_source,
+            records_assigned=assigned,
+            total_assigned=from_cents(total),
+            reductions=reductions,
+        )
@@ -1,7 +1,24 @@
-"""NegativePayrollService — step 1800 (subroutine-negativepayroll.do)."""
+"""NegativePayrollService — step 1800 (subroutine-negativepayroll.do).
+
+CRITICAL ordering: totals_inclneg (1700) → this (1800) → totals_exclneg (1900).
+``TotalsByPlanService.execute_fused`` performs all three in one scan.
+"""
 
 from __future__ import annotations
 
-# TODO: Implement negative zeroing
-# Zero all 12 contribution fields where value < 0
-# CRITICAL ordering: totals_inclneg (1700) → this (1800) → totals_exclneg (1900)
+from bluestar.models.payroll_batch import CONTRIBUTION_FIELDS, PayrollBatch
+
+
+class NegativePayrollService:
+    """Zero all 12 contribution fields where the value is negative."""
+
+    def execute(self, batch: PayrollBatch) -> int:
+        """Zero negatives in place; return the number of records changed."""
+        changed = [False] * len(batch)
+        for field in CONTRIBUTION_FIELDS:
+            col = batch.column(field)
+            negative = [v < 0 for v in col]
+            if any(negative):
+                batch.columns[field] = [0 if neg else v for neg, v in zip(negative, col)]
+                changed = [c or neg for c, neg in zip(changed, negative)]
+        return sum(changed)
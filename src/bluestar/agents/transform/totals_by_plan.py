@@ -1,8 +1,164 @@
-"""TotalsByPlanService — steps 1700/1900 (subroutine-totalsbyplanid.do)."""
+"""TotalsByPlanService — steps 1700/1900 (subroutine-totalsbyplanid.do).
+
+Collapses the batch by planId (and by planId+identifier for multi-location PEO
+files), summing the 12 contribution fields, and flags ``planidNoPR`` plans whose
+grand total including hours/comp rounds to 0.00 (census data, no payroll).
+
+``execute_fused`` runs TOTALS_INCLNEG (1700) → NEGATIVE_PAYROLL (1800) →
+TOTALS_EXCLNEG (1900) as a single scan while still emitting the totals and a
+``StepState`` for each logical step.
+"""
 
 from __future__ import annotations
 
-# TODO: Implement plan-level totals
-# Collapse by planId, SUM 12 contribution fields + loan
-# Detect planidNoPR (census data, no payroll)
-# Compute totals by identifier for multi-location PEO files
+import time
+from datetime import UTC, datetime, timedelta
+
+from pydantic import BaseModel, Field
+
+from bluestar.models.outputs import PlanTotals
+from bluestar.models.payroll_batch import COMP_FIELDS, CONTRIBUTION_FIELDS, PayrollBatch, from_cents
+from bluestar.models.pipeline import StepState, StepStatus
+
+TOTALS_INCLNEG_STEP = 1700
+NEGATIVE_PAYROLL_STEP = 1800
+TOTALS_EXCLNEG_STEP = 1900
+
+# Hours/comp fields that count toward the planidNoPR grand total.
+_NO_PR_FIELDS: tuple[str, ...] = ("hours", *COMP_FIELDS)
+
+_Key = tuple[str, str | None]
+
+
+class TotalsResult(BaseModel):
+    """Plan and identifier totals for one totals step."""
+
+    by_plan: list[PlanTotals] = Field(default_factory=list)
+    by_identifier: list[PlanTotals] = Field(default_factory=list)
+
+    @property
+    def no_payroll_plans(self) -> list[str]:
+        """planidNoPR: plans with census data but no payroll this period."""
+        return [t.plan_id for t in self.by_plan if t.no_payroll]
+
+
+class FusedTotalsResult(BaseModel):
+    """Outputs of the fused 1700/1800/1900 scan, step for step."""
+
+    inclneg: TotalsResult
+    exclneg: TotalsResult
+    negative_records: int = 0  # Records changed by NEGATIVE_PAYROLL
+    step_states: list[StepState] = Field(default_factory=list)
+
+
+class _Accumulator:
+    """Running integer-cent sums for one (planId, identifier) group."""
+
+    __slots__ = ("contrib", "other")
+
+    def __init__(self) -> None:
+        self.contrib = [0] * len(CONTRIBUTION_FIELDS)
+        self.other = 0  # hours + comp, for the no-payroll check
+
+    def to_totals(self, plan_id: str, identifier: str | None) -> PlanTotals:
+        amounts = {f: from_cents(c) for f, c in zip(CONTRIBUTION_FIELDS, self.contrib)}
+        grand = sum(self.contrib)
+        return PlanTotals(
+            plan_id=plan_id,
+            identifier=identifier,
+            grand_total=from_cents(grand),
+            no_payroll=grand + self.other == 0,
+            **amounts,
+        )
+
+
+def _result(groups: dict[_Key, _Accumulator]) -> TotalsResult:
+    result = TotalsResult()
+    for (plan_id, identifier), acc in groups.items():
+        target = result.by_plan if identifier is None else result.by_identifier
+        target.append(acc.to_totals(plan_id, identifier))
+    return result
+
+
+def _group(groups: dict[_Key, _Accumulator], key: _Key) -> _Accumulator:
+    acc = groups.get(key)
+    if acc is None:
+        acc = groups[key] = _Accumulator()
+    return acc
+
+
+class TotalsByPlanService:
+    """Plan-level and identifier-level contribution totals."""
+
+    def execute(self, batch: PayrollBatch) -> TotalsResult:
+        """Compute totals for one step (1700 or 1900) without modifying the batch."""
+        groups: dict[_Key, _Accumulator] = {}
+        contrib_cols = [batch.column(f) for f in CONTRIBUTION_FIELDS]
+        other_cols = [batch.column(f) for f in _NO_PR_FIELDS]
+        for i, (plan_id, identifier) in enumerate(zip(batch.column("planid"), batch.column("identifier"))):
+            accs = [_group(groups, (plan_id, None))]
+            if identifier:
+                accs.append(_group(groups, (plan_id, identifier)))
+            other = sum(col[i] for col in other_cols)
+            for acc in accs:
+                for j, col in enumerate(contrib_cols):
+                    acc.contrib[j] += col[i]
+                acc.other += other
+        return _result(groups)
+
+    def execute_fused(self, batch: PayrollBatch) -> FusedTotalsResult:
+        """Totals including negatives, negative zeroing and totals excluding
+        negatives in one scan. The batch is left as step 1800 would leave it."""
+        start = datetime.now(UTC)
+        t0 = time.perf_counter()
+
+        incl: dict[_Key, _Accumulator] = {}
+        excl: dict[_Key, _Accumulator] = {}
+        contrib_cols = [batch.column(f) for f in CONTRIBUTION_FIELDS]
+        other_cols = [batch.column(f) for f in _NO_PR_FIELDS]
+        negative_records = 0
+
+        for i, (plan_id, identifier) in enumerate(zip(batch.column("planid"), batch.column("identifier"))):
+            keys: list[_Key] = [(plan_id, None)]
+            if identifier:
+                keys.append((plan_id, identifier))
+            incl_accs = [_group(incl, k) for k in keys]
+            excl_accs = [_group(excl, k) for k in keys]
+            other = sum(col[i] for col in other_cols)
+            row_negative = False
+            for j, col in enumerate(contrib_cols):
+                v = col[i]
+                for acc in incl_accs:
+                    acc.contrib[j] += v
+                if v < 0:
+                    col[i] = 0
+                    row_negative = True
+                else:
+                    for acc in excl_accs:
+                        acc.contrib[j] += v
+            for acc in incl_accs + excl_accs:
+                acc.other += other
+            negative_records += row_negative
+
+        elapsed_ms = int((time.perf_counter() - t0) * 1000)
+        n = len(batch)
+        steps = (TOTALS_INCLNEG_STEP, NEGATIVE_PAYROLL_STEP, TOTALS_EXCLNEG_STEP)
+        share = timedelta(milliseconds=elapsed_ms / len(steps))
+        step_states = [
+            StepState(
+                step_order=order,
+                status=StepStatus.COMPLETED,
+                start_time=start + share * k,
+                end_time=start + share * (k + 1),
+                duration_ms=elapsed_ms // len(steps),
+                record_count=n,
+                agent_name="TRANSFORMATION",
+            )
+            for k, order in enumerate(steps)
+        ]
+        return FusedTotalsResult(
+            inclneg=_result(incl),
+            exclneg=_result(excl),
+            negative_records=negative_records,
+            step_states=step_states,
+        )
@@ -1,8 +1,223 @@
-"""XMLGeneratorService — step 2300 GENERATE_XML (subroutine-XML.do)."""
+"""XMLGeneratorService — step 2300 GENERATE_XML (subroutine-XML.do).
+
+Writes the Relius ``REQUESTS/IMPORT_PAYROLL/REQUEST_PAYROLL/
+PAYROLL_PARAMETER_INFO`` document incrementally with a SAX-style generator
+straight to an ``IFileStore.open_write`` stream — no DOM is built.
+
+Per-plan parameters (plan year-end, allocation date, the
+``DetailsWithPaySchedXML`` frequency code / sequence number and EIN) are
+resolved once per plan for each run. Only the client-config part (EIN and
+plan year-end month/day) is cached across runs, for the one-hour rules TTL;
+the allocation date depends on today and the pay schedule row may be added
+between runs, so both are looked up every time.
+"""
 
 from __future__ import annotations
 
-# TODO: Implement Relius IMPORT_PAYROLL XML generation
-# Structure: REQUESTS/IMPORT_PAYROLL/REQUEST_PAYROLL/PAYROLL_PARAMETER_INFO
-# Plan year-end determination, allocation date (next business day),
-# ODBC: DetailsWithPaySchedXML for freq code and sequence number
+from calendar import monthrange
+from collections.abc import Iterable
+from datetime import date, datetime, timedelta
+from typing import Any
+from xml.sax.saxutils import XMLGenerator
+from xml.sax.xmlreader import AttributesImpl
+
+from pydantic import BaseModel
+
+from bluestar.agents.business_calendar import BusinessCalendar
+from bluestar.core.protocols import IFileStore, IFileWriter, IRulesStore, ISQLClient
+from bluestar.models.outputs import ExportFile, XMLPayload
+
+PAY_SCHED_SQL = (
+    "SELECT freqcode, sequencenumber FROM DetailsWithPaySchedXML "
+    "WHERE planid = ? AND payperiodenddate = ?"
+)
+
+DER_NAME_RELIUS = "1Payroll DER ALL"
+XML_CONTENT_TYPE = "application/xml"
+CONFIG_CACHE_TTL = timedelta(hours=1)
+
+# Fixed DER switches, in document order.
+_DER_FLAGS: tuple[tuple[str, str], ...] = (
+    ("DERGenerateNewEmployee", "Y"),
+    ("DERUpdateExistingEmployee", "Y"),
+    ("DERValidateImportOnly", "N"),
+    ("DERCreateEligibility", "Y"),
+    ("SuppressCode", "Y"),
+    ("DERCreatePostTaxMatchTrans", "N"),
+    ("DERCreatePreTaxMatchTrans", "N"),
+)
+
+
+class PlanXMLParameters(BaseModel):
+    """Per-plan values shared by every REQUEST_PAYROLL element for the plan."""
+
+    plan_id: str
+    ein: str = ""
+    year_end_date: str = ""
+    freq_code: str = ""
+    sequence_number: int = 0
+    allocation_date: str = ""
+    found: bool = False  # DetailsWithPaySchedXML row present in PlanConnect
+
+
+def plan_year_end(effective: date, mmdd: str) -> date:
+    """First plan year-end (``MM-DD``) on or after the effective date.
+
+    A 02-29 year-end falls on 02-28 in years that are not leap years.
+    """
+    month, day = (int(p) for p in mmdd.replace("/", "-").split("-")[:2])
+
+    def on(year: int) -> date:
+        return date(year, month, min(day, monthrange(year, month)[1]))
+
+    year_end = on(effective.year)
+    if year_end < effective:
+        year_end = on(effective.year + 1)
+    return year_end
+
+
+class _Writer:
+    """Thin helper over ``XMLGenerator`` that keeps the nesting indentation."""
+
+    def __init__(self, out: IFileWriter) -> None:
+        self._gen = XMLGenerator(out, encoding="utf-8", short_empty_elements=True)
+        self._depth = 0
+
+    def start_document(self) -> None:
+        self._gen.startDocument()
+
+    def end_document(self) -> None:
+        self._gen.ignorableWhitespace("\n")
+        self._gen.endDocument()
+
+    def _indent(self) -> None:
+        self._gen.ignorableWhitespace("\n" + "  " * self._depth)
+
+    def start(self, name: str, attrs: dict[str, str] | None = None) -> None:
+        self._indent()
+        self._gen.startElement(name, AttributesImpl(attrs or {}))
+        self._depth += 1
+
+    def end(self, name: str) -> None:
+        self._depth -= 1
+        self._indent()
+        self._gen.endElement(name)
+
+    def leaf(self, name: str, text: Any = None, attrs: dict[str, str] | None = None) -> None:
+        self._indent()
+        self._gen.startElement(name, AttributesImpl(attrs or {}))
+        if text is not None:
+            self._gen.characters(str(text))
+        self._gen.endElement(name)
+
+
+def stream_payroll_xml(out: IFileWriter, payloads: Iterable[XMLPayload]) -> int:
+    """Write the IMPORT_PAYROLL document for ``payloads``; returns the request count."""
+    w = _Writer(out)
+    w.start_document()
+    w.start("REQUESTS", {"ActionCode": "P"})
+    w.start("IMPORT_PAYROLL")
+    count = 0
+    for p in payloads:
+        w.start("REQUEST_PAYROLL", {"PlanID": p.plan_id, "EmployerIdentificationNumber": p.ein})
+        w.start("PAYROLL_PARAMETER_INFO")
+        w.leaf("PlanID", p.plan_id)
+        w.leaf("YearEndDate", p.year_end_date)
+        w.leaf("FrequencyCode", attrs={"tc": p.freq_code})
+        w.leaf("PayrollFrequencySequenceNumber", p.sequence_number)
+        w.leaf("PayPeriodEndDate", p.pay_period_end_date)
+        w.leaf("DERName", p.der_name)
+        w.leaf("DERFileName", p.der_file_path)
+        for flag, tc in _DER_FLAGS:
+            w.leaf(flag, attrs={"tc": tc})
+        w.leaf("AllocationEffectiveDate", p.allocation_date)
+        w.leaf("ContributionPercentEffectiveDate", p.allocation_date)
+        w.end("PAYROLL_PARAMETER_INFO")
+        w.end("REQUEST_PAYROLL")
+        count += 1
+    w.end("IMPORT_PAYROLL")
+    w.end("REQUESTS")
+    w.end_document()
+    return count
+
+
+class XMLGeneratorService:
+    """Generate the Relius payroll import XML for a batch."""
+
+    def __init__(
+        self,
+        rules_store: IRulesStore,
+        sql: ISQLClient,
+        file_store: IFileStore,
+        calendar: BusinessCalendar | None = None,
+    ) -> None:
+        self._rules = rules_store
+        self._sql = sql
+        self._files = file_store
+        self._calendar = calendar or BusinessCalendar()
+        self._configs: dict[tuple[str, str], tuple[datetime, str, str]] = {}
+
+    def _client_config(self, plan_id: str, pay_freq: str) -> tuple[str, str]:
+        """EIN and plan year-end ``MM-DD`` from client config, cached for the rules TTL."""
+        now = self._calendar.now()
+        cached = self._configs.get((plan_id, pay_freq))
+        if cached is not None and cached[0] > now:
+            return cached[1], cached[2]
+        config = self._rules.get_client_config(plan_id, pay_freq)
+        ein, mmdd = str(config.get("ein") or ""), str(config.get("planYEmmdd") or "12-31")
+        self._configs[(plan_id, pay_freq)] = (now + CONFIG_CACHE_TTL, ein, mmdd)
+        return ein, mmdd
+
+    def plan_parameters(self, plan_id: str, pay_freq: str, effective: date) -> PlanXMLParameters:
+        """Resolve the per-plan XML parameters for one run."""
+        ein, mmdd = self._client_config(plan_id, pay_freq)
+        allocation = max(self._calendar.next_business_day(self._calendar.today()), effective)
+        rows = self._sql.query(PAY_SCHED_SQL, (plan_id, effective))
+        sched = rows[0] if rows else {}
+        return PlanXMLParameters(
+            plan_id=plan_id,
+            ein=ein,
+            year_end_date=plan_year_end(effective, mmdd).isoformat(),
+            freq_code=str(sched.get("freqcode") or "").strip(),
+            sequence_number=int(sched.get("sequencenumber") or 0),
+            allocation_date=allocation.isoformat(),
+            found=bool(rows),
+        )
+
+    def payload(self, params: PlanXMLParameters, effective: date, der_file_path: str) -> XMLPayload:
+        return XMLPayload(
+            plan_id=params.plan_id,
+            ein=params.ein,
+            year_end_date=params.year_end_date,
+            freq_code=params.freq_code,
+            sequence_number=params.sequence_number,
+            pay_period_end_date=effective.isoformat(),
+            der_name=DER_NAME_RELIUS,
+            der_file_path=der_file_path,
+            allocation_date=params.allocation_date,
+        )
+
+    def execute(
+        self,
+        plan_ids: Iterable[str],
+        pay_freq: str,
+        effective: date,
+        der_file_path: str,
+        prefix: str = "",
+    ) -> ExportFile:
+        """Stream the XML for every plan in the batch to the file store.
+
+        The file is named ``…_PayrollXML.xml`` when PlanConnect has a pay
+        schedule detail for every plan, otherwise ``…_LoadFileManually.txt``.
+        """
+        plans = list(dict.fromkeys(plan_ids))
+        params = [self.plan_parameters(p, pay_freq, effective) for p in plans]
+        lead = plans[0] if plans else ""
+        stem = f"{effective.isoformat()} {lead}_{pay_freq}_PayrollXML"
+        name = f"{stem}.xml" if params and all(p.found for p in params) else f"{stem}_LoadFileManually.txt"
+        path = f"{prefix}{name}"
+        with self._files.open_write(path, XML_CONTENT_TYPE) as out:
+            count = stream_payroll_xml(out, (self.payload(p, effective, der_file_path) for p in params))
+        return ExportFile(
+            filename=name, file_type=name.rsplit(".", 1)[1], s3_path=path, record_count=count, plan_id=lead
+        )
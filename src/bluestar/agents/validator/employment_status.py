@@ -1,8 +1,135 @@
-"""EmploymentStatusService — step 1200 (subroutine-employmentstatus.do)."""
+"""EmploymentStatusService — step 1200 (subroutine-employmentstatus.do).
+
+Relius reference data (``jobstatuscurrent`` and ``originalDOH``) is loaded in
+bulk once per plan and hash-joined to the batch by SSN. The DOH/DOT/DOR rules
+are then applied in order as whole-column comparisons, and the number of
+records each rule changed is reported.
+"""
 
 from __future__ import annotations
 
-# TODO: Implement EmploymentStatusService
-# ODBC queries: jobstatuscurrent, originalDOH
-# Rules: clear invalid DOT/DOR, DOR before DOH, rehire detection,
-#   DOT supersedes DOR, replace DOH with Relius original
+from collections.abc import Callable, Iterable
+from datetime import date
+from typing import Any
+
+from bluestar.core.protocols import ISQLClient
+from bluestar.models.payroll_batch import PayrollBatch
+from bluestar.models.util import as_date, ssn_key
+
+JOB_STATUS_SQL = (
+    "SELECT ssn, eecodestatus, eecodestatussubcd, eecodestartdate "
+    "FROM jobstatuscurrent WHERE planid = ?"
+)
+ORIGINAL_DOH_SQL = "SELECT ssn, eecodestartdate AS dohoriginal FROM originalDOH WHERE planid = ?"
+
+INVALID_DATE = date(1900, 1, 1)
+
+# Rule names, in application order (keys of the per-rule change counts).
+RULES: tuple[str, ...] = (
+    "clear_invalid_dot",
+    "clear_invalid_dor",
+    "dor_before_doh",
+    "dor_equals_doh_hired_original",
+    "dor_from_doh_after_term",
+    "rehire_without_dot",
+    "dot_supersedes_dor",
+    "replace_doh_with_original",
+)
+
+
+def _where(mask: list[bool], new: Callable[[int], Any], column: list[Any]) -> list[Any]:
+    """Column-wise ``replace column = new if mask``."""
+    return [new(i) if m else v for i, (m, v) in enumerate(zip(mask, column))]
+
+
+class EmploymentStatusService:
+    """Batch DOH/DOT/DOR correction against Relius employment status."""
+
+    def __init__(self, sql: ISQLClient) -> None:
+        self._sql = sql
+
+    def load_reference(self, plan_ids: Iterable[str]) -> dict[tuple[str, str], dict[str, Any]]:
+        """Bulk-load both reference sets and build the (planid, ssn) hash table."""
+        table: dict[tuple[str, str], dict[str, Any]] = {}
+        for plan_id in plan_ids:
+            status_rows = self._sql.query(JOB_STATUS_SQL, (plan_id,))
+            doh_rows = self._sql.query(ORIGINAL_DOH_SQL, (plan_id,))
+            for row in status_rows:
+                entry = table.setdefault((plan_id, ssn_key(row["ssn"])), {})
+                entry["status"] = (row.get("eecodestatus") or "").strip()
+                entry["subcd"] = (row.get("eecodestatussubcd") or "").strip()
+                entry["start"] = as_date(row.get("eecodestartdate"))
+            for row in doh_rows:
+                entry = table.setdefault((plan_id, ssn_key(row["ssn"])), {})
+                entry["dohoriginal"] = as_date(row.get("dohoriginal"))
+        return table
+
+    def execute(self, batch: PayrollBatch) -> dict[str, int]:
+        """Apply the employment status rules to the batch in place.
+
+        Returns the number of records changed by each rule, keyed by ``RULES``.
+        A record with no Relius row has a blank status, which counts as
+        ``status != "T"`` exactly as in the Stata rule.
+        """
+        planids = batch.column("planid")
+        reference = self.load_reference(dict.fromkeys(planids))
+
+        # Hash join: one probe per record, producing aligned reference columns.
+        empty: dict[str, Any] = {}
+        joined = [reference.get((p, ssn_key(s)), empty) for p, s in zip(planids, batch.column("ssn"))]
+        status = [j.get("status", "") for j in joined]
+        subcd = [j.get("subcd", "") for j in joined]
+        start = [j.get("start") for j in joined]
+        dohoriginal = [j.get("dohoriginal") for j in joined]
+
+        doh = batch.column("doh")
+        dot = batch.column("dot")
+        dor = batch.column("dor")
+        rehire = batch.column("rehirewithoutdot")
+        counts: dict[str, int] = {}
+
+        mask = [d == INVALID_DATE for d in dot]
+        counts["clear_invalid_dot"] = sum(mask)
+        dot = _where(mask, lambda i: None, dot)
+
+        mask = [d == INVALID_DATE for d in dor]
+        counts["clear_invalid_dor"] = sum(mask)
+        dor = _where(mask, lambda i: None, dor)
+
+        mask = [r is not None and h is not None and r < h for r, h in zip(dor, doh)]
+        counts["dor_before_doh"] = sum(mask)
+        dor = _where(mask, lambda i: None, dor)
+
+        mask = [
+            r is not None and r == h and st == "H" and sc == "O"
+            for r, h, st, sc in zip(dor, doh, status, subcd)
+        ]
+        counts["dor_equals_doh_hired_original"] = sum(mask)
+        dor = _where(mask, lambda i: None, dor)
+
+        mask = [
+            r is None and h is not None and s is not None and h > s and st == "T"
+            for r, h, s, st in zip(dor, doh, start, status)
+        ]
+        counts["dor_from_doh_after_term"] = sum(mask)
+        dor = _where(mask, lambda i: doh[i], dor)
+
+        valid_rehire = [st == "H" and sc == "R" and r == s for st, sc, r, s in zip(status, subcd, dor, start)]
+        mask = [
+            r is not None and st != "T" and t is None and not keep
+            for r, st, t, keep in zip(dor, status, dot, valid_rehire)
+        ]
+        counts["rehire_without_dot"] = sum(mask)
+        rehire = _where(mask, lambda i: 1, rehire)
+        dor = _where(mask, lambda i: None, dor)
+
+        mask = [t is not None and r is not None and t > r for t, r in zip(dot, dor)]
+        counts["dot_supersedes_dor"] = sum(mask)
+        dor = _where(mask, lambda i: None, dor)
+
+        mask = [o is not None and o != h for o, h in zip(dohoriginal, doh)]
+        counts["replace_doh_with_original"] = sum(mask)
+        doh = _where(mask, lambda i: dohoriginal[i], doh)
+
+        batch.columns.update(doh=doh, dot=dot, dor=dor, rehirewithoutdot=rehire)
+        return counts
@@ -4,6 +4,8 @@ from __future__ import annotations
 
 # TODO: Implement IssueDetectorService
 # Part A: Relius cross-reference (PersonalInfoByPlan ODBC), nickname exception
+#   via NameEquivalenceIndex (name_index.py): key Relius rows once per batch
+#   with relius_keys(), then is_sort_exception() per record
 # Part B: 9 STOP-level issues (sort mismatch, DOB update, no SSN, bad SSN, etc.)
 # Part C: 5 WARNING-level issues (rehire w/o DOT, hours too large, etc.)
 # Output files: Issues.csv, Issues-STOP.csv, Warnings.csv
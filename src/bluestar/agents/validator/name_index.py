@@ -0,0 +1,234 @@
+"""NameEquivalenceIndex — precomputed name keys for the sort-mismatch nickname exception.
+
+IssueDetectorService (step 1600) flags ``possiblesortissue`` when the file first
+name or DOB disagrees with Relius, then unflags it when the names are
+equivalent and the DOB matches ("Bob" vs "Robert"). Instead of fuzzy-matching
+every record against Relius at runtime, each name is reduced once to a
+``NameKey`` (canonical nickname + Soundex code). Keys are memoized per index in
+a bounded LRU cache, so the exception check is a tuple comparison and the raw
+names held in memory stay limited to the most recent ``KEY_CACHE_SIZE``.
+
+Equivalence is the skill's rule — one first name contains the other — widened
+only by the explicit nickname table. The Soundex code is carried on the key for
+callers that want a "sounds like" hint, but it never unflags a record on its
+own: "Jon"/"Jane" and "Ann"/"Amy" share a code and are different people.
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Any, NamedTuple
+
+from bluestar.core.protocols import IRulesStore
+
+NICKNAME_RULE_CATEGORY = "NICKNAMES"
+
+KEY_CACHE_SIZE = 16_384
+
+# Canonical given name -> common nicknames. Extended per deployment via the
+# CATEGORY#NICKNAMES validation rules ({"canonical": ..., "nicknames": [...]}).
+DEFAULT_NICKNAMES: dict[str, tuple[str, ...]] = {
+    "abigail": ("abby", "abbie", "gail"),
+    "alexander": ("alex", "al", "xander", "sandy"),
+    "alexandra": ("alex", "alexa", "lexi", "sandra"),
+    "andrew": ("andy", "drew"),
+    "anthony": ("tony",),
+    "barbara": ("barb", "barbie", "babs"),
+    "benjamin": ("ben", "benny", "benji"),
+    "catherine": ("cathy", "kathy", "kate", "katie", "cat"),
+    "charles": ("charlie", "chuck", "chas", "chaz"),
+    "christina": ("chris", "tina", "christy"),
+    "christopher": ("chris", "topher", "kit"),
+    "daniel": ("dan", "danny"),
+    "david": ("dave", "davey"),
+    "deborah": ("deb", "debbie", "debby"),
+    "donald": ("don", "donny"),
+    "dorothy": ("dot", "dottie", "dolly"),
+    "edward": ("ed", "eddie", "ted", "ned"),
+    "elizabeth": ("liz", "beth", "betty", "eliza", "lisa", "libby", "betsy"),
+    "frederick": ("fred", "freddy", "rick"),
+    "gerald": ("jerry", "gerry"),
+    "gregory": ("greg",),
+    "henry": ("hank", "harry"),
+    "james": ("jim", "jimmy", "jamie"),
+    "jennifer": ("jen", "jenny", "jenn"),
+    "john": ("jack", "johnny", "jon"),
+    "jonathan": ("jon", "jonny", "nathan"),
+    "joseph": ("joe", "joey"),
+    "joshua": ("josh",),
+    "katherine": ("kathy", "kate", "katie", "kat", "kay"),
+    "kenneth": ("ken", "kenny"),
+    "lawrence": ("larry",),
+    "margaret": ("maggie", "meg", "peggy", "marge", "margie"),
+    "matthew": ("matt", "matty"),
+    "michael": ("mike", "mikey", "mick"),
+    "nicholas": ("nick", "nicky"),
+    "patricia": ("pat", "patty", "trish", "tricia"),
+    "patrick": ("pat", "paddy"),
+    "peter": ("pete",),
+    "raymond": ("ray",),
+    "richard": ("rick", "ricky", "dick", "rich", "richie"),
+    "robert": ("bob", "bobby", "rob", "robbie", "bert"),
+    "ronald": ("ron", "ronnie"),
+    "samuel": ("sam", "sammy"),
+    "stephen": ("steve", "stevie"),
+    "steven": ("steve", "stevie"),
+    "susan": ("sue", "susie", "suzy"),
+    "theodore": ("ted", "teddy", "theo"),
+    "thomas": ("tom", "tommy"),
+    "timothy": ("tim", "timmy"),
+    "victoria": ("vicky", "tori"),
+    "william": ("bill", "billy", "will", "willie", "liam"),
+}
+
+_NON_ALPHA = re.compile(r"[^a-z]")
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+
+def normalize_name(name: str) -> str:
+    """Lower-case a name and strip everything but letters ("O'Brien-Smith" -> "obriensmith")."""
+    return _NON_ALPHA.sub("", name.lower())
+
+
+def soundex(name: str) -> str:
+    """American Soundex code for an already-normalized name ("" for an empty name)."""
+    if not name:
+        return ""
+    first = name[0]
+    digits: list[str] = []
+    prev = _SOUNDEX_CODES.get(first, "")
+    for ch in name[1:]:
+        code = _SOUNDEX_CODES.get(ch, "")
+        if code and code != prev:
+            digits.append(code)
+            if len(digits) == 3:
+                break
+        # h and w do not separate letters with the same code; vowels do
+        if ch not in "hw":
+            prev = code
+    return (first.upper() + "".join(digits)).ljust(4, "0")
+
+
+class NameKey(NamedTuple):
+    """Normalized comparison key for a single name."""
+
+    normalized: str
+    canonical: str  # Canonical given name if the name is a known nickname, else normalized
+    phonetic: str  # Soundex of the canonical form
+
+
+class PersonNameKey(NamedTuple):
+    """Precomputed name keys plus DOB for one person (file record or Relius row)."""
+
+    fname: NameKey
+    lname: NameKey
+    dob: date | None
+
+
+class NameEquivalenceIndex:
+    """In-memory nickname index with memoized name keys.
+
+    Build once per agent process (``from_rules_store`` or ``default``) and
+    share across batches; recently computed keys are reused by the next batch.
+    """
+
+    _default: NameEquivalenceIndex | None = None
+
+    def __init__(
+        self,
+        nicknames: dict[str, tuple[str, ...] | list[str]] | None = None,
+        cache_size: int = KEY_CACHE_SIZE,
+    ) -> None:
+        self._canonical: dict[str, str] = {}
+        self._key = lru_cache(maxsize=cache_size)(self._make_key)
+        for canonical, aliases in (nicknames if nicknames is not None else DEFAULT_NICKNAMES).items():
+            self.add(canonical, aliases)
+
+    @classmethod
+    def default(cls) -> NameEquivalenceIndex:
+        """Process-wide index over ``DEFAULT_NICKNAMES``."""
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    @classmethod
+    def from_rules_store(cls, rules_store: IRulesStore) -> NameEquivalenceIndex:
+        """Build an index from the defaults plus CATEGORY#NICKNAMES validation rules."""
+        index = cls()
+        for rule in rules_store.get_validation_rules(NICKNAME_RULE_CATEGORY):
+            canonical = rule.get("canonical", "")
+            if canonical:
+                index.add(canonical, rule.get("nicknames", []))
+        return index
+
+    def add(self, canonical: str, aliases: tuple[str, ...] | list[str]) -> None:
+        """Register a canonical name and its nicknames.
+
+        A nickname shared by several canonical names (e.g. "chris") keeps its
+        first mapping; the containment check still covers the rest.
+        """
+        canon = normalize_name(canonical)
+        if not canon:
+            return
+        self._canonical.setdefault(canon, canon)
+        for alias in aliases:
+            norm = normalize_name(alias)
+            if norm:
+                self._canonical.setdefault(norm, canon)
+        self._key.cache_clear()
+
+    def key(self, name: str) -> NameKey:
+        """Return the memoized ``NameKey`` for a raw name."""
+        return self._key(name)
+
+    def clear_cache(self) -> None:
+        """Drop every memoized key (and the raw names it holds)."""
+        self._key.cache_clear()
+
+    def _make_key(self, name: str) -> NameKey:
+        norm = normalize_name(name)
+        canonical = self._canonical.get(norm, norm)
+        return NameKey(norm, canonical, soundex(canonical))
+
+    def person_key(self, fname: str, lname: str, dob: date | None) -> PersonNameKey:
+        """Precompute the keys used by the sort-mismatch exception for one person."""
+        return PersonNameKey(self.key(fname), self.key(lname), dob)
+
+    def relius_keys(self, rows: list[dict[str, Any]]) -> dict[str, PersonNameKey]:
+        """Key a PersonInfoByPlan result set by SSN (reliusfname/reliuslname/reliusdob)."""
+        return {
+            str(row["ssn"]): self.person_key(
+                row.get("reliusfname") or "", row.get("reliuslname") or "", row.get("reliusdob")
+            )
+            for row in rows
+        }
+
+    @staticmethod
+    def first_names_equivalent(a: NameKey, b: NameKey) -> bool:
+        """True if two first names are the same person ("Bob" ~ "Robert", "Mary Ann" ~ "Mary")."""
+        if not a.normalized or not b.normalized:
+            return False
+        if a.canonical == b.canonical:
+            return True
+        # Original subroutine-Issues.do rule: either name contains the other
+        return a.normalized in b.normalized or b.normalized in a.normalized
+
+    @classmethod
+    def is_sort_exception(cls, file_person: PersonNameKey, relius_person: PersonNameKey) -> bool:
+        """Nickname exception: unflag ``possiblesortissue`` when the DOB matches and
+        either the first names are equivalent or the last names match."""
+        if file_person.dob is None or file_person.dob != relius_person.dob:
+            return False
+        if cls.first_names_equivalent(file_person.fname, relius_person.fname):
+            return True
+        return bool(file_person.lname.normalized) and file_person.lname.normalized == relius_person.lname.normalized
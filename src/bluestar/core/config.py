@@ -64,6 +64,7 @@ class SQSConfig(BaseSettings):
     validator_queue_url: str = ""
     transform_queue_url: str = ""
     compliance_queue_url: str = ""
+    orchestrator_queue_url: str = ""  # step completion callbacks
     human_review_queue_url: str = ""
 
 
@@ -84,6 +85,8 @@ class TokenServiceConfig(BaseSettings):
 
     base_url: str = "https://token-service.bluestar.internal"
     timeout: int = 10
+    max_connections: int = 8
+    batch_deadline: int = 60  # seconds for a whole resolve_many call
 
 
 class AppSettings(BaseSettings):
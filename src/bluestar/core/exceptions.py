@@ -20,6 +20,10 @@ class StepFailedError(PipelineError):
         super().__init__(f"Step {step_order} ({subroutine}) failed: {message}")
 
 
+class RetryableStepError(PipelineError):
+    """A step dispatch failed before the step ran; sending it again is safe."""
+
+
 class EscalationRequired(PipelineError):
     """Condition requires human review escalation."""
 
@@ -57,3 +61,16 @@ class DeadlineAtRiskError(BlueStarError):
         self.custodian = custodian
         self.time_remaining_minutes = time_remaining_minutes
         super().__init__(f"{custodian} deadline at risk: {time_remaining_minutes} min remaining")
+
+
+class DeadlineMissedError(BlueStarError):
+    """Custodian deadline passed with the batch still pending."""
+
+    def __init__(self, custodian: str, minutes_late: int) -> None:
+        self.custodian = custodian
+        self.minutes_late = minutes_late
+        super().__init__(f"{custodian} deadline missed: {minutes_late} min late")
+
+
+class StateTransitionError(PipelineError):
+    """A batch or step state transition was invalid or lost a conditional write."""
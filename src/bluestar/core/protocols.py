@@ -6,6 +6,8 @@ no inheritance required, easy to test with isinstance().
 
 from __future__ import annotations
 
+from collections.abc import Iterable, Mapping
+from datetime import datetime
 from typing import Any, Protocol, TypeVar, runtime_checkable
 
 T = TypeVar("T")
@@ -70,6 +72,25 @@ class ICacheBackend(Protocol):
 # Persistence: File Store
 # ---------------------------------------------------------------------------
 
+@runtime_checkable
+class IFileWriter(Protocol):
+    """Write stream returned by ``IFileStore.open_write``.
+
+    Data is committed by ``close`` (or leaving the ``with`` block normally);
+    ``abort`` or an exception inside the block discards it.
+    """
+
+    def write(self, data: bytes) -> int: ...
+
+    def close(self) -> str: ...
+
+    def abort(self) -> None: ...
+
+    def __enter__(self) -> IFileWriter: ...
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None: ...
+
+
 @runtime_checkable
 class IFileStore(Protocol):
     """S3-compatible file storage interface."""
@@ -78,10 +99,14 @@ class IFileStore(Protocol):
 
     def write(self, path: str, data: bytes, content_type: str = "application/octet-stream") -> str: ...
 
+    def open_write(self, path: str, content_type: str = "application/octet-stream") -> IFileWriter: ...
+
     def move(self, src: str, dst: str) -> None: ...
 
     def list_files(self, prefix: str) -> list[str]: ...
 
+    def delete(self, path: str) -> None: ...
+
 
 # ---------------------------------------------------------------------------
 # SQL Server Client
@@ -95,6 +120,10 @@ class ISQLClient(Protocol):
 
     def execute_sp(self, sp_name: str, params: dict[str, Any]) -> dict[str, Any]: ...
 
+    def execute_sp_many(self, sp_name: str, rows: list[dict[str, Any]]) -> int:
+        """Run a stored procedure once per row in a single transaction (all-or-nothing)."""
+        ...
+
 
 # ---------------------------------------------------------------------------
 # Token Service (NACHA)
@@ -106,6 +135,10 @@ class ITokenService(Protocol):
 
     def resolve(self, sefa_id1: str, sefa_id2: str, sefa_id3: str) -> dict[str, Any]: ...
 
+    def resolve_many(
+        self, sefa_ids: Iterable[tuple[str, str, str]], deadline: float | None = None
+    ) -> Mapping[tuple[str, str, str], dict[str, Any]]: ...
+
 
 # ---------------------------------------------------------------------------
 # Orchestration
@@ -139,3 +172,16 @@ class IWorkflowState(Protocol):
     ) -> None: ...
 
     async def update_batch_state(self, batch_id: str, status: str, **metadata: Any) -> None: ...
+
+
+# ---------------------------------------------------------------------------
+# Clock
+# ---------------------------------------------------------------------------
+
+@runtime_checkable
+class IClock(Protocol):
+    """Wall-clock time source; injected so schedulers can be driven by a fake clock."""
+
+    def now(self) -> datetime:
+        """Current time as a timezone-aware datetime."""
+        ...
@@ -0,0 +1,81 @@
+"""Declarative group-by/aggregate over a ``PayrollBatch``.
+
+An ``AggregateSpec`` names the grouping columns, the columns whose first
+value is carried per group, and each output as a sum of input columns. The
+operator makes one hash-aggregation scan, summing each distinct input column
+once in exact integer cents; outputs are then formed per group from those
+sums. The result is itself a columnar ``PayrollBatch`` (one row per group, in
+first-seen order) — no intermediate record lists are built.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+from bluestar.models.payroll_batch import PayrollBatch
+
+
+@dataclass(frozen=True, slots=True)
+class AggregateSpec:
+    """What to group by and how to sum.
+
+    ``outputs`` maps an output column to the input columns it sums.
+    Groups whose ``drop_if_zero`` input sums are all zero are dropped.
+    """
+
+    group_by: tuple[str, ...]
+    outputs: Mapping[str, tuple[str, ...]]
+    first: tuple[str, ...] = ()
+    drop_if_zero: tuple[str, ...] = ()
+    inputs: tuple[str, ...] = field(init=False)
+
+    def __post_init__(self) -> None:
+        cols = [c for cols in self.outputs.values() for c in cols]
+        object.__setattr__(self, "inputs", tuple(dict.fromkeys([*cols, *self.drop_if_zero])))
+
+
+def aggregate(batch: PayrollBatch, spec: AggregateSpec) -> PayrollBatch:
+    """Group ``batch`` by ``spec.group_by`` and return one row per group.
+
+    The result has the group-by columns, the ``first`` columns, the summed
+    input columns and the outputs, all money in integer cents.
+    """
+    key_cols = [batch.column(c) for c in spec.group_by]
+    first_cols = [batch.column(c) for c in spec.first]
+    input_cols = [batch.column(c) for c in spec.inputs]
+    n_inputs = len(input_cols)
+
+    slot_of: dict[tuple[Any, ...], int] = {}
+    firsts: list[tuple[Any, ...]] = []
+    sums: list[list[int]] = []
+    for i, key in enumerate(zip(*key_cols)):
+        slot = slot_of.get(key)
+        if slot is None:
+            slot = slot_of[key] = len(sums)
+            firsts.append(tuple(col[i] for col in first_cols))
+            sums.append([0] * n_inputs)
+        acc = sums[slot]
+        for j, col in enumerate(input_cols):
+            acc[j] += col[i]
+
+    keys = list(slot_of)
+    if spec.drop_if_zero:
+        pos = [spec.inputs.index(c) for c in spec.drop_if_zero]
+        keep = [k for k, acc in enumerate(sums) if any(acc[p] for p in pos)]
+        keys = [keys[k] for k in keep]
+        firsts = [firsts[k] for k in keep]
+        sums = [sums[k] for k in keep]
+
+    columns: dict[str, list[Any]] = {}
+    for j, name in enumerate(spec.group_by):
+        columns[name] = [k[j] for k in keys]
+    for j, name in enumerate(spec.first):
+        columns.setdefault(name, [f[j] for f in firsts])
+    for j, name in enumerate(spec.inputs):
+        columns[name] = [acc[j] for acc in sums]
+    for name, cols in spec.outputs.items():
+        idx = [spec.inputs.index(c) for c in cols]
+        columns[name] = [sum(acc[p] for p in idx) for acc in sums]
+    return PayrollBatch(columns, len(keys))
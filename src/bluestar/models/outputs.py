@@ -32,6 +32,23 @@ class ACHRecord(BaseModel):
     negative_source_ind: int = 0
 
 
+class DepWDDetail(BaseModel):
+    """Aggregated DepWDDetail amounts for one plan/effective date/description."""
+
+    plan_id_relius: str
+    effective_date: str = ""
+    description: str = ""
+    total_amt: Decimal = Decimal("0")
+    deferral_amt: Decimal = Decimal("0")
+    roth_amt: Decimal = Decimal("0")  # rothdeferral + aftertax
+    match_amt: Decimal = Decimal("0")
+    shmatch_amt: Decimal = Decimal("0")  # shmatch + shmatchqaca
+    pshare_amt: Decimal = Decimal("0")  # pshare + prevwageer + prevwageqnec
+    shne_amt: Decimal = Decimal("0")  # shne + shneqaca
+    loan_amt: Decimal = Decimal("0")
+    dep_wd_detail_id: Optional[int] = None
+
+
 class XMLPayload(BaseModel):
     """Relius IMPORT_PAYROLL XML generation parameters."""
 
@@ -75,6 +92,7 @@ class PlanTotals(BaseModel):
     aftertax: Decimal = Decimal("0")
     grand_total: Decimal = Decimal("0")
     no_payroll: bool = False  # True if grand total rounds to 0.00
+    identifier: Optional[str] = None  # Set for by-identifier (multi-location PEO) totals
 
     @property
     def computed_grand_total(self) -> Decimal:
@@ -93,3 +111,15 @@ class ForfeitureResult(BaseModel):
     forfeiture_available: Decimal = Decimal("0")
     forfeiture_applied: Decimal = Decimal("0")
     identifier: Optional[str] = None
+
+
+class LimitReduction(BaseModel):
+    """A calculated ER amount reduced by the IRS annual limit (MatchCalcReduction.csv)."""
+
+    plan_id: str
+    ssn: str
+    target_field: str
+    calculated: Decimal = Decimal("0")
+    ytd_source_total: Decimal = Decimal("0")
+    annual_limit: Decimal = Decimal("0")
+    applied: Decimal = Decimal("0")
@@ -0,0 +1,175 @@
+"""Columnar payroll batch — the in-memory record set pipeline services operate on.
+
+A batch stores ``CanonicalPayrollRecord`` data column-wise. Decimal fields
+(hours, compensation, contributions) are held as integer cents, so sums,
+comparisons and clips are exact fixed-point integer operations; dates,
+strings and ints are stored as-is. Services convert at the agent boundary
+with ``from_records`` / ``to_records`` and otherwise work on whole columns.
+
+Row filters (e.g. DROP_OLD_TERMS) are lazy: ``select`` narrows a selection
+vector of live row indices without touching the columns, and the batch is
+compacted once, on the first dense access (``column``, ``take``,
+``to_records``). Mask kernels that are safe to run over excluded rows use
+``raw_column`` and never force a copy.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any
+
+from bluestar.models.payroll_record import CanonicalPayrollRecord
+
+# The 12 contribution source fields, in data-model order.
+CONTRIBUTION_FIELDS: tuple[str, ...] = (
+    "deferral", "rothdeferral", "match", "shmatch", "shmatchqaca", "pshare",
+    "shne", "shneqaca", "loan", "prevwageer", "prevwageqnec", "aftertax",
+)
+
+# Employer sources subject to forfeiture offset (prevailing wage excluded per Davis-Bacon).
+ER_FIELDS: tuple[str, ...] = ("match", "shmatch", "shmatchqaca", "shne", "shneqaca", "pshare")
+
+# Raw compensation components summed by the default compensation formula.
+COMP_FIELDS: tuple[str, ...] = ("salary", "bonus", "commissions", "overtime")
+
+RECORD_FIELDS: tuple[str, ...] = tuple(CanonicalPayrollRecord.model_fields)
+
+# Decimal(…, 2) fields stored as integer cents.
+FIXED_POINT_FIELDS: frozenset[str] = frozenset(
+    name for name, info in CanonicalPayrollRecord.model_fields.items() if info.annotation is Decimal
+)
+
+
+def to_cents(value: Decimal | int | str) -> int:
+    """Convert an amount to integer cents, rounding half away from zero (Stata ``round(x, 0.01)``)."""
+    return int((Decimal(value) * 100).to_integral_value(ROUND_HALF_UP))
+
+
+def from_cents(cents: int) -> Decimal:
+    """Convert integer cents back to a two-place Decimal."""
+    return Decimal(cents).scaleb(-2)
+
+
+def mul_cents(cents: int, factor: Decimal) -> int:
+    """Multiply a cents amount by an exact Decimal factor and round to the cent."""
+    return int((cents * factor).to_integral_value(ROUND_HALF_UP))
+
+
+class PayrollBatch:
+    """Column-oriented set of payroll records.
+
+    ``columns`` maps a field name to a list of per-row values. Columns beyond
+    the canonical record (e.g. SEFA IDs joined in by a step) may be added
+    with ``add_column``; they are dropped by ``to_records``. ``len(batch)``
+    is the number of live rows.
+    """
+
+    __slots__ = ("columns", "_length", "_selection")
+
+    def __init__(self, columns: dict[str, list[Any]], length: int | None = None) -> None:
+        if length is None:
+            length = len(next(iter(columns.values()))) if columns else 0
+        for name, values in columns.items():
+            if len(values) != length:
+                raise ValueError(f"Column {name!r} has {len(values)} rows, expected {length}")
+        self.columns = columns
+        self._length = length
+        self._selection: list[int] | None = None
+
+    @classmethod
+    def from_records(cls, records: Sequence[CanonicalPayrollRecord]) -> PayrollBatch:
+        columns: dict[str, list[Any]] = {}
+        for name in RECORD_FIELDS:
+            if name in FIXED_POINT_FIELDS:
+                columns[name] = [to_cents(getattr(r, name)) for r in records]
+            else:
+                columns[name] = [getattr(r, name) for r in records]
+        return cls(columns, len(records))
+
+    def to_records(self) -> list[CanonicalPayrollRecord]:
+        self.compact()
+        names = [n for n in RECORD_FIELDS if n in self.columns]
+        decoded = [
+            [from_cents(v) for v in self.columns[n]] if n in FIXED_POINT_FIELDS else self.columns[n]
+            for n in names
+        ]
+        rows: Iterable[Sequence[Any]] = zip(*decoded) if names else ([] for _ in range(self._length))
+        return [CanonicalPayrollRecord.model_construct(**dict(zip(names, row))) for row in rows]
+
+    def __len__(self) -> int:
+        return self._length if self._selection is None else len(self._selection)
+
+    @property
+    def physical_length(self) -> int:
+        """Rows in the underlying columns, including rows excluded by ``select``."""
+        return self._length
+
+    @property
+    def selection(self) -> list[int] | None:
+        """Live physical row indices, or ``None`` when every row is live."""
+        return self._selection
+
+    def select(self, mask: Sequence[bool]) -> int:
+        """Keep only live rows where ``mask`` is true, without copying columns.
+
+        ``mask`` is aligned to the physical rows (``raw_column`` order).
+        Returns the number of rows dropped.
+        """
+        if len(mask) != self._length:
+            raise ValueError(f"Mask has {len(mask)} rows, expected {self._length}")
+        rows = range(self._length) if self._selection is None else self._selection
+        kept = [i for i in rows if mask[i]]
+        dropped = len(rows) - len(kept)
+        if dropped:
+            self._selection = kept
+        return dropped
+
+    def compact(self) -> None:
+        """Materialize the selection into dense columns (no-op when none is pending)."""
+        sel = self._selection
+        if sel is None:
+            return
+        self.columns = {name: [values[i] for i in sel] for name, values in self.columns.items()}
+        self._length = len(sel)
+        self._selection = None
+
+    def raw_column(self, name: str) -> list[Any]:
+        """Physical column, including rows excluded by ``select``; never compacts."""
+        try:
+            return self.columns[name]
+        except KeyError:
+            raise KeyError(f"PayrollBatch has no column {name!r}") from None
+
+    def column(self, name: str) -> list[Any]:
+        self.compact()
+        try:
+            return self.columns[name]
+        except KeyError:
+            raise KeyError(f"PayrollBatch has no column {name!r}") from None
+
+    def has_column(self, name: str) -> bool:
+        return name in self.columns
+
+    def add_column(self, name: str, values: Iterable[Any]) -> list[Any]:
+        """Add (or replace) a column and return it."""
+        self.compact()
+        col = list(values)
+        if len(col) != self._length:
+            raise ValueError(f"Column {name!r} has {len(col)} rows, expected {self._length}")
+        self.columns[name] = col
+        return col
+
+    def take(self, indices: Sequence[int]) -> PayrollBatch:
+        """Return a new batch containing only the given rows, in order."""
+        self.compact()
+        return PayrollBatch(
+            {name: [values[i] for i in indices] for name, values in self.columns.items()},
+            len(indices),
+        )
+
+    def assign(self, other: PayrollBatch) -> None:
+        """Replace this batch's rows in place with those of ``other``."""
+        self.columns = other.columns
+        self._length = other._length
+        self._selection = other._selection
@@ -67,6 +67,9 @@ class BatchState(BaseModel):
     steps: list[StepState] = Field(default_factory=list)
     record_count: int = 0
     escalation_reason: str = ""
+    critical_path: list[int] = Field(default_factory=list)  # step orders, first to last
+    critical_path_ms: int = 0
+    speculated: list[int] = Field(default_factory=list)  # required steps started ahead of an optional dependency
 
 
 class EscalationPayload(BaseModel):
@@ -34,6 +34,7 @@ class ERContribFormula(BaseModel):
     """Flat-rate ER contribution formula."""
 
     level1upto: Decimal = Decimal("0")
+    off_calendar_year: bool = False
     target_field: str = "pshare"  # pshare, shne, or shneqaca
     enabled: bool = False
 
@@ -50,7 +51,9 @@ class CompensationFormula(BaseModel):
     ercomp_components: list[str] = Field(
         default_factory=lambda: ["salary", "bonus", "commissions", "overtime"]
     )
+    # Ordered column adjustments, e.g. {"target": "salary", "op": "subtract", "source": "exclcomp"}
     custom_adjustments: list[dict[str, Any]] = Field(default_factory=list)
+    version: int = 1
 
 
 class IRSLimits(BaseModel):
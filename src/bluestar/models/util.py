@@ -0,0 +1,26 @@
+"""Normalization helpers for values read from SQL Server and the batch.
+
+Shared by every agent that joins Relius or ERContribYTD result sets to a
+``PayrollBatch``, so the join keys and dates are normalized one way.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Any
+
+
+def ssn_key(value: Any) -> str:
+    """Join key for SSNs coming from the batch (``%09d`` strings) or ODBC (int or str)."""
+    return str(value).strip().zfill(9)
+
+
+def as_date(value: Any) -> date | None:
+    """Normalize an ODBC date/datetime/ISO string to ``date``."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
@@ -0,0 +1,194 @@
+"""In-process "fast path" orchestration.
+
+Deterministic steps (those with a registered local handler that need no
+model) run directly in this process over the shared in-memory
+``PayrollBatch`` — no queue message, no callback poll, no serialization. Only
+steps that need another agent's model, or that have no local handler, are
+forwarded to a remote ``IOrchestrator`` (e.g. ``SQSOrchestrator``). Steps are
+still scheduled by ``PipelineExecutor``, so every step gets the same
+``StepState`` record whichever way it ran. With a ``StepFusionPlanner``,
+runs of row-local steps are fused into one pass before execution. With a
+``CheckpointStore``, the batch is snapshotted after checkpoint steps, a rerun
+resumes from the newest snapshot, and snapshots are deleted on completion. A
+snapshot that cannot be saved is logged and skipped; the step still succeeds.
+"""
+
+from __future__ import annotations
+
+import inspect
+import logging
+from collections.abc import Awaitable, Callable, Iterable, Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+from bluestar.agents.orchestrator.checkpoint import CheckpointStore
+from bluestar.agents.orchestrator.pipeline_executor import PipelineExecutor, PipelineGraph
+from bluestar.agents.orchestrator.step_fusion import StepFusionPlanner
+from bluestar.core.exceptions import PipelineError, RetryableStepError, StepFailedError
+from bluestar.core.protocols import ICacheBackend, IOrchestrator, IRulesStore, IWorkflowState
+from bluestar.models.payroll_batch import PayrollBatch
+from bluestar.models.pipeline import BatchState, BatchStatus
+
+# Steps that need a model (IDP schema inference) unless a step says otherwise
+# with ``parameters["requiresModel"]``.
+MODEL_STEPS: frozenset[str] = frozenset({"FILE_INGEST"})
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class StepContext:
+    """What a local step handler sees."""
+
+    batch_id: str
+    step_order: int
+    subroutine_name: str
+    parameters: dict[str, Any]
+    batch: PayrollBatch | None
+    outputs: dict[str, Any] = field(default_factory=dict)  # shared across the batch's steps
+
+
+StepHandler = Callable[[StepContext], Mapping[str, Any] | Awaitable[Mapping[str, Any]]]
+
+
+class InProcessOrchestrator:
+    """``IOrchestrator`` that runs deterministic steps locally and forwards the rest."""
+
+    def __init__(
+        self,
+        rules: IRulesStore,
+        handlers: Mapping[str, StepHandler],
+        remote: IOrchestrator | None = None,
+        state: IWorkflowState | None = None,
+        cache: ICacheBackend | None = None,
+        model_steps: Iterable[str] = MODEL_STEPS,
+        fusion: StepFusionPlanner | None = None,
+        checkpoints: CheckpointStore | None = None,
+        **executor_options: Any,
+    ) -> None:
+        self._rules = rules
+        self._handlers = dict(handlers)
+        self._remote = remote
+        self._state = state
+        self._cache = cache
+        self._model_steps = frozenset(model_steps)
+        self._fusion = fusion
+        self._checkpoints = checkpoints
+        self._executor_options = executor_options
+        self._batches: dict[str, PayrollBatch] = {}
+        self._outputs: dict[str, dict[str, Any]] = {}
+        self._graphs: dict[str, PipelineGraph] = {}
+        self._done: dict[str, set[int]] = {}
+        self.local_steps = 0
+        self.remote_steps = 0
+
+    def attach(self, batch_id: str, batch: PayrollBatch) -> None:
+        """Make ``batch`` the shared in-memory record set for ``batch_id``."""
+        self._batches[batch_id] = batch
+
+    def batch(self, batch_id: str) -> PayrollBatch | None:
+        return self._batches.get(batch_id)
+
+    def release(self, batch_id: str) -> None:
+        self._batches.pop(batch_id, None)
+        self._outputs.pop(batch_id, None)
+        self._graphs.pop(batch_id, None)
+        self._done.pop(batch_id, None)
+
+    def runs_locally(self, subroutine_name: str, parameters: Mapping[str, Any]) -> bool:
+        requires_model = parameters.get("requiresModel", subroutine_name in self._model_steps)
+        return subroutine_name in self._handlers and not requires_model
+
+    async def dispatch_step(
+        self, batch_id: str, step_order: int, agent: str, parameters: dict[str, Any]
+    ) -> dict[str, Any]:
+        result = await self._dispatch(batch_id, step_order, agent, parameters)
+        if self._is_local(parameters):
+            self._record_done(batch_id, step_order)
+        return result
+
+    def _is_local(self, parameters: Mapping[str, Any]) -> bool:
+        if parameters.get("fused_steps") and self._fusion is not None:
+            return True
+        return self.runs_locally(str(parameters.get("subroutine_name", "")), parameters)
+
+    def _record_done(self, batch_id: str, step_order: int) -> None:
+        """Mark a locally run step done and snapshot the batch if it is a checkpoint step."""
+        graph = self._graphs.get(batch_id)
+        members = graph.members_of(step_order) if graph is not None and step_order in graph.steps else ()
+        done = self._done.setdefault(batch_id, set())
+        done.update(m.step_order for m in members)
+        done.add(step_order)
+        records = self._batches.get(batch_id)
+        if self._checkpoints is not None and records is not None and any(
+            self._checkpoints.wants(m.subroutine_name, m.parameters) for m in members
+        ):
+            try:
+                self._checkpoints.save(batch_id, step_order, records, done)
+            except Exception:
+                logger.warning("Checkpoint after step %s of %s failed", step_order, batch_id, exc_info=True)
+
+    async def _dispatch(
+        self, batch_id: str, step_order: int, agent: str, parameters: dict[str, Any]
+    ) -> dict[str, Any]:
+        name = str(parameters.get("subroutine_name", ""))
+        if not self._is_local(parameters):
+            if self._remote is None:
+                raise PipelineError(f"Step {step_order} ({name}) needs {agent} but no remote orchestrator is set")
+            self.remote_steps += 1
+            return await self._remote.dispatch_step(batch_id, step_order, agent, parameters)
+        try:
+            return await self._run_local(batch_id, step_order, name, parameters)
+        except RetryableStepError as exc:
+            # A local step may have changed the shared batch before failing; it is never replayed.
+            raise StepFailedError(step_order, name, str(exc)) from exc
+
+    async def _run_local(
+        self, batch_id: str, step_order: int, name: str, parameters: dict[str, Any]
+    ) -> dict[str, Any]:
+        fused = parameters.get("fused_steps")
+        if fused and self._fusion is not None:
+            records = self._batches.get(batch_id)
+            if records is None:
+                raise PipelineError(f"Fused step {step_order} ({name}) has no in-memory batch for {batch_id}")
+            steps = self._fusion.run(records, fused)
+            self.local_steps += len(steps)
+            return {"steps": steps, "record_count": len(records)}
+
+        context = StepContext(
+            batch_id=batch_id,
+            step_order=step_order,
+            subroutine_name=name,
+            parameters=parameters,
+            batch=self._batches.get(batch_id),
+            outputs=self._outputs.setdefault(batch_id, {}),
+        )
+        result = self._handlers[name](context)
+        if inspect.isawaitable(result):
+            result = await result
+        self.local_steps += 1
+        out = dict(result)
+        if context.batch is not None:
+            out.setdefault("record_count", len(context.batch))
+        return out
+
+    async def run_pipeline(self, batch_id: str, plan_id: str, pay_freq: str, s3_path: str) -> dict[str, Any]:
+        executor = PipelineExecutor(self._rules, self, self._state, self._cache, **self._executor_options)
+        graph = executor.load_graph(plan_id, pay_freq)
+        if self._fusion is not None:
+            graph = self._fusion.fuse(graph)
+        self._graphs[batch_id] = graph
+        completed: frozenset[int] = frozenset()
+        if self._checkpoints is not None and (restored := self._checkpoints.latest(batch_id)) is not None:
+            checkpoint, records = restored
+            self.attach(batch_id, records)
+            completed = checkpoint.completed
+        self._done[batch_id] = set(completed)
+
+        batch = BatchState(batch_id=batch_id, plan_id=plan_id, pay_freq=pay_freq, s3_path=s3_path)
+        batch = await executor.execute(batch, graph, completed)
+        if batch.record_count == 0 and (final := self._batches.get(batch_id)) is not None:
+            batch.record_count = len(final)
+        if batch.status == BatchStatus.COMPLETED and self._checkpoints is not None:
+            self._checkpoints.purge(batch_id)
+        return batch.model_dump(mode="json")
@@ -1,8 +1,410 @@
-"""SQS-based pipeline orchestration for local development and testing."""
+"""SQS-based pipeline orchestration for local development and testing.
+
+``SQSOrchestrator`` sends each step to its agent's queue and waits for the
+completion callback on its own reply queue. ``SQSStepWorker`` is the agent
+side: it consumes a step queue, runs a handler, and replies.
+
+All traffic is batched. Messages sent within a few milliseconds of each
+other to the same queue go out in one ``SendMessageBatch`` (up to 10 entries,
+256 KiB). Receives long-poll for up to 10 messages at a time, and handled
+messages are deleted with ``DeleteMessageBatch``. While a worker runs a
+step, a heartbeat extends the message's visibility timeout so a long step is
+not redelivered to another worker. A message body over ``OFFLOAD_BYTES``
+is stored in Redis or S3 and only a ``payloadRef`` travels over SQS.
+
+A message that cannot be processed is logged and left on its queue (for
+redelivery or the dead-letter queue); the rest of its receive batch is still
+handled and deleted, and polling carries on.
+"""
 
 from __future__ import annotations
 
-# TODO: Implement SQS dispatch orchestrator
-# - Send step messages to per-agent SQS queues
-# - Poll for completion callbacks
-# - Track state in WorkflowStateManager
+import asyncio
+import inspect
+import json
+import logging
+import uuid
+from collections.abc import Awaitable, Callable, Mapping
+from typing import Any
+
+from bluestar.agents.orchestrator.pipeline_executor import PipelineExecutor
+from bluestar.core.config import SQSConfig
+from bluestar.core.exceptions import PipelineError, RetryableStepError, StepFailedError
+from bluestar.core.protocols import ICacheBackend, IFileStore, IRulesStore, IWorkflowState
+from bluestar.models.pipeline import BatchState
+
+MAX_BATCH_ENTRIES = 10
+MAX_BATCH_BYTES = 256 * 1024
+OFFLOAD_BYTES = 64 * 1024
+LONG_POLL_SECONDS = 20
+VISIBILITY_TIMEOUT = 60
+STEP_TIMEOUT = 15 * 60
+SEND_LINGER = 0.005  # seconds to wait for more messages to batch
+PAYLOAD_TTL = 4 * 3600
+PAYLOAD_PREFIX = "sqs-payloads/"
+RECEIVE_RETRY_DELAY = 1.0  # seconds to back off after a failed receive
+
+logger = logging.getLogger(__name__)
+
+
+def queue_urls(config: SQSConfig) -> dict[str, str]:
+    """Step queue URL per agent."""
+    return {
+        "IDP": config.idp_queue_url,
+        "VALIDATOR": config.validator_queue_url,
+        "TRANSFORMATION": config.transform_queue_url,
+        "COMPLIANCE": config.compliance_queue_url,
+    }
+
+
+class PayloadOffload:
+    """Keep large message bodies out of band; Redis is used when set, else S3."""
+
+    def __init__(
+        self,
+        cache: ICacheBackend | None = None,
+        files: IFileStore | None = None,
+        threshold: int = OFFLOAD_BYTES,
+    ) -> None:
+        self._cache = cache
+        self._files = files
+        self._threshold = threshold
+
+    def pack(self, doc: Mapping[str, Any]) -> str:
+        body = json.dumps(doc, default=str)
+        if len(body.encode()) <= self._threshold:
+            return body
+        key = uuid.uuid4().hex
+        if self._cache is not None:
+            self._cache.setex(f"sqs:payload:{key}", PAYLOAD_TTL, body)
+            ref = f"redis://sqs:payload:{key}"
+        elif self._files is not None:
+            ref = "s3://" + self._files.write(f"{PAYLOAD_PREFIX}{key}.json", body.encode(), "application/json")
+        else:
+            raise PipelineError(f"SQS message of {len(body)} bytes needs a payload store")
+        return json.dumps({"payloadRef": ref})
+
+    def unpack(self, body: str) -> tuple[dict[str, Any], str | None]:
+        """The message document and its payload reference, if it was offloaded."""
+        doc = json.loads(body)
+        ref = doc.get("payloadRef")
+        if ref is None:
+            return doc, None
+        if ref.startswith("redis://") and self._cache is not None:
+            stored = self._cache.get(ref.removeprefix("redis://"))
+            if stored is None:
+                raise PipelineError(f"Offloaded SQS payload {ref} has expired")
+            return json.loads(stored), ref
+        if ref.startswith("s3://") and self._files is not None:
+            return json.loads(self._files.read(ref.removeprefix("s3://"))), ref
+        raise PipelineError(f"No payload store for {ref}")
+
+    def discard(self, ref: str | None) -> None:
+        if ref is None:
+            return
+        if ref.startswith("redis://") and self._cache is not None:
+            self._cache.delete(ref.removeprefix("redis://"))
+        elif ref.startswith("s3://") and self._files is not None:
+            self._files.delete(ref.removeprefix("s3://"))
+
+
+async def delete_batch(client: Any, queue_url: str, receipt_handles: list[str]) -> set[int]:
+    """``DeleteMessageBatch`` the handles; returns the indexes that were deleted.
+
+    Failed entries are logged and stay on the queue for redelivery.
+    """
+    if not receipt_handles:
+        return set()
+    resp = await asyncio.to_thread(
+        client.delete_message_batch,
+        QueueUrl=queue_url,
+        Entries=[{"Id": str(i), "ReceiptHandle": r} for i, r in enumerate(receipt_handles)],
+    )
+    for failed in resp.get("Failed", []):
+        logger.warning("Delete from %s failed: %s", queue_url, failed.get("Message") or failed.get("Code", ""))
+    return {int(ok["Id"]) for ok in resp.get("Successful", [])}
+
+
+class BatchSender:
+    """Coalesce concurrent sends to a queue into ``SendMessageBatch`` calls."""
+
+    def __init__(self, client: Any, linger: float = SEND_LINGER) -> None:
+        self._client = client
+        self._linger = linger
+        self._buffers: dict[str, list[tuple[str, asyncio.Future[str]]]] = {}
+        self._flushers: dict[str, asyncio.Task[None]] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+        self.batches_sent = 0
+
+    async def send(self, queue_url: str, body: str) -> str:
+        """Queue ``body`` for ``queue_url``; returns its SQS message id once sent."""
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        buffer = self._buffers.setdefault(queue_url, [])
+        buffer.append((body, future))
+        flusher = self._flushers.get(queue_url)
+        if len(buffer) >= MAX_BATCH_ENTRIES:
+            task = asyncio.create_task(self._flush(queue_url))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        elif flusher is None or flusher.done():
+            self._flushers[queue_url] = asyncio.create_task(self._flush_later(queue_url))
+        return await future
+
+    async def _flush_later(self, queue_url: str) -> None:
+        await asyncio.sleep(self._linger)
+        while self._buffers.get(queue_url):
+            await self._flush(queue_url)
+
+    async def _flush(self, queue_url: str) -> None:
+        buffer = self._buffers.get(queue_url, [])
+        chunk: list[tuple[str, asyncio.Future[str]]] = []
+        size = 0
+        while buffer and len(chunk) < MAX_BATCH_ENTRIES:
+            body_size = len(buffer[0][0].encode())
+            if chunk and size + body_size > MAX_BATCH_BYTES:
+                break
+            chunk.append(buffer.pop(0))
+            size += body_size
+        if not chunk:
+            return
+        entries = [{"Id": str(i), "MessageBody": body} for i, (body, _) in enumerate(chunk)]
+        try:
+            resp = await asyncio.to_thread(self._client.send_message_batch, QueueUrl=queue_url, Entries=entries)
+        except Exception as exc:
+            for _, future in chunk:
+                if not future.done():
+                    future.set_exception(PipelineError(f"SQS send to {queue_url} failed: {exc}"))
+            return
+        self.batches_sent += 1
+        for ok in resp.get("Successful", []):
+            chunk[int(ok["Id"])][1].set_result(ok["MessageId"])
+        for failed in resp.get("Failed", []):
+            reason = failed.get("Message") or failed.get("Code", "")
+            chunk[int(failed["Id"])][1].set_exception(PipelineError(f"SQS send to {queue_url} failed: {reason}"))
+
+
+class SQSOrchestrator:
+    """``IOrchestrator`` that dispatches steps over SQS and awaits their callbacks.
+
+    Give each instance its own ``reply_queue``; a reply addressed to another
+    instance is made visible again rather than consumed.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        queues: Mapping[str, str],
+        reply_queue: str,
+        rules: IRulesStore,
+        state: IWorkflowState | None = None,
+        cache: ICacheBackend | None = None,
+        offload: PayloadOffload | None = None,
+        step_timeout: float = STEP_TIMEOUT,
+        wait_time: float = LONG_POLL_SECONDS,
+        **executor_options: Any,
+    ) -> None:
+        self._client = client
+        self._queues = dict(queues)
+        self._reply_queue = reply_queue
+        self._rules = rules
+        self._state = state
+        self._cache = cache
+        self._offload = offload or PayloadOffload(cache)
+        self._step_timeout = step_timeout
+        self._wait_time = wait_time
+        self._executor_options = executor_options
+        self._sender = BatchSender(client)
+        self._instance = uuid.uuid4().hex[:12]
+        self._waiting: dict[str, asyncio.Future[dict[str, Any]]] = {}
+        self._receiver: asyncio.Task[None] | None = None
+
+    async def dispatch_step(
+        self, batch_id: str, step_order: int, agent: str, parameters: dict[str, Any]
+    ) -> dict[str, Any]:
+        queue_url = self._queues.get(agent)
+        if not queue_url:
+            raise PipelineError(f"No SQS queue configured for agent {agent!r}")
+        correlation_id = f"{self._instance}:{batch_id}:{step_order}:{uuid.uuid4().hex[:8]}"
+        future: asyncio.Future[dict[str, Any]] = asyncio.get_running_loop().create_future()
+        self._waiting[correlation_id] = future
+        try:
+            try:
+                await self._sender.send(queue_url, self._offload.pack({
+                    "correlationId": correlation_id,
+                    "batchId": batch_id,
+                    "stepOrder": step_order,
+                    "agent": agent,
+                    "parameters": parameters,
+                    "replyTo": self._reply_queue,
+                }))
+            except PipelineError as exc:
+                raise RetryableStepError(f"Step {step_order} for {batch_id} was not sent: {exc}") from exc
+            if self._receiver is None or self._receiver.done():
+                self._receiver = asyncio.create_task(self._receive_replies())
+            try:
+                reply = await asyncio.wait_for(future, self._step_timeout)
+            except TimeoutError:
+                raise PipelineError(
+                    f"Step {step_order} for {batch_id} got no reply from {agent} in {self._step_timeout}s"
+                ) from None
+        finally:
+            self._waiting.pop(correlation_id, None)
+        if "error" in reply:
+            raise StepFailedError(step_order, str(parameters.get("subroutine_name", "")), reply["error"])
+        return dict(reply.get("result") or {})
+
+    async def _receive_replies(self) -> None:
+        while self._waiting:
+            try:
+                resp = await asyncio.to_thread(
+                    self._client.receive_message,
+                    QueueUrl=self._reply_queue,
+                    MaxNumberOfMessages=MAX_BATCH_ENTRIES,
+                    WaitTimeSeconds=self._wait_time,
+                )
+            except Exception:
+                logger.warning("Receive from %s failed; retrying", self._reply_queue, exc_info=True)
+                await asyncio.sleep(RECEIVE_RETRY_DELAY)
+                continue
+            consumed: list[tuple[str, str | None]] = []
+            for message in resp.get("Messages", []):
+                try:
+                    routed, ref = await self._route_reply(message)
+                except Exception:
+                    logger.warning(
+                        "Reply %s on %s not handled", message.get("MessageId"), self._reply_queue, exc_info=True
+                    )
+                    continue
+                if routed:
+                    consumed.append((message["ReceiptHandle"], ref))
+            try:
+                deleted = await delete_batch(self._client, self._reply_queue, [r for r, _ in consumed])
+            except Exception:
+                logger.warning("Deleting replies from %s failed", self._reply_queue, exc_info=True)
+                continue
+            for i, (_, ref) in enumerate(consumed):
+                if i in deleted:
+                    self._offload.discard(ref)
+
+    async def _route_reply(self, message: Mapping[str, Any]) -> tuple[bool, str | None]:
+        """Resolve the waiting step for ``message`` and return its payload ref.
+
+        Returns False if the reply belongs to another instance.
+        """
+        reply, ref = self._offload.unpack(message["Body"])
+        correlation_id = str(reply.get("correlationId", ""))
+        if not correlation_id.startswith(f"{self._instance}:"):
+            await asyncio.to_thread(
+                self._client.change_message_visibility,
+                QueueUrl=self._reply_queue, ReceiptHandle=message["ReceiptHandle"], VisibilityTimeout=0,
+            )
+            return False, None
+        future = self._waiting.get(correlation_id)
+        if future is not None and not future.done():
+            future.set_result(reply)
+        return True, ref
+
+    async def run_pipeline(self, batch_id: str, plan_id: str, pay_freq: str, s3_path: str) -> dict[str, Any]:
+        executor = PipelineExecutor(self._rules, self, self._state, self._cache, **self._executor_options)
+        batch = BatchState(batch_id=batch_id, plan_id=plan_id, pay_freq=pay_freq, s3_path=s3_path)
+        batch = await executor.execute(batch)
+        return batch.model_dump(mode="json")
+
+
+StepRequestHandler = Callable[[dict[str, Any]], Mapping[str, Any] | Awaitable[Mapping[str, Any]]]
+
+
+class SQSStepWorker:
+    """Agent-side consumer: long-polls a step queue, runs ``handler`` and replies.
+
+    The handler gets the step message (``batchId``, ``stepOrder``, ``agent``,
+    ``parameters``) and returns the step result; an exception is sent back
+    as the step's error.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        queue_url: str,
+        handler: StepRequestHandler,
+        offload: PayloadOffload | None = None,
+        visibility_timeout: float = VISIBILITY_TIMEOUT,
+        wait_time: float = LONG_POLL_SECONDS,
+    ) -> None:
+        self._client = client
+        self._queue_url = queue_url
+        self._handler = handler
+        self._offload = offload or PayloadOffload()
+        self._visibility_timeout = visibility_timeout
+        self._wait_time = wait_time
+        self._sender = BatchSender(client)
+        self._stopped = False
+        self.handled = 0
+        self.heartbeats = 0
+
+    async def poll_once(self) -> int:
+        """Receive up to 10 steps, run them concurrently, reply and delete; returns the count handled.
+
+        A message whose handling raised (its reply could not be sent) is not
+        deleted, so it is redelivered; the others in the batch are deleted.
+        """
+        resp = await asyncio.to_thread(
+            self._client.receive_message,
+            QueueUrl=self._queue_url,
+            MaxNumberOfMessages=MAX_BATCH_ENTRIES,
+            WaitTimeSeconds=self._wait_time,
+            VisibilityTimeout=self._visibility_timeout,
+        )
+        messages = resp.get("Messages", [])
+        if not messages:
+            return 0
+        heartbeats = [asyncio.create_task(self._heartbeat(m["ReceiptHandle"])) for m in messages]
+        try:
+            outcomes = await asyncio.gather(*(self._handle(m["Body"]) for m in messages), return_exceptions=True)
+            handled: list[tuple[str, str | None]] = []
+            for message, outcome in zip(messages, outcomes):
+                if isinstance(outcome, BaseException):
+                    logger.warning(
+                        "Step message %s on %s not handled", message.get("MessageId"), self._queue_url,
+                        exc_info=outcome,
+                    )
+                else:
+                    handled.append((message["ReceiptHandle"], outcome))
+            deleted = await delete_batch(self._client, self._queue_url, [r for r, _ in handled])
+        finally:
+            for task in heartbeats:
+                task.cancel()
+        for i, (_, ref) in enumerate(handled):
+            if i in deleted:
+                self._offload.discard(ref)
+        self.handled += len(handled)
+        return len(handled)
+
+    async def run(self) -> None:
+        while not self._stopped:
+            await self.poll_once()
+
+    def stop(self) -> None:
+        self._stopped = True
+
+    async def _handle(self, body: str) -> str | None:
+        request, ref = self._offload.unpack(body)
+        try:
+            result = self._handler(request)
+            if inspect.isawaitable(result):
+                result = await result
+            reply: dict[str, Any] = {"correlationId": request["correlationId"], "result": dict(result)}
+        except Exception as exc:
+            reply = {"correlationId": request["correlationId"], "error": str(exc)}
+        await self._sender.send(request["replyTo"], self._offload.pack(reply))
+        return ref
+
+    async def _heartbeat(self, receipt_handle: str) -> None:
+        """Keep a message invisible while its step runs."""
+        while True:
+            await asyncio.sleep(self._visibility_timeout / 2)
+            await asyncio.to_thread(
+                self._client.change_message_visibility,
+                QueueUrl=self._queue_url, ReceiptHandle=receipt_handle, VisibilityTimeout=self._visibility_timeout,
+            )
+            self.heartbeats += 1
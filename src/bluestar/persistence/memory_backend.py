@@ -2,7 +2,18 @@
 
 from __future__ import annotations
 
-from typing import Any
+import io
+import itertools
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, Any
+
+from bluestar.core.exceptions import TokenServiceError
+
+if TYPE_CHECKING:
+    from bluestar.persistence.token_service import BankDataVault
 
 
 class MemoryRulesStore:
@@ -62,6 +73,38 @@ class MemoryCacheBackend:
         self._store.pop(key, None)
 
 
+class MemoryFileWriter:
+    """BytesIO-backed IFileWriter; the file appears in the store on close."""
+
+    def __init__(self, files: dict[str, bytes], path: str) -> None:
+        self._files = files
+        self._path = path
+        self._buf: io.BytesIO | None = io.BytesIO()
+
+    def write(self, data: bytes) -> int:
+        if self._buf is None:
+            raise ValueError(f"Stream for {self._path!r} is closed")
+        return self._buf.write(data)
+
+    def close(self) -> str:
+        if self._buf is not None:
+            self._files[self._path] = self._buf.getvalue()
+            self._buf = None
+        return self._path
+
+    def abort(self) -> None:
+        self._buf = None
+
+    def __enter__(self) -> MemoryFileWriter:
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
 class MemoryFileStore:
     """Dict-backed IFileStore for unit tests."""
 
@@ -75,12 +118,94 @@ class MemoryFileStore:
         self._files[path] = data
         return path
 
+    def open_write(self, path: str, content_type: str = "application/octet-stream") -> MemoryFileWriter:
+        return MemoryFileWriter(self._files, path)
+
     def move(self, src: str, dst: str) -> None:
         self._files[dst] = self._files.pop(src)
 
     def list_files(self, prefix: str) -> list[str]:
         return [k for k in self._files if k.startswith(prefix)]
 
+    def delete(self, path: str) -> None:
+        self._files.pop(path, None)
+
+
+class MemorySQSClient:
+    """Thread-safe stand-in for the boto3 SQS client calls the SQS orchestrator makes.
+
+    Queues are created on first use. Received messages stay invisible for the
+    visibility timeout unless deleted; ``WaitTimeSeconds`` long-polls.
+    ``calls`` counts API calls by name.
+    """
+
+    DEFAULT_VISIBILITY_TIMEOUT = 30.0
+
+    def __init__(self, timer: Any = time.monotonic) -> None:
+        self._timer = timer
+        self._queues: dict[str, list[dict[str, Any]]] = {}
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self.calls: Counter[str] = Counter()
+
+    def send_message_batch(self, QueueUrl: str, Entries: list[dict[str, Any]]) -> dict[str, Any]:
+        if not 1 <= len(Entries) <= 10:
+            raise ValueError(f"SendMessageBatch takes 1-10 entries, got {len(Entries)}")
+        with self._cond:
+            self.calls["send_message_batch"] += 1
+            successful = []
+            for entry in Entries:
+                message_id = f"m{next(self._ids)}"
+                self._queues.setdefault(QueueUrl, []).append(
+                    {"MessageId": message_id, "Body": entry["MessageBody"], "visible_at": 0.0, "receipt": None}
+                )
+                successful.append({"Id": entry["Id"], "MessageId": message_id})
+            self._cond.notify_all()
+            return {"Successful": successful, "Failed": []}
+
+    def receive_message(self, QueueUrl: str, MaxNumberOfMessages: int = 1, WaitTimeSeconds: float = 0,
+                        VisibilityTimeout: float | None = None) -> dict[str, Any]:
+        timeout = self.DEFAULT_VISIBILITY_TIMEOUT if VisibilityTimeout is None else VisibilityTimeout
+        deadline = self._timer() + WaitTimeSeconds
+        with self._cond:
+            self.calls["receive_message"] += 1
+            while True:
+                now = self._timer()
+                queue = self._queues.setdefault(QueueUrl, [])
+                visible = [m for m in queue if m["visible_at"] <= now][:MaxNumberOfMessages]
+                if visible or now >= deadline:
+                    break
+                hidden = [m["visible_at"] for m in queue if m["visible_at"] > now]
+                self._cond.wait(min([deadline - now, *(at - now for at in hidden)]))
+            messages = []
+            for message in visible:
+                message["visible_at"] = now + timeout
+                message["receipt"] = f"r{next(self._ids)}"
+                messages.append(
+                    {"MessageId": message["MessageId"], "ReceiptHandle": message["receipt"], "Body": message["Body"]}
+                )
+            return {"Messages": messages} if messages else {}
+
+    def change_message_visibility(self, QueueUrl: str, ReceiptHandle: str, VisibilityTimeout: float) -> None:
+        with self._cond:
+            self.calls["change_message_visibility"] += 1
+            for message in self._queues.get(QueueUrl, []):
+                if message["receipt"] == ReceiptHandle:
+                    message["visible_at"] = self._timer() + VisibilityTimeout
+            self._cond.notify_all()
+
+    def delete_message_batch(self, QueueUrl: str, Entries: list[dict[str, Any]]) -> dict[str, Any]:
+        with self._cond:
+            self.calls["delete_message_batch"] += 1
+            receipts = {e["ReceiptHandle"] for e in Entries}
+            queue = self._queues.get(QueueUrl, [])
+            queue[:] = [m for m in queue if m["receipt"] not in receipts]
+            return {"Successful": [{"Id": e["Id"]} for e in Entries], "Failed": []}
+
+    def depth(self, queue_url: str) -> int:
+        with self._cond:
+            return len(self._queues.get(queue_url, []))
+
 
 class MemorySQLClient:
     """Canned-response ISQLClient for unit tests."""
@@ -93,3 +218,36 @@ class MemorySQLClient:
 
     def execute_sp(self, sp_name: str, params: dict[str, Any]) -> dict[str, Any]:
         return self._responses.get(sp_name, {})  # type: ignore[return-value]
+
+    def execute_sp_many(self, sp_name: str, rows: list[dict[str, Any]]) -> int:
+        for params in rows:
+            self.execute_sp(sp_name, params)
+        return len(rows)
+
+
+class MemoryTokenService:
+    """Dict-backed ITokenService for unit tests; unknown SEFA tuples fail."""
+
+    def __init__(self) -> None:
+        self._bank_data: dict[tuple[str, str, str], dict[str, Any]] = {}
+        self.calls = 0
+
+    def resolve(self, sefa_id1: str, sefa_id2: str, sefa_id3: str) -> dict[str, Any]:
+        self.calls += 1
+        try:
+            return dict(self._bank_data[(sefa_id1, sefa_id2, sefa_id3)])
+        except KeyError:
+            raise TokenServiceError(f"Unknown SEFA {(sefa_id1, sefa_id2, sefa_id3)}") from None
+
+    def resolve_many(
+        self, sefa_ids: Iterable[tuple[str, str, str]], deadline: float | None = None
+    ) -> BankDataVault:
+        from bluestar.persistence.token_service import BankDataVault  # imports httpx
+
+        vault = BankDataVault()
+        for key in dict.fromkeys(sefa_ids):
+            try:
+                vault.put(key, self.resolve(*key))
+            except TokenServiceError as exc:
+                vault.failed[key] = str(exc)
+        return vault
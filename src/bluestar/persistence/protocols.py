@@ -5,9 +5,10 @@ from __future__ import annotations
 from bluestar.core.protocols import (
     ICacheBackend,
     IFileStore,
+    IFileWriter,
     IRulesStore,
     ISQLClient,
     ITokenService,
 )
 
-__all__ = ["ICacheBackend", "IFileStore", "IRulesStore", "ISQLClient", "ITokenService"]
+__all__ = ["ICacheBackend", "IFileStore", "IFileWriter", "IRulesStore", "ISQLClient", "ITokenService"]
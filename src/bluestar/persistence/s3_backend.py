@@ -2,11 +2,109 @@
 
 from __future__ import annotations
 
+from typing import Any
+
 import boto3
 from botocore.exceptions import ClientError
 
 from bluestar.core.exceptions import BlueStarError
 
+# S3 multipart parts must be at least 5 MiB (except the last).
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+
+class S3StreamWriter:
+    """IFileWriter streaming to S3 with multipart upload.
+
+    Bytes are buffered up to ``part_size`` and uploaded as parts; the upload
+    is only started once the first part fills, so small files fall back to a
+    single ``put_object``.
+    """
+
+    def __init__(self, client: Any, bucket: str, path: str, content_type: str,
+                 part_size: int = DEFAULT_PART_SIZE) -> None:
+        self._client = client
+        self._bucket = bucket
+        self._path = path
+        self._content_type = content_type
+        self._part_size = max(part_size, MIN_PART_SIZE)
+        self._buffer = bytearray()
+        self._upload_id: str | None = None
+        self._parts: list[dict[str, Any]] = []
+        self._closed = False
+
+    def write(self, data: bytes) -> int:
+        if self._closed:
+            raise BlueStarError(f"S3 stream for {self._path!r} is closed")
+        self._buffer += data
+        if len(self._buffer) >= self._part_size:
+            self._flush_part()
+        return len(data)
+
+    def _flush_part(self) -> None:
+        try:
+            if self._upload_id is None:
+                resp = self._client.create_multipart_upload(
+                    Bucket=self._bucket, Key=self._path, ContentType=self._content_type,
+                )
+                self._upload_id = resp["UploadId"]
+            number = len(self._parts) + 1
+            resp = self._client.upload_part(
+                Bucket=self._bucket, Key=self._path, UploadId=self._upload_id,
+                PartNumber=number, Body=bytes(self._buffer),
+            )
+            self._parts.append({"ETag": resp["ETag"], "PartNumber": number})
+            self._buffer.clear()
+        except ClientError as exc:
+            self.abort()
+            raise BlueStarError(f"S3 multipart upload failed for {self._path!r}: {exc}") from exc
+
+    def close(self) -> str:
+        if self._closed:
+            return self._path
+        try:
+            if self._upload_id is None:
+                self._client.put_object(
+                    Bucket=self._bucket, Key=self._path, Body=bytes(self._buffer),
+                    ContentType=self._content_type,
+                )
+            else:
+                if self._buffer:
+                    self._flush_part()
+                self._client.complete_multipart_upload(
+                    Bucket=self._bucket, Key=self._path, UploadId=self._upload_id,
+                    MultipartUpload={"Parts": self._parts},
+                )
+        except ClientError as exc:
+            self.abort()
+            raise BlueStarError(f"S3 write failed for {self._path!r}: {exc}") from exc
+        self._closed = True
+        self._buffer = bytearray()
+        return self._path
+
+    def abort(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._buffer = bytearray()
+        if self._upload_id is not None:
+            try:
+                self._client.abort_multipart_upload(
+                    Bucket=self._bucket, Key=self._path, UploadId=self._upload_id,
+                )
+            except ClientError:
+                pass
+
+    def __enter__(self) -> S3StreamWriter:
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
 
 class S3FileStore:
     """Production IFileStore backed by S3."""
@@ -37,6 +135,10 @@ class S3FileStore:
         except ClientError as exc:
             raise BlueStarError(f"S3 write failed for {path!r}: {exc}") from exc
 
+    def open_write(self, path: str, content_type: str = "application/octet-stream",
+                   part_size: int = DEFAULT_PART_SIZE) -> S3StreamWriter:
+        return S3StreamWriter(self._client, self._bucket, path, content_type, part_size)
+
     def move(self, src: str, dst: str) -> None:
         try:
             self._client.copy_object(
@@ -58,3 +160,9 @@ class S3FileStore:
             return keys
         except ClientError as exc:
             raise BlueStarError(f"S3 list failed for prefix={prefix!r}: {exc}") from exc
+
+    def delete(self, path: str) -> None:
+        try:
+            self._client.delete_object(Bucket=self._bucket, Key=path)
+        except ClientError as exc:
+            raise BlueStarError(f"S3 delete failed for {path!r}: {exc}") from exc
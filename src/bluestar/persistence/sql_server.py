@@ -2,23 +2,98 @@
 
 from __future__ import annotations
 
+import contextlib
+import queue
+import threading
+from collections.abc import Iterable, Iterator
 from typing import Any
 
-# TODO: Implement ODBC connection pool to CapitalSG-64
+from bluestar.core.exceptions import SQLServerError
+
+# TODO: Implement queries against CapitalSG-64 on the pooled connections
 # Queries: PersonalInfoByPlan, jobstatuscurrent, originalDOH,
 #          CurrentContributionRates, YTD, ERContribYTD, PlanEECodeHistExport,
 #          DetailsWithPaySchedXML, DepWDDetail, PayrollForfs
 
+# Stored procedures the platform may execute; the name is spliced into the
+# EXEC statement, so anything else is refused.
+ALLOWED_PROCEDURES: frozenset[str] = frozenset({"Stata_Save_DepWDDetail"})
+
 
 class SQLServerClient:
-    """Production ISQLClient backed by pyodbc."""
+    """Production ISQLClient backed by pyodbc.
+
+    At most ``pool_size`` connections are open at once; idle ones are reused.
+    """
 
-    def __init__(self, connection_string: str, pool_size: int = 5) -> None:
+    def __init__(
+        self, connection_string: str, pool_size: int = 5, procedures: Iterable[str] = ALLOWED_PROCEDURES
+    ) -> None:
         self._connection_string = connection_string
         self._pool_size = pool_size
+        self._procedures = frozenset(procedures)
+        self._idle: queue.LifoQueue[Any] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def _connect(self) -> Any:
+        import pyodbc  # optional dependency: bluestar[sql]
+
+        return pyodbc.connect(self._connection_string, autocommit=False)
+
+    @contextlib.contextmanager
+    def _connection(self) -> Iterator[Any]:
+        """Borrow a pooled connection; one that raised is closed rather than returned."""
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            except BaseException:
+                with contextlib.suppress(Exception):
+                    conn.close()
+                raise
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        """Close every idle pooled connection."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            with contextlib.suppress(Exception):
+                conn.close()
 
     def query(self, sql: str, params: tuple[Any, ...] = ()) -> list[dict[str, Any]]:
         raise NotImplementedError
 
     def execute_sp(self, sp_name: str, params: dict[str, Any]) -> dict[str, Any]:
         raise NotImplementedError
+
+    def execute_sp_many(self, sp_name: str, rows: list[dict[str, Any]]) -> int:
+        """Bulk-execute a stored procedure with ``fast_executemany`` in one transaction.
+
+        Parameters are bound positionally by name (``@Name = ?``) from the
+        first row's keys; every row must have the same keys. Any failure rolls
+        back the whole batch.
+        """
+        if sp_name not in self._procedures:
+            raise SQLServerError(f"Stored procedure {sp_name!r} is not allowed")
+        if not rows:
+            return 0
+        names = list(rows[0])
+        if not all(n.isidentifier() for n in names):
+            raise SQLServerError(f"Invalid parameter names for {sp_name}: {names}")
+        sql = f"EXEC [dbo].[{sp_name}] " + ", ".join(f"@{n} = ?" for n in names)
+        with self._connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.fast_executemany = True
+                cursor.executemany(sql, [tuple(row[n] for n in names) for row in rows])
+                conn.commit()
+            except Exception as exc:
+                conn.rollback()
+                raise SQLServerError(f"{sp_name} bulk execute of {len(rows)} rows failed: {exc}") from exc
+        return len(rows)
@@ -0,0 +1,172 @@
+"""On-premises Token Service client (NACHA bank data resolution).
+
+NACHA COMPLIANCE: resolved bank data is never cached, logged or persisted.
+``resolve_many`` fans the lookups for a batch out over a pooled HTTP client
+and returns a ``BankDataVault`` — a batch-scoped, in-memory mapping whose
+byte buffers are overwritten with zeros when the vault is closed. Use it as a
+context manager around ACH file generation.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any
+
+import httpx
+
+from bluestar.core.exceptions import TokenServiceError
+
+SefaKey = tuple[str, str, str]
+
+BANK_FIELDS: tuple[str, ...] = (
+    "bankacctownername", "bankname", "bankaba", "bankacctno", "bankcity", "bankstate", "bankzipcode",
+)
+
+_NACHA_HEADERS = {"X-NACHA-Compliance": "true"}
+
+
+class BankDataVault(Mapping[SefaKey, dict[str, str]]):
+    """Batch-scoped bank data keyed by (sefaid1, sefaid2, sefaid3).
+
+    Values are held as ``bytearray`` and decoded on access; ``close`` zeroes
+    every buffer and empties the vault. Decoded copies handed to callers are
+    ordinary strings — keep them local to file generation. ``failed`` maps
+    SEFA keys that could not be resolved to the reason (never bank data).
+    """
+
+    __slots__ = ("_data", "failed", "_closed")
+
+    def __init__(self) -> None:
+        self._data: dict[SefaKey, dict[str, bytearray]] = {}
+        self.failed: dict[SefaKey, str] = {}
+        self._closed = False
+
+    def put(self, key: SefaKey, record: Mapping[str, Any]) -> None:
+        if self._closed:
+            raise TokenServiceError("Bank data vault is closed")
+        self._data[key] = {f: bytearray(str(record.get(f) or ""), "utf-8") for f in BANK_FIELDS}
+
+    def __getitem__(self, key: SefaKey) -> dict[str, str]:
+        return {f: bytes(v).decode("utf-8") for f, v in self._data[key].items()}
+
+    def __iter__(self) -> Iterator[SefaKey]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:  # never show bank data
+        return f"BankDataVault(resolved={len(self._data)}, failed={len(self.failed)}, closed={self._closed})"
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self) -> None:
+        """Zero and drop every buffer."""
+        for record in self._data.values():
+            for buf in record.values():
+                buf[:] = bytes(len(buf))
+        self._data.clear()
+        self._closed = True
+
+    def __enter__(self) -> BankDataVault:
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.close()
+
+
+class HTTPTokenService:
+    """Production ITokenService over a pooled ``httpx`` client."""
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 10,
+        max_connections: int = 8,
+        client: httpx.Client | None = None,
+    ) -> None:
+        self._timeout = timeout
+        self._max_connections = max_connections
+        self._client = client or httpx.Client(
+            base_url=base_url,
+            timeout=timeout,
+            headers=_NACHA_HEADERS,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    def _post(self, key: SefaKey, timeout: float) -> dict[str, Any]:
+        body = {"sefaId1": key[0], "sefaId2": key[1], "sefaId3": key[2]}
+        try:
+            resp = self._client.post("/resolve", json=body, headers=_NACHA_HEADERS, timeout=timeout)
+            resp.raise_for_status()
+            data = resp.json()
+        except httpx.TimeoutException as exc:
+            raise TokenServiceError(f"Token Service timed out for SEFA {key}") from exc
+        except httpx.HTTPStatusError as exc:
+            raise TokenServiceError(f"Token Service returned {exc.response.status_code} for SEFA {key}") from exc
+        except httpx.HTTPError as exc:
+            raise TokenServiceError(f"Token Service request failed for SEFA {key}: {type(exc).__name__}") from exc
+        except ValueError as exc:
+            raise TokenServiceError(f"Token Service returned invalid JSON for SEFA {key}") from exc
+        if not isinstance(data, dict):
+            raise TokenServiceError(f"Token Service returned {type(data).__name__}, not an object, for SEFA {key}")
+        return data
+
+    def resolve(self, sefa_id1: str, sefa_id2: str, sefa_id3: str) -> dict[str, Any]:
+        return self._post((sefa_id1, sefa_id2, sefa_id3), self._timeout)
+
+    def resolve_many(self, sefa_ids: Iterable[SefaKey], deadline: float | None = None) -> BankDataVault:
+        """Resolve every distinct SEFA tuple concurrently.
+
+        Each call's timeout is the smaller of the client timeout and the time
+        left before ``deadline`` (seconds from now). Calls still outstanding at
+        the deadline are recorded in ``vault.failed`` rather than awaited.
+        """
+        keys = list(dict.fromkeys(sefa_ids))
+        vault = BankDataVault()
+        if not keys:
+            return vault
+        stop = time.monotonic() + deadline if deadline is not None else None
+
+        def call(key: SefaKey) -> dict[str, Any]:
+            remaining = self._timeout if stop is None else min(self._timeout, stop - time.monotonic())
+            if remaining <= 0:
+                raise TokenServiceError(f"Deadline exceeded before resolving SEFA {key}")
+            return self._post(key, remaining)
+
+        pool = ThreadPoolExecutor(max_workers=min(self._max_connections, len(keys)), thread_name_prefix="token")
+        try:
+            pending: dict[Future[dict[str, Any]], SefaKey] = {pool.submit(call, k): k for k in keys}
+            while pending:
+                timeout = None if stop is None else max(stop - time.monotonic(), 0)
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for fut in done:
+                    key = pending.pop(fut)
+                    try:
+                        vault.put(key, fut.result())
+                    except TokenServiceError as exc:
+                        vault.failed[key] = str(exc)
+            for fut, key in pending.items():
+                fut.cancel()
+                vault.failed[key] = "Deadline exceeded"
+        except BaseException:
+            vault.close()
+            raise
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return vault
+
+    def close(self) -> None:
+        self._client.close()
+
+    def __enter__(self) -> HTTPTokenService:
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.close()
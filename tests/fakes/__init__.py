@@ -7,6 +7,19 @@ from bluestar.persistence.memory_backend import (
     MemoryFileStore,
     MemoryRulesStore,
     MemorySQLClient,
+    MemorySQSClient,
+    MemoryTokenService,
 )
+from tests.fakes.clock import FakeClock
+from tests.fakes.token_server import StubTokenServer
 
-__all__ = ["MemoryCacheBackend", "MemoryFileStore", "MemoryRulesStore", "MemorySQLClient"]
+__all__ = [
+    "FakeClock",
+    "MemoryCacheBackend",
+    "MemoryFileStore",
+    "MemoryRulesStore",
+    "MemorySQLClient",
+    "MemorySQSClient",
+    "MemoryTokenService",
+    "StubTokenServer",
+]
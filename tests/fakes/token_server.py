@@ -0,0 +1,100 @@
+"""Local stub of the on-prem Token Service ``POST /resolve`` endpoint.
+
+Runs a threaded HTTP server on 127.0.0.1 with an ephemeral port. Bank data is
+synthesized from the SEFA IDs; ``delays`` and ``failures`` make selected SEFA
+tuples slow or return an HTTP error, and ``barrier`` holds every response
+until that many requests are in flight at once (503 if they never are). The
+server tracks request counts and the peak number of concurrent requests.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+SefaKey = tuple[str, str, str]
+
+
+def fake_bank_data(key: SefaKey) -> dict[str, str]:
+    return {
+        "bankacctownername": f"Owner {key[0]}",
+        "bankname": "Stub Bank",
+        "bankaba": "11000028",  # 8 digits: callers zero-pad to 9
+        "bankacctno": f"{key[0]}{key[1]}{key[2]}",
+        "bankcity": "Austin",
+        "bankstate": "TX",
+        "bankzipcode": "78701",
+    }
+
+
+class StubTokenServer:
+    """Context manager running the stub Token Service in a background thread."""
+
+    def __init__(self, delays: dict[SefaKey, float] | None = None,
+                 failures: dict[SefaKey, int] | None = None, barrier: int = 0) -> None:
+        self.delays = delays or {}
+        self.failures = failures or {}
+        self.barrier = threading.Barrier(barrier, timeout=5) if barrier else None
+        self.requests = 0
+        self.nacha_headers = 0
+        self.peak_concurrency = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:  # quiet
+                pass
+
+            def do_POST(self) -> None:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                key = (body["sefaId1"], body["sefaId2"], body["sefaId3"])
+                with stub._lock:
+                    stub.requests += 1
+                    stub.nacha_headers += self.headers.get("X-NACHA-Compliance") == "true"
+                    stub._active += 1
+                    stub.peak_concurrency = max(stub.peak_concurrency, stub._active)
+                try:
+                    time.sleep(stub.delays.get(key, 0))
+                    status = stub.failures.get(key, 200)
+                    if stub.barrier is not None:
+                        try:
+                            stub.barrier.wait()
+                        except threading.BrokenBarrierError:
+                            status = 503
+                    payload = json.dumps(fake_bank_data(key) if status == 200 else {"error": "x"}).encode()
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client gave up at its deadline
+                finally:
+                    with stub._lock:
+                        stub._active -= 1
+
+        return Handler
+
+    def __enter__(self) -> StubTokenServer:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,55 @@
+"""Unit tests for ACHCalcService."""
+
+from __future__ import annotations
+
+from decimal import Decimal
+
+from bluestar.agents.compliance.ach_calc import ACHCalcService
+from bluestar.models.payroll_batch import PayrollBatch
+from bluestar.models.payroll_record import CanonicalPayrollRecord as Rec
+from bluestar.persistence.memory_backend import MemoryTokenService
+
+
+def _batch():
+    batch = PayrollBatch.from_records([
+        Rec(planid="P1", deferral=Decimal("100"), match=Decimal("50"), loan=Decimal("20")),
+        Rec(planid="P1", deferral=Decimal("25.01"), aftertax=Decimal("5"), prevwageer=Decimal("1")),
+        Rec(planid="P1", rothdeferral=Decimal("-10")),
+        Rec(planid="P1"),  # all-zero group is dropped
+    ])
+    batch.add_column("sefaid1", ["S1", "S1", "S2", "S3"])
+    batch.add_column("sefaid2", ["A"] * 4)
+    batch.add_column("sefaid3", ["B"] * 4)
+    batch.add_column("achpayroll", ["20260313"] * 4)
+    batch.add_column("lastpd", ["1", "2", "1", "1"])
+    return batch
+
+
+def test_collapse_by_sefa_and_amounts():
+    records = ACHCalcService.calculate(_batch(), trust_description_prefix="Acme", request_date="2026-03-16")
+    assert [(r.sefa_id1, r.total_amt) for r in records] == [("S1", Decimal("201.01")), ("S2", Decimal("-10.00"))]
+    s1 = records[0]
+    assert (s1.er_amt, s1.ee_amt, s1.loan_pymt_amt, s1.after_tax_amt) == (
+        Decimal("51.00"), Decimal("125.01"), Decimal("20.00"), Decimal("5.00"),
+    )
+    assert s1.trust_description == "Acme - Payroll 20260313"
+    assert (s1.negative_source_ind, records[1].negative_source_ind) == (0, 1)
+
+
+def test_alternate_collapse_by_lastpd():
+    records = ACHCalcService.calculate(_batch(), collapse_by_ach_payroll=False)
+    assert [r.sefa_id1 for r in records] == ["S1", "S1", "S2"]
+    assert records[0].trust_description == "Payroll 20260313"
+
+
+def test_generate_pairs_bank_data_in_memory_and_reports_missing():
+    tokens = MemoryTokenService()
+    tokens._bank_data[("S1", "A", "B")] = {"bankaba": "11000028", "bankacctno": "999"}
+    service = ACHCalcService(tokens)
+    emitted = []
+    result = service.generate(
+        ACHCalcService.calculate(_batch()), lambda rec, bank: emitted.append((rec.sefa_id1, bank["bankaba"]))
+    )
+    assert emitted == [("S1", "011000028")]
+    assert result.missing_sefa == [("S2", "A", "B")]
+    assert tokens.calls == 2
@@ -0,0 +1,145 @@
+"""Unit tests for DeadlineMonitorService."""
+
+from __future__ import annotations
+
+import threading
+from datetime import UTC, datetime, time, timedelta
+
+from bluestar.agents.business_calendar import custodian_deadline
+from bluestar.agents.compliance.deadline_monitor import DeadlineMonitorService
+from bluestar.core.protocols import IClock
+from bluestar.models.pipeline import BatchState, BatchStatus
+from tests.fakes import FakeClock, MemoryRulesStore
+
+
+def _rules():
+    rules = MemoryRulesStore()
+    rules._configs["P1:Weekly"] = {"custodian": "Matrix Trust"}
+    rules._configs["P2:Weekly"] = {"custodian": "Schwab"}
+    rules._configs["P3:Weekly"] = {
+        "custodian": "Other", "custodianCutoff": "14:00", "custodianTimezone": "America/New_York",
+    }
+    return rules
+
+
+def _batch(batch_id, plan_id, status=BatchStatus.PROCESSING):
+    return BatchState(batch_id=batch_id, plan_id=plan_id, pay_freq="Weekly", s3_path="", status=status)
+
+
+def _monitor(clock):
+    fired = []
+    return DeadlineMonitorService(_rules(), clock, fired.append), fired
+
+
+def test_deadlines_from_config():
+    assert custodian_deadline({"custodian": "Matrix Trust"}).cutoff == time(15, 30)
+    assert custodian_deadline({"custodian": "Unknown"}) is None
+    nyc = custodian_deadline({"custodian": "X", "custodianCutoff": "14:00", "custodianTimezone": "America/New_York"})
+    assert str(nyc.tz) == "America/New_York"
+
+
+def test_wakes_exactly_at_escalation_threshold():
+    # 2026-03-16 is CDT (UTC-5): Matrix Trust 15:30 CT = 20:30 UTC, escalate at 20:00 UTC.
+    clock = FakeClock(datetime(2026, 3, 16, 14, 0, tzinfo=UTC))
+    assert isinstance(clock, IClock)
+    monitor, fired = _monitor(clock)
+    escalate_at = monitor.track(_batch("b1", "P1"))
+    assert escalate_at == datetime(2026, 3, 16, 20, 0, tzinfo=UTC)
+    monitor.track(_batch("b2", "P2"))  # Schwab 12:00 CT = 17:00 UTC, escalate at 16:30 UTC
+    monitor.track(_batch("b3", "P3"))  # 14:00 ET = 18:00 UTC, escalate at 17:30 UTC
+    assert monitor.next_wakeup() == datetime(2026, 3, 16, 16, 30, tzinfo=UTC)
+
+    clock.set(datetime(2026, 3, 16, 16, 29, 59, tzinfo=UTC))
+    assert monitor.poll() == []
+    clock.advance(1)
+    [payload] = monitor.poll()
+    assert payload.batch_id == "b2"
+    assert payload.time_remaining == "30 min"
+    assert payload.escalation_reason == "Schwab deadline at risk: 30 min remaining"
+    assert fired == [payload]
+    assert monitor.next_wakeup() == datetime(2026, 3, 16, 17, 0, tzinfo=UTC)  # b2 DEADLINE_MISSED
+
+
+def test_incremental_updates():
+    clock = FakeClock(datetime(2026, 3, 16, 14, 0, tzinfo=UTC))
+    monitor, fired = _monitor(clock)
+    monitor.track(_batch("b1", "P1"))
+    monitor.track(_batch("b2", "P2"))
+    assert monitor.track(_batch("b2", "P2", BatchStatus.COMPLETED)) is None
+    assert monitor.pending() == ["b1"]
+    assert monitor.next_wakeup() == datetime(2026, 3, 16, 20, 0, tzinfo=UTC)
+    assert monitor.track(_batch("b4", "P4")) is None  # no custodian configured
+
+    clock.advance(timedelta(hours=12))
+    at_risk, missed = monitor.poll()  # woke after the cutoff: both escalations at once
+    assert (at_risk.batch_id, missed.batch_id) == ("b1", "b1")
+    assert missed.escalation_reason.startswith("Matrix Trust deadline missed")
+    assert monitor.poll() == [] and monitor.next_wakeup() is None
+    assert len(fired) == 2
+
+
+def test_at_risk_then_missed():
+    clock = FakeClock(datetime(2026, 3, 16, 16, 30, tzinfo=UTC))
+    monitor, fired = _monitor(clock)
+    monitor.track(_batch("b2", "P2"))  # Schwab 17:00 UTC
+    [at_risk] = monitor.poll()
+    assert at_risk.escalation_reason == "Schwab deadline at risk: 30 min remaining"
+    assert monitor.pending() == ["b2"]
+    assert monitor.next_wakeup() == datetime(2026, 3, 16, 17, 0, tzinfo=UTC)
+
+    clock.advance(timedelta(minutes=31))
+    [missed] = monitor.poll()
+    assert missed.escalation_reason == "Schwab deadline missed: 1 min late"
+    assert missed.time_remaining == "-1 min"
+    assert monitor.pending() == [] and fired == [at_risk, missed]
+
+
+def test_client_deadlines_reloaded_after_ttl():
+    clock = FakeClock(datetime(2026, 3, 16, 14, 0, tzinfo=UTC))
+    rules = _rules()
+    monitor = DeadlineMonitorService(rules, clock, lambda payload: None)
+    assert monitor.deadline_for("P1", "Weekly").cutoff == time(15, 30)
+    rules._configs["P1:Weekly"] = {"custodian": "Schwab"}
+    assert monitor.deadline_for("P1", "Weekly").cutoff == time(15, 30)
+    clock.advance(timedelta(hours=1, seconds=1))
+    assert monitor.deadline_for("P1", "Weekly").cutoff == time(12, 0)
+
+
+def test_run_follows_a_fake_clock_and_calls_back_without_the_lock():
+    clock = FakeClock(datetime(2026, 3, 16, 14, 0, tzinfo=UTC))
+    fired = []
+    done = threading.Event()
+
+    def escalate(payload):
+        # Another thread must be able to use the monitor while the callback runs.
+        other = threading.Thread(target=monitor.pending)
+        other.start()
+        other.join(1)
+        fired.append((payload, other.is_alive()))
+        done.set()
+
+    monitor = DeadlineMonitorService(_rules(), clock, escalate)
+    worker = threading.Thread(target=monitor.run)
+    worker.start()
+    monitor.track(_batch("b1", "P1"))  # escalates at 20:00 UTC, six fake hours away
+    clock.set(datetime(2026, 3, 16, 20, 0, tzinfo=UTC))
+    monitor.wake()
+    assert done.wait(2)
+    monitor.stop()
+    worker.join(2)
+    assert not worker.is_alive()
+    [(payload, blocked)] = fired
+    assert payload.batch_id == "b1" and not blocked
+
+
+def test_run_fires_due_batches_and_stops():
+    clock = FakeClock(datetime(2026, 3, 16, 20, 15, tzinfo=UTC))
+    fired_event = threading.Event()
+    monitor = DeadlineMonitorService(_rules(), clock, lambda payload: fired_event.set())
+    worker = threading.Thread(target=monitor.run)
+    worker.start()
+    monitor.track(_batch("b1", "P1"))
+    assert fired_event.wait(2)
+    monitor.stop()
+    worker.join(2)
+    assert not worker.is_alive()
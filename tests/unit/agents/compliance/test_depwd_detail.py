@@ -0,0 +1,106 @@
+"""Unit tests for DepWDDetailService."""
+
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+from bluestar.agents.compliance.depwd_detail import SAVE_DEPWD_SP, DepWDDetailService, depwd_lookup_sql
+from bluestar.core.exceptions import SQLServerError
+from bluestar.models.payroll_batch import PayrollBatch
+from bluestar.models.payroll_record import CanonicalPayrollRecord as Rec
+from bluestar.persistence.memory_backend import MemorySQLClient
+
+
+class RecordingSQLClient(MemorySQLClient):
+    def __init__(self) -> None:
+        super().__init__()
+        self.sp_calls: list[tuple[str, dict]] = []
+        self.bulk_calls = 0
+        self.queries: list[tuple[str, tuple]] = []
+
+    def query(self, sql, params=()):
+        self.queries.append((sql, params))
+        return super().query(sql, params)
+
+    def execute_sp(self, sp_name, params):
+        self.sp_calls.append((sp_name, params))
+        return {}
+
+    def execute_sp_many(self, sp_name, rows):
+        self.bulk_calls += 1
+        return super().execute_sp_many(sp_name, rows)
+
+
+def _batch():
+    batch = PayrollBatch.from_records([
+        Rec(deferral=Decimal("100"), rothdeferral=Decimal("10"), aftertax=Decimal("5")),
+        Rec(shmatch=Decimal("3"), shmatchqaca=Decimal("2"), pshare=Decimal("1"), prevwageqnec=Decimal("4")),
+        Rec(shne=Decimal("7"), shneqaca=Decimal("1"), loan=Decimal("9"), match=Decimal("6")),
+    ])
+    batch.add_column("planidrelius", ["R1"] * 3)
+    batch.add_column("effectivedate", ["2026-03-13"] * 3)
+    batch.add_column("description", ["Payroll"] * 3)
+    return batch
+
+
+def test_depwd_aggregation_rules():
+    [detail] = DepWDDetailService.aggregate(_batch())
+    assert detail.total_amt == Decimal("148.00")
+    assert detail.roth_amt == Decimal("15.00")
+    assert detail.shmatch_amt == Decimal("5.00")
+    assert detail.pshare_amt == Decimal("5.00")
+    assert detail.shne_amt == Decimal("8.00")
+    assert (detail.match_amt, detail.loan_amt, detail.deferral_amt) == (
+        Decimal("6.00"), Decimal("9.00"), Decimal("100.00"),
+    )
+
+
+def _two_plan_batch():
+    batch = PayrollBatch.from_records([Rec(deferral=Decimal(str(i + 1))) for i in range(4)])
+    batch.add_column("planidrelius", ["R1", "R1", "R2", "R2"])
+    batch.add_column("effectivedate", ["2026-03-13", "2026-03-20", "2026-03-13", "2026-03-13"])
+    batch.add_column("description", ["Payroll", "Payroll", "Payroll", "Payroll"])
+    return batch
+
+
+def test_one_lookup_and_one_bulk_save():
+    sql = RecordingSQLClient()
+    sql._responses[depwd_lookup_sql(3)] = [
+        {"DepWDDetailID": 41, "PlanNumId": "R1", "EffectiveDate": date(2026, 3, 13), "Description": "Payroll"},
+        {"DepWDDetailID": 42, "PlanNumId": "R1 ", "EffectiveDate": "2026-03-20 00:00:00", "Description": "Payroll"},
+        {"DepWDDetailID": 43, "PlanNumId": "R2", "EffectiveDate": "2026-03-13", "Description": "Payroll"},
+        {"DepWDDetailID": 44, "PlanNumId": "R2", "EffectiveDate": "2026-03-13", "Description": "Payroll"},
+    ]
+    result = DepWDDetailService(sql).execute(_two_plan_batch(), date(2026, 3, 16))
+    assert sql.queries == [(depwd_lookup_sql(3), (
+        "R1", "2026-03-13", "Payroll", "R1", "2026-03-20", "Payroll", "R2", "2026-03-13", "Payroll",
+    ))]
+    assert sql.bulk_calls == 1
+    assert [d.dep_wd_detail_id for d in result.updated] == [41, 42]
+    assert [p["DepWDDetailID"] for _, p in sql.sp_calls] == [41, 42]
+    assert sql.sp_calls[0][0] == SAVE_DEPWD_SP
+    # R2 has a duplicate ID
+    assert [d.plan_id_relius for d in result.needs_manual_update] == ["R2"]
+
+
+def test_bulk_failure_sends_every_detail_to_manual_update():
+    class FailingSQLClient(RecordingSQLClient):
+        def execute_sp_many(self, sp_name, rows):
+            raise SQLServerError("rolled back")
+
+    sql = FailingSQLClient()
+    sql._responses[depwd_lookup_sql(1)] = [
+        {"DepWDDetailID": 1, "PlanNumId": "R1", "EffectiveDate": "2026-03-13", "Description": "Payroll"},
+    ]
+    result = DepWDDetailService(sql).execute(_batch(), date(2026, 3, 16))
+    assert result.updated == []
+    assert [d.plan_id_relius for d in result.needs_manual_update] == ["R1"]
+    assert result.error == "rolled back"
+
+
+def test_lookup_is_chunked(monkeypatch):
+    monkeypatch.setattr("bluestar.agents.compliance.depwd_detail.LOOKUP_CHUNK", 2)
+    sql = RecordingSQLClient()
+    DepWDDetailService(sql).execute(_two_plan_batch(), date(2026, 3, 16))
+    assert [len(params) for _, params in sql.queries] == [6, 3]
@@ -0,0 +1,71 @@
+"""Unit tests for ForfeitureService."""
+
+from __future__ import annotations
+
+from decimal import Decimal
+
+from bluestar.agents.compliance.forfeiture import (
+    ForfeitureService,
+    allocate_largest_remainder,
+    payroll_forfs_sql,
+)
+from bluestar.models.payroll_batch import PayrollBatch
+from bluestar.models.payroll_record import CanonicalPayrollRecord as Rec
+from bluestar.persistence.memory_backend import MemorySQLClient
+
+
+class RecordingSQLClient(MemorySQLClient):
+    def __init__(self) -> None:
+        super().__init__()
+        self.queries: list[tuple[str, tuple]] = []
+
+    def query(self, sql, params=()):
+        self.queries.append((sql, params))
+        return super().query(sql, params)
+
+
+def test_largest_remainder_reconciles_to_the_penny():
+    assert allocate_largest_remainder(100, [1, 1, 1]) == [34, 33, 33]
+    assert allocate_largest_remainder(1001, [2, 3, 5]) == [200, 300, 501]
+    assert allocate_largest_remainder(5, [0, 0]) == [0, 0]
+    parts = allocate_largest_remainder(99_999, [7, 13, 29, 31])
+    assert sum(parts) == 99_999
+
+
+def test_prevailing_wage_excluded_and_capped_at_available():
+    batch = PayrollBatch.from_records([
+        Rec(planid="P1", match=Decimal("50"), pshare=Decimal("25"), prevwageer=Decimal("1000")),
+        Rec(planid="P2", shne=Decimal("10"), prevwageqnec=Decimal("500")),
+    ])
+    sql = RecordingSQLClient()
+    sql._responses[payroll_forfs_sql(2)] = [
+        {"planid": "P1", "forfavail": Decimal("40")},
+        {"planid": "P2 ", "forfavail": Decimal("100")},
+    ]
+    results = ForfeitureService(sql).execute(batch)
+    assert sql.queries == [(payroll_forfs_sql(2), ("P1", "P2"))]
+    p1, p2 = results
+    assert (p1.er_total, p1.forfeiture_applied) == (Decimal("75.00"), Decimal("-40.00"))
+    assert (p2.er_total, p2.forfeiture_applied) == (Decimal("10.00"), Decimal("-10.00"))
+
+
+def test_multi_identifier_allocation_sums_to_plan_amount():
+    batch = PayrollBatch.from_records([
+        Rec(planid="P1", identifier="A", match=Decimal("10")),
+        Rec(planid="P1", identifier="B", match=Decimal("10")),
+        Rec(planid="P1", identifier="C", match=Decimal("10")),
+    ])
+    sql = MemorySQLClient()
+    sql._responses[payroll_forfs_sql(1)] = [{"planid": "P1", "forfavail": Decimal("1.00")}]
+    plan, *idents = ForfeitureService(sql).execute(batch)
+    assert plan.identifier is None and plan.forfeiture_applied == Decimal("-1.00")
+    assert [r.identifier for r in idents] == ["A", "B", "C"]
+    assert [r.forfeiture_applied for r in idents] == [Decimal("-0.34"), Decimal("-0.33"), Decimal("-0.33")]
+    assert sum(r.forfeiture_applied for r in idents) == plan.forfeiture_applied
+
+
+def test_plans_not_using_forfeitures_are_not_reported():
+    batch = PayrollBatch.from_records([Rec(planid="P1", match=Decimal("10")), Rec(planid="P2")])
+    sql = MemorySQLClient()
+    sql._responses[payroll_forfs_sql(2)] = [{"planid": "P2", "forfavail": Decimal("100")}]
+    assert ForfeitureService(sql).execute(batch) == []
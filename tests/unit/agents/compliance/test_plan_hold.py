@@ -0,0 +1,97 @@
+"""Unit tests for PlanHoldService."""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from bluestar.agents.compliance.plan_hold import (
+    HELD,
+    HELD_ELIGRUN,
+    HELD_REVOKED,
+    MULTIPLE_CLIENTIDS_ON_HOLD,
+    HoldWindows,
+    PlanHoldService,
+    hold_rule,
+    hold_status,
+)
+from bluestar.models.payroll_batch import PayrollBatch
+from bluestar.models.payroll_record import CanonicalPayrollRecord as Rec
+from tests.fakes import FakeClock, MemoryRulesStore
+
+
+class CountingRulesStore(MemoryRulesStore):
+    def __init__(self) -> None:
+        super().__init__()
+        self.hold_loads = 0
+
+    def get_plan_holds(self, plan_id):
+        self.hold_loads += 1
+        return super().get_plan_holds(plan_id)
+
+
+def test_windows_respect_conditions_and_precedence():
+    windows = HoldWindows.compile([
+        hold_rule({"planId": "P1", "clientId": "C1", "holdReasonCd": "F", "holdReason": "Frozen",
+                   "holdAsOfDate": "2026-03-01", "endDate": "2026-03-31"}),
+        hold_rule({"planId": "P1", "clientId": "C1", "holdReasonCd": "R", "holdReason": "Revoked",
+                   "holdAsOfDate": "2026-03-15"}),
+        hold_rule({"planId": "P1", "clientId": "C2", "holdReasonCd": "NC", "maxStartDate": "2026-02-28"}),
+        hold_rule({"planId": "P1", "clientId": "C3", "holdReasonCd": "O", "addlInfo": "Transfer",
+                   "holdAsOfDate": "2026-04-01", "maxStartDate": "2026-02-01"}),
+    ])
+    assert windows.lookup("C1", date(2026, 2, 27)) == ("False", "")
+    assert windows.lookup("C1", date(2026, 3, 10)) == (HELD, "Frozen")
+    assert windows.lookup("C1", date(2026, 3, 20)) == (HELD_REVOKED, "Frozen; Revoked")
+    assert windows.lookup("C1", date(2026, 4, 20)) == (HELD_REVOKED, "Revoked")
+    assert windows.lookup("C2", date(2026, 2, 1)) == (HELD_ELIGRUN, "")
+    assert windows.lookup("C2", date(2026, 2, 28)) == ("False", "")  # maxStartDate > payrollDate is strict
+    # holdUntil and holdAfter are separate conditions: held before Feb 1 and from Apr 1, free between
+    assert windows.lookup("C3", date(2026, 1, 15)) == (HELD, "Other-Transfer")
+    assert windows.lookup("C3", date(2026, 3, 1)) == ("False", "")
+    assert windows.lookup("C3", date(2026, 4, 1)) == (HELD, "Other-Transfer")
+    assert windows.lookup("C9", date(2026, 3, 1)) == ("False", "")
+
+
+def test_eligrun_codes_and_revoked_reason_text():
+    assert hold_status(hold_rule({"planId": "P", "clientId": "C", "holdReasonCd": "AC"})) == HELD_ELIGRUN
+    assert hold_status(hold_rule({"planId": "P", "clientId": "C", "holdReasonCd": "nc "})) == HELD_ELIGRUN
+    assert hold_status(hold_rule({"planId": "P", "clientId": "C", "holdReason": "Revoked"})) == HELD_REVOKED
+    assert hold_status(hold_rule({"planId": "P", "clientId": "C", "holdReasonCd": "A", "holdReason": "Amendment"})) \
+        == HELD
+
+
+def test_group_broadcast_eligrun_override_and_multiple_clients():
+    rules = CountingRulesStore()
+    rules._plan_holds["P1"] = [
+        {"planId": "P1", "clientId": "C1", "holdReasonCd": "B", "holdReason": "Blackout"},
+        {"planId": "P1", "clientId": "C2", "holdReasonCd": "AC"},
+    ]
+    rules._plan_holds["P3"] = [{"planId": "P3", "clientId": "C1", "holdReasonCd": "NC"}]
+    batch = PayrollBatch.from_records([
+        Rec(planid="P1", clientid="C1", deferral=Decimal("10")),
+        Rec(planid="P1", clientid="C1"),
+        Rec(planid="P1", clientid="C2"),  # no contributions of its own, but planidtotal > 0
+        Rec(planid="P2", clientid="C1", deferral=Decimal("10")),
+        Rec(planid="P3", clientid="C1"),  # planidtotal == 0 → EligRun released
+    ])
+    result = PlanHoldService(rules, FakeClock()).execute(batch, date(2026, 3, 16))
+    assert batch.column("planhold") == [HELD, HELD, HELD, "False", "False"]
+    assert batch.column("planholdnote")[:2] == ["Blackout", "Blackout"]
+    assert result.held_records == 3
+    assert result.held_clients == [("P1", "C1"), ("P1", "C2")]
+    assert result.escalations == {"P1": MULTIPLE_CLIENTIDS_ON_HOLD}
+    assert rules.hold_loads == 3  # one load per plan, not per record
+
+
+def test_compiled_windows_expire_after_ttl():
+    rules = CountingRulesStore()
+    clock = FakeClock()
+    service = PlanHoldService(rules, clock)
+    service.windows("P1")
+    clock.advance(timedelta(minutes=14))
+    service.windows("P1")
+    assert rules.hold_loads == 1
+    clock.advance(timedelta(minutes=1))
+    service.windows("P1")
+    assert rules.hold_loads == 2
@@ -0,0 +1,128 @@
+"""Unit tests for the multi-batch scheduler and resource admission."""
+
+from __future__ import annotations
+
+import asyncio
+
+from bluestar.agents.orchestrator.admission import SQL, ResourceAdmission, ResourceGate, ResourceLimit
+from bluestar.agents.orchestrator.batch_scheduler import BatchRequest, BatchScheduler
+from bluestar.orchestration.inprocess_orchestrator import InProcessOrchestrator
+from tests.fakes import FakeClock, MemoryRulesStore
+
+
+def _rules():
+    rules = MemoryRulesStore()
+    rules._configs["SCHWAB:W"] = {"custodian": "Schwab"}  # 12:00 PM Central
+    rules._configs["MATRIX:W"] = {"custodian": "Matrix Trust"}  # 3:30 PM Central
+    for plan in ("SCHWAB", "MATRIX", "NONE"):
+        rules._pipeline_steps[f"{plan}:W"] = [
+            {"stepOrder": 100, "subroutineName": "EMPLOYMENT_STATUS", "agent": "VALIDATOR"},
+        ]
+    return rules
+
+
+class Recording:
+    def __init__(self) -> None:
+        self.order: list[str] = []
+
+    async def dispatch_step(self, batch_id, step_order, agent, parameters):
+        raise NotImplementedError
+
+    async def run_pipeline(self, batch_id, plan_id, pay_freq, s3_path):
+        self.order.append(batch_id)
+        await asyncio.sleep(0.01)
+        return {"status": "COMPLETED" if plan_id != "NONE" else "FAILED"}
+
+
+async def test_queued_batches_run_nearest_deadline_first():
+    orchestrator = Recording()
+    scheduler = BatchScheduler(orchestrator, _rules(), clock=FakeClock(), max_batches=1)
+    await scheduler.run([
+        BatchRequest("first", "NONE", "W", ""),
+        BatchRequest("no-deadline", "NONE", "W", ""),
+        BatchRequest("matrix", "MATRIX", "W", ""),
+        BatchRequest("schwab", "SCHWAB", "W", ""),
+    ])
+    assert orchestrator.order == ["first", "schwab", "matrix", "no-deadline"]
+    metrics = scheduler.metrics()
+    assert metrics["queue_depth"] == 0 and metrics["running"] == 0
+    assert (metrics["completed"], metrics["failed"]) == (2, 2)
+    assert metrics["queue_wait_ms_max"] >= 20
+
+
+async def test_sql_pool_admission_bounds_steps_across_batches():
+    active, peak = 0, 0
+
+    async def employment_status(ctx):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return {}
+
+    admission = ResourceAdmission({SQL: ResourceLimit(concurrency=2)})
+    rules = _rules()
+    orchestrator = InProcessOrchestrator(
+        rules, {"EMPLOYMENT_STATUS": employment_status}, admission=admission, agent_limits={"VALIDATOR": 6}
+    )
+    scheduler = BatchScheduler(orchestrator, rules, admission, clock=FakeClock())
+    results = await scheduler.run([BatchRequest(f"b{i}", "MATRIX", "W", "") for i in range(6)])
+
+    assert all(r["status"] == "COMPLETED" for r in results)
+    assert peak == 2
+    sql = scheduler.metrics()["resources"][SQL]
+    assert sql["admitted"] == 6 and sql["in_use"] == 0 and sql["waiting"] == 0
+    assert sql["wait_ms_max"] > 0
+
+
+async def test_agent_limit_is_shared_across_batches():
+    active, peak = 0, 0
+
+    async def employment_status(ctx):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return {}
+
+    admission = ResourceAdmission({})
+    rules = _rules()
+    orchestrator = InProcessOrchestrator(
+        rules, {"EMPLOYMENT_STATUS": employment_status}, admission=admission, default_limit=1
+    )
+    scheduler = BatchScheduler(orchestrator, rules, admission, clock=FakeClock())
+    results = await scheduler.run([BatchRequest(f"b{i}", "MATRIX", "W", "") for i in range(4)])
+
+    assert all(r["status"] == "COMPLETED" for r in results)
+    assert peak == 1
+    assert scheduler.metrics()["resources"]["agent:VALIDATOR"]["admitted"] == 4
+
+
+async def test_gate_admits_waiters_by_priority():
+    gate = ResourceGate("sql", ResourceLimit(concurrency=1))
+    await gate.acquire()
+    order: list[str] = []
+
+    async def waiter(name, priority):
+        await gate.acquire(priority)
+        order.append(name)
+        gate.release()
+
+    tasks = [asyncio.create_task(waiter("late", 200.0)), asyncio.create_task(waiter("urgent", 100.0))]
+    await asyncio.sleep(0)
+    assert gate.waiting == 2
+    gate.release()
+    await asyncio.gather(*tasks)
+    assert order == ["urgent", "late"]
+
+
+async def test_token_bucket_paces_admissions():
+    gate = ResourceGate("bedrock", ResourceLimit(rate=50.0, burst=1))
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for _ in range(4):
+        await gate.acquire()
+        gate.release()
+    assert loop.time() - started >= 0.05  # three refills at 20 ms each
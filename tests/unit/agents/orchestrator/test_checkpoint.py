@@ -0,0 +1,167 @@
+"""Unit tests for batch checkpoints and resume-from-failure."""
+
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from bluestar.agents.orchestrator.checkpoint import CheckpointStore, decode_batch, encode_batch
+from bluestar.core.exceptions import PipelineError
+from bluestar.models.payroll_batch import PayrollBatch
+from bluestar.orchestration.inprocess_orchestrator import InProcessOrchestrator
+from tests.fakes import MemoryFileStore, MemoryRulesStore
+
+
+def _batch():
+    return PayrollBatch({
+        "ssn": ["111223333", "444556666", "777889999"],
+        "deferral": [10000, 2550, None],
+        "dob": [date(1980, 1, 2), None, date(2000, 5, 6)],
+        "rate": [Decimal("0.03"), Decimal("0.04"), Decimal("0.05")],
+        "active": [True, False, True],
+    })
+
+
+def test_encoding_round_trips_live_rows():
+    batch = _batch()
+    batch.select([True, False, True])
+    restored = decode_batch(encode_batch(batch))
+    assert len(restored) == 2
+    assert restored.column("deferral") == [10000, None]
+    assert restored.column("dob") == [date(1980, 1, 2), date(2000, 5, 6)]
+    assert restored.column("rate") == [Decimal("0.03"), Decimal("0.05")]
+    assert restored.column("active") == [True, True]
+    assert batch.selection == [0, 2]  # encoding does not compact the live batch
+
+
+def test_float_and_mixed_numeric_columns_are_promoted():
+    batch = PayrollBatch({
+        "hours": [40.5, 0.1, None],
+        "units": [8, 7.5, 3],
+        "amount": [100, Decimal("12.34"), 0.1],
+        "mixed": ["a", "b", None],
+    })
+    restored = decode_batch(encode_batch(batch))
+    assert restored.column("hours") == [40.5, 0.1, None]
+    assert restored.column("units") == [8.0, 7.5, 3.0]
+    assert restored.column("amount") == [Decimal("100"), Decimal("12.34"), Decimal("0.1")]
+
+    batch.raw_column("mixed")[1] = date(2026, 1, 1)
+    with pytest.raises(PipelineError, match=r"\['date', 'str'\]"):
+        encode_batch(batch)
+
+
+def test_identical_record_sets_share_one_object():
+    files = MemoryFileStore()
+    store = CheckpointStore(files)
+    first = store.save("b1", 100, _batch(), {100})
+    second = store.save("b1", 200, _batch(), {100, 200})
+    assert first.path == second.path
+    assert sorted(files.list_files("checkpoints/b1/")) == [first.path, "checkpoints/b1/manifest.json"]
+    assert [c.step_order for c in CheckpointStore(files).manifest("b1")] == [100, 200]
+
+
+def test_latest_skips_a_damaged_checkpoint():
+    files = MemoryFileStore()
+    store = CheckpointStore(files)
+    good = store.save("b1", 100, _batch(), {100})
+    changed = _batch()
+    changed.add_column("extra", [1, 2, 3])
+    bad = store.save("b1", 200, changed, {100, 200})
+    files.write(bad.path, files.read(bad.path)[:-4])
+
+    checkpoint, records = CheckpointStore(files).latest("b1")
+    assert checkpoint == good
+    assert not records.has_column("extra")
+
+
+def _rules():
+    rules = MemoryRulesStore()
+    rules._pipeline_steps["DEFAULT:BiWeeklyFri"] = [
+        {"stepOrder": 100, "subroutineName": "INGEST", "agent": "IDP"},
+        {"stepOrder": 200, "subroutineName": "ENRICH", "agent": "VALIDATOR", "parameters": {"checkpoint": True}},
+        {"stepOrder": 300, "subroutineName": "EXPORT", "agent": "TRANSFORMATION"},
+    ]
+    return rules
+
+
+async def test_restarted_batch_resumes_from_checkpoint_and_cleans_up():
+    calls: list[str] = []
+    fail = {"EXPORT": True}
+
+    def ingest(ctx):
+        calls.append("INGEST")
+        return {}
+
+    def enrich(ctx):
+        calls.append("ENRICH")
+        ctx.batch.add_column("enriched", ["Y"] * len(ctx.batch))
+        return {}
+
+    def export(ctx):
+        calls.append("EXPORT")
+        if fail.pop("EXPORT", False):
+            raise RuntimeError("SQL timeout")
+        assert ctx.batch.column("enriched") == ["Y", "Y", "Y"]
+        return {}
+
+    handlers = {"INGEST": ingest, "ENRICH": enrich, "EXPORT": export}
+    files = MemoryFileStore()
+
+    first = InProcessOrchestrator(_rules(), handlers, checkpoints=CheckpointStore(files), max_attempts=1)
+    first.attach("b1", _batch())
+    result = await first.run_pipeline("b1", "DEFAULT", "BiWeeklyFri", "")
+    assert result["status"] == "FAILED"
+    assert calls == ["INGEST", "ENRICH", "EXPORT"]
+
+    calls.clear()
+    second = InProcessOrchestrator(_rules(), handlers, checkpoints=CheckpointStore(files), max_attempts=1)
+    result = await second.run_pipeline("b1", "DEFAULT", "BiWeeklyFri", "")
+    assert result["status"] == "COMPLETED"
+    assert calls == ["EXPORT"]
+    assert [s["status"] for s in result["steps"]] == ["COMPLETED"] * 3
+    assert result["record_count"] == 3
+    assert files.list_files("checkpoints/") == []
+
+
+async def test_failed_checkpoint_is_logged_and_the_step_succeeds(caplog):
+    class BrokenStore(CheckpointStore):
+        def save(self, batch_id, step_order, batch, completed):
+            raise PipelineError("cannot encode")
+
+    calls: list[str] = []
+
+    def step(ctx):
+        calls.append(ctx.subroutine_name)
+        return {}
+
+    handlers = {"INGEST": step, "ENRICH": step, "EXPORT": step}
+    orchestrator = InProcessOrchestrator(_rules(), handlers, checkpoints=BrokenStore(MemoryFileStore()))
+    orchestrator.attach("b1", _batch())
+    result = await orchestrator.run_pipeline("b1", "DEFAULT", "BiWeeklyFri", "")
+    assert result["status"] == "COMPLETED"
+    assert calls == ["INGEST", "ENRICH", "EXPORT"]
+    assert "Checkpoint after step 200 of b1 failed" in caplog.text
+
+
+async def test_remote_steps_are_not_checkpointed():
+    class Remote:
+        async def dispatch_step(self, batch_id, step_order, agent, parameters):
+            return {}
+
+        async def run_pipeline(self, batch_id, plan_id, pay_freq, s3_path):
+            raise NotImplementedError
+
+    def step(ctx):
+        return {}
+
+    files = MemoryFileStore()
+    checkpoints = CheckpointStore(files)
+    handlers = {"INGEST": step, "EXPORT": step}  # ENRICH, the checkpoint step, is forwarded
+    orchestrator = InProcessOrchestrator(_rules(), handlers, remote=Remote(), checkpoints=checkpoints)
+    orchestrator.attach("b1", _batch())
+    await orchestrator.dispatch_step("b1", 200, "VALIDATOR", {"subroutine_name": "ENRICH", "checkpoint": True})
+    assert checkpoints.manifest("b1") == []
+    assert orchestrator._done.get("b1", set()) == set()
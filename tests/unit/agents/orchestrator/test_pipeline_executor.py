@@ -0,0 +1,314 @@
+"""Unit tests for the DAG PipelineExecutor."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+
+from bluestar.agents.orchestrator.pipeline_executor import PipelineExecutor, PipelineGraph, pipeline_step
+from bluestar.core.exceptions import PipelineError, RetryableStepError, StateTransitionError
+from bluestar.models.pipeline import BatchState, BatchStatus, StepStatus
+from tests.fakes import FakeClock, MemoryCacheBackend, MemoryRulesStore
+
+SEED = Path(__file__).resolve().parents[4] / "config" / "pipeline_seed.json"
+
+
+class FakeOrchestrator:
+    """Records dispatch intervals; fails the configured step orders (retryably unless ``fatal``)."""
+
+    def __init__(
+        self,
+        fail: dict[int, int] | None = None,
+        delay: float = 0.01,
+        delays: dict[int, float] | None = None,
+        fatal: bool = False,
+    ) -> None:
+        self.fail = dict(fail or {})
+        self.fatal = fatal
+        self.delay = delay
+        self.delays = dict(delays or {})
+        self.events: list[tuple[str, int]] = []
+        self.active = 0
+        self.peak = 0
+
+    async def dispatch_step(self, batch_id, step_order, agent, parameters):
+        self.events.append(("start", step_order))
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delays.get(step_order, self.delay))
+        self.active -= 1
+        self.events.append(("end", step_order))
+        if self.fail.get(step_order, 0) > 0:
+            self.fail[step_order] -= 1
+            error = RuntimeError if self.fatal else RetryableStepError
+            raise error(f"{parameters['subroutine_name']} failed")
+        return {"record_count": 10, "warning_count": 1}
+
+    async def run_pipeline(self, batch_id, plan_id, pay_freq, s3_path):
+        raise NotImplementedError
+
+    def overlapped(self, a: int, b: int) -> bool:
+        pos = {event: i for i, event in enumerate(self.events)}
+        return pos[("start", a)] < pos[("end", b)] and pos[("start", b)] < pos[("end", a)]
+
+
+class RecordingState:
+    def __init__(self) -> None:
+        self.steps: list[tuple[int, str]] = []
+        self.batches: list[str] = []
+        self.metadata: dict[str, object] = {}
+
+    async def get_batch_state(self, batch_id):
+        return {}
+
+    async def update_step_state(self, batch_id, step_order, status, **metadata):
+        self.steps.append((step_order, status))
+
+    async def update_batch_state(self, batch_id, status, **metadata):
+        self.batches.append(status)
+        self.metadata.update(metadata)
+
+
+def _batch():
+    return BatchState(batch_id="b1", plan_id="DEFAULT", pay_freq="BiWeeklyFri", s3_path="s3://in/b1.csv")
+
+
+def _steps(*specs):
+    return [
+        {"stepOrder": order, "subroutineName": name, "agent": agent, "dependsOn": deps, **extra}
+        for order, name, agent, deps, extra in specs
+    ]
+
+
+def _rules(items):
+    rules = MemoryRulesStore()
+    rules._pipeline_steps["DEFAULT:BiWeeklyFri"] = items
+    return rules
+
+
+async def test_seed_pipeline_overlaps_independent_steps():
+    items = json.loads(SEED.read_text())["steps"]
+    orchestrator, state = FakeOrchestrator(), RecordingState()
+    batch = await PipelineExecutor(_rules(items), orchestrator, state).execute(_batch())
+
+    assert batch.status == BatchStatus.COMPLETED
+    by_order = {s.step_order: s for s in batch.steps}
+    assert {o for o, s in by_order.items() if s.status == StepStatus.SKIPPED} == {700, 800, 1100}
+    assert by_order[2600].record_count == 10 and by_order[2600].warning_count == 1
+    assert orchestrator.overlapped(900, 1000)  # BAD_SSN / FORMAT_DATES_STRINGS
+    assert orchestrator.overlapped(2100, 2200)  # EXPORT_FILES / FORFEITURES
+    assert batch.critical_path[0] == 100 and batch.critical_path[-1] in (2300, 2400, 2600)
+    assert batch.critical_path_ms > 0
+    assert state.batches == [BatchStatus.PROCESSING, BatchStatus.COMPLETED]
+    assert state.metadata == {"critical_path": batch.critical_path, "critical_path_ms": batch.critical_path_ms}
+    assert (2600, StepStatus.COMPLETED) in state.steps
+
+
+async def test_seed_contribution_steps_finish_before_duplicate_merge():
+    items = [dict(s, enabled=True) for s in json.loads(SEED.read_text())["steps"]]
+    orchestrator = FakeOrchestrator(delay=0)
+    batch = await PipelineExecutor(_rules(items), orchestrator).execute(_batch())
+    assert batch.status == BatchStatus.COMPLETED
+    pos = {event: i for i, event in enumerate(orchestrator.events)}
+    assert pos[("end", 700)] < pos[("start", 1300)] and pos[("end", 800)] < pos[("start", 1300)]
+    assert pos[("end", 1100)] < pos[("start", 1200)]  # EETYPE_CODING before EMPLOYMENT_STATUS
+
+
+async def test_without_dependencies_steps_run_in_order():
+    items = [{k: v for k, v in s.items() if k != "dependsOn"} for s in _steps(
+        (100, "A", "IDP", [], {}), (200, "B", "VALIDATOR", [], {}), (300, "C", "TRANSFORMATION", [], {}),
+    )]
+    orchestrator = FakeOrchestrator()
+    batch = await PipelineExecutor(_rules(items), orchestrator).execute(_batch())
+    assert orchestrator.peak == 1
+    assert [o for kind, o in orchestrator.events if kind == "start"] == [100, 200, 300]
+    assert batch.critical_path == [100, 200, 300]
+
+
+async def test_per_agent_concurrency_limit():
+    items = _steps(
+        (100, "ROOT", "IDP", [], {}),
+        *((order, f"V{order}", "VALIDATOR", ["ROOT"], {}) for order in (200, 300, 400, 500)),
+    )
+    orchestrator = FakeOrchestrator()
+    await PipelineExecutor(_rules(items), orchestrator, agent_limits={"VALIDATOR": 2}).execute(_batch())
+    assert orchestrator.peak == 2
+
+
+async def test_required_steps_take_agent_slots_before_optional_ones():
+    items = _steps(
+        (100, "ROOT", "IDP", [], {}),
+        (200, "OPT", "VALIDATOR", ["ROOT"], {"required": False}),
+        (300, "R1", "VALIDATOR", ["ROOT"], {}),
+        (400, "R2", "VALIDATOR", ["ROOT"], {}),
+    )
+    orchestrator = FakeOrchestrator()
+    await PipelineExecutor(_rules(items), orchestrator, agent_limits={"VALIDATOR": 1}).execute(_batch())
+    assert [o for kind, o in orchestrator.events if kind == "start"] == [100, 300, 400, 200]
+
+
+def _speculation_items():
+    return _steps(
+        (100, "A", "IDP", [], {}),
+        (200, "OPT", "TRANSFORMATION", ["A"], {"required": False, "parameters": {"outputs": ["match"]}}),
+        (300, "B", "VALIDATOR", ["A", "OPT"], {"parameters": {"inputs": ["ssn"]}}),
+        (400, "C", "COMPLIANCE", ["B"], {}),
+    )
+
+
+def _speculation_rules():
+    rules = _rules(_speculation_items())
+    rules._configs["DEFAULT:BiWeeklyFri"] = {"custodian": "Schwab"}  # cutoff 17:00 UTC, clock at 12:00 UTC
+    return rules
+
+
+async def test_near_deadline_required_steps_run_ahead_of_optional_ones():
+    orchestrator = FakeOrchestrator()
+    executor = PipelineExecutor(
+        _speculation_rules(), orchestrator, clock=FakeClock(), speculate_within=timedelta(hours=6)
+    )
+    batch = await executor.execute(_batch())
+    assert batch.status == BatchStatus.COMPLETED
+    assert batch.speculated == [300]
+    pos = {event: i for i, event in enumerate(orchestrator.events)}
+    assert pos[("end", 400)] < pos[("start", 200)]
+
+
+class LoopClock(FakeClock):
+    """FakeClock that moves forward with the event loop's time."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._started = asyncio.get_running_loop().time()
+
+    def now(self):
+        return super().now() + timedelta(seconds=asyncio.get_running_loop().time() - self._started)
+
+
+async def test_speculation_starts_when_the_window_opens_mid_step():
+    orchestrator = FakeOrchestrator(delays={200: 0.5})
+    # cutoff 17:00 UTC; the window opens 0.1 s into the run, while OPT (200) is running
+    executor = PipelineExecutor(
+        _speculation_rules(), orchestrator, clock=LoopClock(),
+        speculate_within=timedelta(hours=5) - timedelta(seconds=0.1),
+    )
+    batch = await executor.execute(_batch())
+    assert batch.status == BatchStatus.COMPLETED
+    assert batch.speculated == [300]
+    pos = {event: i for i, event in enumerate(orchestrator.events)}
+    assert pos[("start", 200)] < pos[("start", 300)] < pos[("end", 200)]
+
+
+async def test_far_from_deadline_dependencies_are_respected():
+    orchestrator = FakeOrchestrator()
+    executor = PipelineExecutor(
+        _speculation_rules(), orchestrator, clock=FakeClock(), speculate_within=timedelta(minutes=30)
+    )
+    batch = await executor.execute(_batch())
+    assert batch.speculated == []
+    pos = {event: i for i, event in enumerate(orchestrator.events)}
+    assert pos[("end", 200)] < pos[("start", 300)]
+
+
+def test_soft_edges_follow_declared_outputs_and_report_only():
+    graph = PipelineGraph.build([pipeline_step(s) for s in _speculation_items() + _steps(
+        (500, "REPORT", "TRANSFORMATION", ["A"], {"required": False, "parameters": {"reportOnly": True}}),
+        (600, "D", "COMPLIANCE", ["REPORT", "OPT"], {"parameters": {"inputs": ["match"]}}),
+    )])
+    assert graph.soft_edges() == {(200, 300), (500, 600)}
+
+
+async def test_required_failure_stops_dependents_optional_failure_does_not():
+    items = _steps(
+        (100, "A", "IDP", [], {}),
+        (200, "OPT", "TRANSFORMATION", ["A"], {"required": False}),
+        (300, "B", "VALIDATOR", ["OPT"], {}),
+        (400, "C", "COMPLIANCE", ["B"], {}),
+    )
+    orchestrator = FakeOrchestrator(fail={200: 9, 300: 9})
+    batch = await PipelineExecutor(_rules(items), orchestrator, max_attempts=3, retry_backoff=0).execute(_batch())
+    by_order = {s.step_order: s for s in batch.steps}
+    assert batch.status == BatchStatus.FAILED
+    assert by_order[200].status == StepStatus.FAILED
+    assert by_order[300].status == StepStatus.FAILED
+    assert by_order[300].retry_count == 3 and by_order[300].error_details == "B failed"
+    assert by_order[400].status == StepStatus.PENDING
+
+
+async def test_retry_then_success_with_backoff():
+    orchestrator = FakeOrchestrator(fail={100: 2}, delay=0)
+    executor = PipelineExecutor(_rules(_steps((100, "A", "IDP", [], {}))), orchestrator, retry_backoff=0.05)
+    started = asyncio.get_running_loop().time()
+    batch = await executor.execute(_batch())
+    assert asyncio.get_running_loop().time() - started >= 0.15  # 0.05 + 0.10
+    assert batch.status == BatchStatus.COMPLETED
+    assert batch.steps[0].retry_count == 2
+
+
+async def test_non_retryable_error_is_not_retried():
+    orchestrator = FakeOrchestrator(fail={100: 1}, fatal=True)
+    batch = await PipelineExecutor(_rules(_steps((100, "A", "IDP", [], {}))), orchestrator).execute(_batch())
+    assert batch.status == BatchStatus.FAILED
+    assert batch.steps[0].retry_count == 0 and batch.steps[0].error_details == "A failed"
+    assert orchestrator.events == [("start", 100), ("end", 100)]
+
+
+async def test_step_bookkeeping_error_fails_the_batch_and_cancels_running_steps():
+    class BrokenState(RecordingState):
+        async def update_step_state(self, batch_id, step_order, status, **metadata):
+            if step_order == 200 and status == StepStatus.COMPLETED:
+                raise StateTransitionError("conditional write rejected")
+            await super().update_step_state(batch_id, step_order, status, **metadata)
+
+    items = _steps(
+        (100, "A", "IDP", [], {}),
+        (200, "B", "VALIDATOR", ["A"], {}),
+        (300, "C", "COMPLIANCE", ["A"], {}),
+        (400, "D", "COMPLIANCE", ["B", "C"], {}),
+    )
+    orchestrator, state = FakeOrchestrator(delays={300: 5.0}), BrokenState()
+    batch = await PipelineExecutor(_rules(items), orchestrator, state).execute(_batch())
+
+    by_order = {s.step_order: s for s in batch.steps}
+    assert batch.status == BatchStatus.FAILED
+    assert state.batches[-1] == BatchStatus.FAILED
+    assert by_order[200].status == StepStatus.FAILED and "rejected" in by_order[200].error_details
+    assert by_order[300].status == StepStatus.FAILED and "Cancelled" in by_order[300].error_details
+    assert by_order[400].status == StepStatus.PENDING
+    assert ("end", 300) not in orchestrator.events
+
+
+def test_graph_rejects_cycles_and_unknown_dependencies():
+    with pytest.raises(PipelineError, match="cycle"):
+        PipelineGraph.build([pipeline_step(s) for s in _steps(
+            (100, "A", "IDP", ["B"], {}), (200, "B", "IDP", ["A"], {}),
+        )])
+    with pytest.raises(PipelineError, match="unknown"):
+        PipelineGraph.build([pipeline_step(s) for s in _steps((100, "A", "IDP", ["Z"], {}))])
+
+
+def test_critical_path_is_longest_weighted_chain():
+    graph = PipelineGraph.build([pipeline_step(s) for s in _steps(
+        (100, "A", "IDP", [], {}),
+        (200, "B", "IDP", ["A"], {}),
+        (300, "C", "IDP", ["A"], {}),
+        (400, "D", "IDP", ["B", "C"], {}),
+    )])
+    assert graph.critical_path({100: 5, 200: 10, 300: 30, 400: 5}) == ([100, 300, 400], 40)
+
+
+def test_pipeline_steps_cached():
+    class CountingRules(MemoryRulesStore):
+        loads = 0
+
+        def get_pipeline_steps(self, plan_id, pay_freq):
+            CountingRules.loads += 1
+            return _steps((100, "A", "IDP", [], {}))
+
+    executor = PipelineExecutor(CountingRules(), FakeOrchestrator(), cache=MemoryCacheBackend())
+    assert executor.load_steps("P1", "W") == executor.load_steps("P1", "W")
+    assert CountingRules.loads == 1
@@ -0,0 +1,125 @@
+"""Unit tests for the built-in row kernels, fused over the seed pipeline."""
+
+from __future__ import annotations
+
+import json
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from bluestar.agents.orchestrator.pipeline_executor import PipelineExecutor
+from bluestar.agents.orchestrator.row_kernels import (
+    DEFAULT_KERNELS,
+    bad_ssn,
+    destring_amount,
+    format_dates_strings,
+)
+from bluestar.agents.orchestrator.step_fusion import ROW_ERROR, ROW_WARNING, StepFusionPlanner
+from bluestar.models.payroll_batch import RECORD_FIELDS, PayrollBatch
+from bluestar.orchestration.inprocess_orchestrator import InProcessOrchestrator
+from tests.fakes import MemoryRulesStore
+
+SEED = Path(__file__).resolve().parents[4] / "config" / "pipeline_seed.json"
+
+
+def _rules():
+    rules = MemoryRulesStore()
+    rules._pipeline_steps["DEFAULT:BiWeeklyFri"] = json.loads(SEED.read_text())["steps"]
+    return rules
+
+
+@pytest.mark.parametrize(("raw", "cents"), [
+    ("$1,234.50", 123450),
+    ("123.45-", -12345),
+    ("(10.00)", -1000),
+    ("", 0),
+    (None, 0),
+    (250, 250),
+    ("12a", None),
+])
+def test_destring_amount(raw, cents):
+    assert destring_amount(raw) == cents
+
+
+@pytest.mark.parametrize(("ssn", "bad"), [
+    ("123-45-6789", True),  # known invalid pattern
+    ("234-56-7890", False),
+    ("12345678", True),  # 012345678 is a known invalid pattern
+    ("2345678", False),  # seven digits, stored as 002345678
+    ("", True),
+    ("123456", True),  # too short
+    ("1234567890", True),  # too long
+    ("234-00-7890", True),  # zero group
+    ("234-56-0000", True),  # zero serial
+])
+def test_bad_ssn_checks(ssn, bad):
+    row = {"ssn": ssn, "badssn": ""}
+    assert (bad_ssn(row) == ROW_ERROR) is bad
+    assert row["badssn"] == ("Y" if bad else "")
+
+
+def test_format_dates_strings():
+    row = {
+        "ssn": "23-456 7890",
+        "dob": "01/15/1980 12:00:00 AM",
+        "doh": "20200301",
+        "dot": "01/01/1900",
+        "dor": "2020-03-01",
+    }
+    assert format_dates_strings(row) is None
+    assert row == {"ssn": "234567890", "dob": date(1980, 1, 15), "doh": date(2020, 3, 1), "dot": None, "dor": None}
+
+    row = {"ssn": "", "dob": "15/01/1980", "doh": None, "dot": None, "dor": None}
+    assert format_dates_strings(row) == ROW_WARNING
+    assert row["dob"] is None
+
+
+def test_seed_pipeline_fuses_with_default_kernels():
+    graph = PipelineExecutor(_rules(), orchestrator=None).load_graph("DEFAULT", "BiWeeklyFri")
+    planner = StepFusionPlanner(DEFAULT_KERNELS)
+    assert planner.groups(graph) == [(300, 400, 500), (900, 1000)]
+    fused = planner.fuse(graph)
+    assert fused.steps[300].subroutine_name == "FUSED:MERGE_PAYROLL_FIELDS+DROP_V_VARIABLES+DESTRING_NUMBERS"
+    assert fused.steps[900].subroutine_name == "FUSED:BAD_SSN+FORMAT_DATES_STRINGS"
+
+
+async def test_seed_pipeline_runs_fused_steps_in_process():
+    class Remote:
+        def __init__(self) -> None:
+            self.dispatched: list[str] = []
+
+        async def dispatch_step(self, batch_id, step_order, agent, parameters):
+            self.dispatched.append(parameters["subroutine_name"])
+            return {}
+
+        async def run_pipeline(self, batch_id, plan_id, pay_freq, s3_path):
+            raise NotImplementedError
+
+    batch = PayrollBatch({
+        "ssn": ["234-56-7890", "12345"],
+        "salary": ["1,000.00", "oops"],
+        "loan": ["25.00-", None],
+        "dob": ["01/15/1980", "1980-02-30"],
+        "v1": ["shifted", "shifted"],
+    })
+    remote = Remote()
+    orchestrator = InProcessOrchestrator(_rules(), {}, remote=remote, fusion=StepFusionPlanner(DEFAULT_KERNELS))
+    orchestrator.attach("b1", batch)
+    result = await orchestrator.run_pipeline("b1", "DEFAULT", "BiWeeklyFri", "")
+
+    steps = {s["step_order"]: s for s in result["steps"]}
+    assert result["status"] == "COMPLETED"
+    assert orchestrator.local_steps == 5
+    assert not set(DEFAULT_KERNELS) & set(remote.dispatched)
+    assert steps[500]["warning_count"] == 1 and steps[900]["error_count"] == 1
+    assert steps[1000]["warning_count"] == 1
+
+    assert not batch.has_column("v1")
+    assert all(batch.has_column(f) for f in RECORD_FIELDS)
+    assert batch.column("salary") == [100000, 0]
+    assert batch.column("loan") == [-2500, 0]
+    assert batch.column("ssn") == ["234567890", "000012345"]
+    assert batch.column("badssn") == ["", "Y"]
+    assert batch.column("dob") == [date(1980, 1, 15), None]
+    assert batch.column("fname") == ["", ""]
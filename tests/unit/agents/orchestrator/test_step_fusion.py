@@ -0,0 +1,138 @@
+"""Unit tests for the step fusion planner."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from bluestar.agents.orchestrator.pipeline_executor import PipelineExecutor
+from bluestar.agents.orchestrator.step_fusion import ROW_ERROR, ROW_WARNING, RowKernel, StepFusionPlanner
+from bluestar.models.payroll_batch import PayrollBatch
+from bluestar.orchestration.inprocess_orchestrator import InProcessOrchestrator
+from tests.fakes import MemoryRulesStore
+
+SEED = Path(__file__).resolve().parents[4] / "config" / "pipeline_seed.json"
+
+
+def _rules(items=None):
+    rules = MemoryRulesStore()
+    rules._pipeline_steps["DEFAULT:BiWeeklyFri"] = items or json.loads(SEED.read_text())["steps"]
+    return rules
+
+
+def _merge(row):
+    row["ssn"] = row["ssn"].strip()
+
+
+def _drop_v(row):
+    row["vfield"] = None
+
+
+def _destring(row):
+    try:
+        row["amount"] = int(row["amount"])
+    except ValueError:
+        row["amount"] = 0
+        return ROW_WARNING
+    return None
+
+
+def _comp(row):
+    row["plancomp"] = row["amount"] * 2
+
+
+def _bad_ssn(row):
+    bad = len(row["ssn"]) != 9 or not row["ssn"].isdigit()
+    row["badssn"] = "Y" if bad else ""
+    return ROW_ERROR if bad else None
+
+
+def _dates(row):
+    row["dob"] = row["dob"].replace("/", "-")
+
+
+KERNELS = {
+    "MERGE_PAYROLL_FIELDS": RowKernel(_merge, reads=("ssn",), writes=("ssn",)),
+    "DROP_V_VARIABLES": RowKernel(_drop_v, reads=(), writes=("vfield",)),
+    "DESTRING_NUMBERS": RowKernel(_destring, reads=("amount",), writes=("amount",), cost=2),
+    "CALC_COMPENSATION": RowKernel(_comp, reads=("amount",), writes=("plancomp",)),
+    "BAD_SSN": RowKernel(_bad_ssn, reads=("ssn",), writes=("badssn",)),
+    "FORMAT_DATES_STRINGS": RowKernel(_dates, reads=("dob",), writes=("dob",)),
+}
+
+
+def _batch():
+    return PayrollBatch({
+        "ssn": [" 123456789", "12345", "987654321 "],
+        "amount": ["100", "x", "7"],
+        "dob": ["1980/01/02", "1990/03/04", "2000/05/06"],
+    })
+
+
+def test_planner_fuses_runs_without_crossing_dependencies():
+    graph = PipelineExecutor(_rules(), orchestrator=None).load_graph("DEFAULT", "BiWeeklyFri")
+    planner = StepFusionPlanner(KERNELS)
+    # SPLIT_MONTH_PEO (550) is not row-local, so it breaks the first run;
+    # CALC_COMPENSATION (TRANSFORMATION) is not fused with the VALIDATOR steps.
+    assert planner.groups(graph) == [(300, 400, 500), (900, 1000)]
+
+    fused = planner.fuse(graph)
+    assert [m.step_order for m in fused.members[900]] == [900, 1000]
+    assert fused.deps[300] == (200,)
+    assert fused.deps[600] == (550,)
+    assert fused.deps[900] == (300,)
+    assert fused.deps[1200] == (900, 1100)  # EMPLOYMENT_STATUS waited on BAD_SSN and FORMAT_DATES_STRINGS
+    assert fused.steps[900].subroutine_name == "FUSED:BAD_SSN+FORMAT_DATES_STRINGS"
+    assert fused.steps[900].agent == "VALIDATOR"
+    assert len(fused.steps) == len(graph.steps) - 3
+
+
+def test_disabled_steps_do_not_break_a_run():
+    seed = json.loads(SEED.read_text())["steps"]
+    items = [dict(s, agent="TRANSFORMATION") if s["stepOrder"] in (900, 1000) else s for s in seed]
+    graph = PipelineExecutor(_rules(items), orchestrator=None).load_graph("DEFAULT", "BiWeeklyFri")
+    # disabled CALC_MATCH/CALC_ER_CONTRIB (700/800) sit between CALC_COMPENSATION and BAD_SSN
+    assert StepFusionPlanner(KERNELS).groups(graph) == [(300, 400, 500), (600, 900, 1000)]
+
+
+def test_fused_pass_reports_per_step_results():
+    ticks = iter([0.0, 0.004])
+    batch = _batch()
+    results = StepFusionPlanner(KERNELS, timer=lambda: next(ticks)).run(
+        batch, ["MERGE_PAYROLL_FIELDS", "DESTRING_NUMBERS", "CALC_COMPENSATION", "BAD_SSN"]
+    )
+    assert batch.column("ssn") == ["123456789", "12345", "987654321"]
+    assert batch.column("plancomp") == [200, 0, 14]
+    assert batch.column("badssn") == ["", "Y", ""]
+    assert [(r["error_count"], r["warning_count"]) for r in results] == [(0, 0), (0, 1), (0, 0), (1, 0)]
+    assert [r["duration_ms"] for r in results] == [0, 1, 0, 0]  # 4 ms apportioned by cost 1:2:1:1
+    assert all(r["record_count"] == 3 for r in results)
+
+
+async def test_in_process_run_keeps_a_step_state_per_logical_step():
+    class Remote:
+        def __init__(self) -> None:
+            self.dispatched: list[str] = []
+
+        async def dispatch_step(self, batch_id, step_order, agent, parameters):
+            self.dispatched.append(parameters["subroutine_name"])
+            return {}
+
+        async def run_pipeline(self, batch_id, plan_id, pay_freq, s3_path):
+            raise NotImplementedError
+
+    remote = Remote()
+    orchestrator = InProcessOrchestrator(_rules(), {}, remote=remote, fusion=StepFusionPlanner(KERNELS))
+    orchestrator.attach("b1", _batch())
+    result = await orchestrator.run_pipeline("b1", "DEFAULT", "BiWeeklyFri", "")
+
+    steps = {s["step_order"]: s for s in result["steps"]}
+    assert result["status"] == "COMPLETED"
+    assert len(steps) == 27
+    for order in (300, 400, 500, 900, 1000):
+        assert steps[order]["status"] == "COMPLETED" and steps[order]["record_count"] == 3
+    assert steps[500]["warning_count"] == 1 and steps[900]["error_count"] == 1
+    assert orchestrator.local_steps == 5
+    assert not any(name.startswith("FUSED:") for name in remote.dispatched)
+    # CALC_COMPENSATION is a run of one on its agent: it is dispatched as a normal step.
+    assert [name for name in remote.dispatched if name in KERNELS] == ["CALC_COMPENSATION"]
@@ -0,0 +1,147 @@
+"""Unit tests for WorkflowStateManager using moto."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from bluestar.agents.orchestrator.pipeline_executor import PipelineExecutor
+from bluestar.agents.orchestrator.workflow_state import WorkflowStateManager
+from bluestar.core.exceptions import StateTransitionError
+from bluestar.models.pipeline import BatchState, BatchStatus, StepStatus
+from tests.fakes import MemoryCacheBackend, MemoryRulesStore
+from tests.unit.agents.orchestrator.test_pipeline_executor import FakeOrchestrator
+
+TABLE = "bluestar-processing-metadata-test"
+
+
+@pytest.fixture
+def client():
+    with mock_aws():
+        ddb = boto3.client("dynamodb", region_name="us-east-1")
+        ddb.create_table(
+            TableName=TABLE,
+            KeySchema=[{"AttributeName": "PK", "KeyType": "HASH"}, {"AttributeName": "SK", "KeyType": "RANGE"}],
+            AttributeDefinitions=[
+                {"AttributeName": "PK", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield ddb
+
+
+def _manager(client, cache=None, window=60.0):
+    return WorkflowStateManager(client, cache=cache, table_suffix="-test", coalesce_window=window)
+
+
+def _item(client, sk):
+    return client.get_item(TableName=TABLE, Key={"PK": {"S": "BATCH#b1"}, "SK": {"S": sk}}).get("Item")
+
+
+async def test_transitions_coalesce_into_one_transaction(client):
+    cache = MemoryCacheBackend()
+    state = _manager(client, cache)
+    await state.update_batch_state("b1", BatchStatus.PROCESSING, plan_id="P1")
+    await state.update_step_state("b1", 100, StepStatus.DISPATCHED, agent_name="IDP")
+    await state.update_step_state("b1", 100, StepStatus.PROCESSING)
+    await state.update_step_state("b1", 100, StepStatus.COMPLETED, record_count=42, duration_ms=15)
+    await state.update_step_state("b1", 200, StepStatus.SKIPPED)
+    assert _item(client, "STEP#0100") is None  # still buffered
+
+    session = json.loads(cache.get("session:b1:state"))
+    assert session["steps"][0]["status"] == "COMPLETED"  # Redis is written through at once
+
+    await state.update_batch_state("b1", BatchStatus.COMPLETED)
+    assert (state.transitions, state.items_written, state.transactions) == (6, 3, 1)
+    item = _item(client, "STEP#0100")
+    assert item["status"] == {"S": "COMPLETED"}
+    assert item["recordCount"] == {"N": "42"} and item["agentName"] == {"S": "IDP"}
+    assert _item(client, "STATE")["planId"] == {"S": "P1"}
+
+
+async def test_get_batch_state_falls_back_to_dynamodb(client):
+    await _manager(client, window=0).update_step_state("b1", 100, StepStatus.DISPATCHED)
+
+    cache = MemoryCacheBackend()
+    fresh = _manager(client, cache)
+    state = await fresh.get_batch_state("b1")
+    assert state["batchId"] == "b1"
+    assert [(s["stepOrder"], s["status"]) for s in state["steps"]] == [(100, "DISPATCHED")]
+    assert json.loads(cache.get("session:b1:state")) == state
+    assert await fresh.get_batch_state("nope") == {}
+
+
+async def test_conditional_write_rejects_a_concurrent_transition(client):
+    cache = MemoryCacheBackend()
+    first, second = _manager(client), _manager(client, cache)
+    await second.get_batch_state("b1")
+    await second.update_step_state("b1", 100, StepStatus.DISPATCHED)
+    await first.update_step_state("b1", 100, StepStatus.DISPATCHED)
+    await first.flush()
+
+    await second.update_step_state("b1", 100, StepStatus.COMPLETED)
+    with pytest.raises(StateTransitionError, match="rejected"):
+        await second.flush()
+    assert cache.get("session:b1:state") is None
+    assert _item(client, "STEP#0100")["status"] == {"S": "DISPATCHED"}
+
+
+async def test_rejected_batch_does_not_drop_or_fail_other_batches(client):
+    first, second = _manager(client), _manager(client)
+    await second.get_batch_state("b1")
+    await second.update_step_state("b1", 100, StepStatus.DISPATCHED)
+    await first.update_step_state("b1", 100, StepStatus.DISPATCHED)
+    await first.flush()
+
+    await second.update_step_state("b1", 100, StepStatus.COMPLETED)
+    await second.update_step_state("b2", 100, StepStatus.DISPATCHED)
+    await second._write()  # background flush: b1 is rejected, b2 is written
+    b2 = client.get_item(TableName=TABLE, Key={"PK": {"S": "BATCH#b2"}, "SK": {"S": "STEP#0100"}})["Item"]
+    assert b2["status"] == {"S": "DISPATCHED"}
+
+    await second.update_step_state("b2", 100, StepStatus.COMPLETED)  # b1's failure is not b2's
+    await second.flush("b2")
+    with pytest.raises(StateTransitionError, match="rejected"):
+        await second.update_step_state("b1", 200, StepStatus.DISPATCHED)
+
+
+async def test_terminal_batch_status_forgets_the_view(client):
+    state = _manager(client)
+    await state.update_batch_state("b1", BatchStatus.PROCESSING)
+    await state.update_batch_state("b1", BatchStatus.COMPLETED)
+    assert "b1" not in state._views
+    assert (await state.get_batch_state("b1"))["status"] == "COMPLETED"
+
+
+async def test_invalid_transition_raises_before_writing(client):
+    state = _manager(client, window=0)
+    await state.update_step_state("b1", 100, StepStatus.SKIPPED)
+    with pytest.raises(StateTransitionError, match="SKIPPED -> DISPATCHED"):
+        await state.update_step_state("b1", 100, StepStatus.DISPATCHED)
+
+
+async def test_buffer_flushes_after_window(client):
+    state = _manager(client, window=0.01)
+    await state.update_step_state("b1", 100, StepStatus.DISPATCHED)
+    await asyncio.sleep(0.2)
+    assert _item(client, "STEP#0100")["status"] == {"S": "DISPATCHED"}
+
+
+async def test_executor_writes_one_item_per_step(client):
+    rules = MemoryRulesStore()
+    rules._pipeline_steps["DEFAULT:BiWeeklyFri"] = [
+        {"stepOrder": 100, "subroutineName": "A", "agent": "IDP"},
+        {"stepOrder": 200, "subroutineName": "B", "agent": "VALIDATOR"},
+        {"stepOrder": 300, "subroutineName": "C", "agent": "VALIDATOR", "enabled": False},
+    ]
+    state = _manager(client)
+    batch = BatchState(batch_id="b1", plan_id="DEFAULT", pay_freq="BiWeeklyFri", s3_path="")
+    await PipelineExecutor(rules, FakeOrchestrator(delay=0), state).execute(batch)
+
+    assert state.transitions == 7 and state.items_written == 4
+    assert (await state.get_batch_state("b1"))["status"] == "COMPLETED"
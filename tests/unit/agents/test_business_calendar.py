@@ -0,0 +1,73 @@
+"""Unit tests for the shared BusinessCalendar."""
+
+from __future__ import annotations
+
+from datetime import UTC, date, datetime
+
+from bluestar.agents.business_calendar import BusinessCalendar, custodian_deadline, federal_reserve_holidays
+from bluestar.agents.compliance.ach_prep import ACHPrepService
+from bluestar.agents.transform.xml_generator import XMLGeneratorService
+from tests.fakes import FakeClock, MemoryFileStore, MemoryRulesStore, MemorySQLClient
+
+
+def test_federal_reserve_holidays_observed_rules():
+    holidays = federal_reserve_holidays(2026)
+    assert date(2026, 7, 3) not in holidays and date(2026, 7, 4) not in holidays  # Saturday: not observed
+    assert date(2026, 1, 19) in holidays  # MLK
+    assert date(2026, 5, 25) in holidays  # Memorial Day
+    assert date(2026, 11, 26) in holidays  # Thanksgiving
+    assert date(2023, 1, 2) in federal_reserve_holidays(2023)  # Sunday New Year's -> Monday
+
+
+def test_next_and_previous_business_day():
+    cal = BusinessCalendar(FakeClock())
+    assert cal.next_business_day(date(2026, 3, 13)) == date(2026, 3, 16)  # Friday -> Monday
+    assert cal.next_business_day(date(2026, 11, 25)) == date(2026, 11, 27)  # Thanksgiving
+    assert cal.next_business_day(date(2026, 12, 31)) == date(2027, 1, 4)  # New Year's, weekend
+    assert cal.previous_business_day(date(2026, 1, 1)) == date(2025, 12, 31)
+    assert cal.previous_business_day(date(2026, 1, 20)) == date(2026, 1, 16)  # MLK Monday
+    assert not cal.is_business_day(date(2026, 12, 25))
+    assert cal.is_business_day(date(2026, 12, 24))
+
+
+def test_calendar_request_date_rolls_after_custodian_cutoff():
+    rules = MemoryRulesStore()
+    clock = FakeClock(datetime(2026, 3, 16, 17, 30, tzinfo=UTC))  # 12:30 CDT Monday
+    cal = BusinessCalendar(clock)
+    assert cal.request_date(custodian_deadline({"custodian": "Schwab"})) == date(2026, 3, 17)
+    assert cal.request_date(custodian_deadline({"custodian": "Matrix Trust"})) == date(2026, 3, 16)
+    clock.set(datetime(2026, 3, 14, 15, 0, tzinfo=UTC))  # Saturday
+    assert cal.request_date(custodian_deadline({"custodian": "Matrix Trust"})) == date(2026, 3, 16)
+    assert cal.request_date(custodian_deadline(rules.get_client_config("P9", "W"))) == date(2026, 3, 16)
+
+
+def test_ach_request_date_starts_from_payroll_date():
+    clock = FakeClock(datetime(2026, 3, 16, 17, 30, tzinfo=UTC))  # 12:30 CDT Monday
+    prep = ACHPrepService(BusinessCalendar(clock))
+    assert prep.request_date(date(2026, 3, 20)) == date(2026, 3, 20)  # future payroll is not pulled early
+    assert prep.request_date(date(2026, 3, 21)) == date(2026, 3, 23)  # Saturday -> Monday
+    assert prep.request_date(date(2026, 11, 26)) == date(2026, 11, 27)  # Thanksgiving
+    assert prep.request_date(date(2026, 3, 10)) == date(2026, 3, 16)  # floored at today
+
+
+def test_ach_request_date_after_six_pm():
+    clock = FakeClock(datetime(2026, 3, 21, 0, 30, tzinfo=UTC))  # Friday 19:30 CDT
+    prep = ACHPrepService(BusinessCalendar(clock))
+    assert prep.request_date(date(2026, 3, 20)) == date(2026, 3, 23)  # Friday after hours -> Monday
+    assert prep.request_date(date(2026, 3, 18)) == date(2026, 3, 23)  # floored at today, then past the cutoff
+    assert prep.request_date(date(2026, 3, 22)) == date(2026, 3, 23)  # weekend roll is not bumped again
+
+
+def test_ach_request_date_floor_skips_non_business_today():
+    clock = FakeClock(datetime(2026, 3, 21, 15, 0, tzinfo=UTC))  # Saturday 10:00 CDT
+    prep = ACHPrepService(BusinessCalendar(clock))
+    assert prep.request_date(date(2026, 3, 18)) == date(2026, 3, 23)
+    clock.set(datetime(2026, 3, 24, 0, 30, tzinfo=UTC))  # Monday 19:30 CDT
+    assert prep.request_date(date(2026, 3, 18)) == date(2026, 3, 24)
+
+
+def test_xml_allocation_date_skips_bank_holidays():
+    rules = MemoryRulesStore()
+    calendar = BusinessCalendar(FakeClock(datetime(2026, 11, 25, 15, tzinfo=UTC)))
+    service = XMLGeneratorService(rules, MemorySQLClient(), MemoryFileStore(), calendar=calendar)
+    assert service.plan_parameters("P1", "B", date(2026, 11, 20)).allocation_date == "2026-11-27"
@@ -0,0 +1,102 @@
+"""Unit tests for the compiled CompensationCalcService."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+
+from bluestar.agents.transform.compensation_calc import CompensationCalcService, compile_formula
+from bluestar.core.exceptions import PipelineError
+from bluestar.models.payroll_batch import PayrollBatch
+from bluestar.models.payroll_record import CanonicalPayrollRecord as Rec
+from bluestar.models.rules import CompensationFormula
+from bluestar.persistence.memory_backend import MemoryRulesStore
+from tests.fakes import FakeClock
+
+
+def _batch():
+    return PayrollBatch.from_records([
+        Rec(salary=Decimal("1000"), bonus=Decimal("100"), commissions=Decimal("50"), overtime=Decimal("25.25")),
+        Rec(salary=Decimal("500")),
+    ])
+
+
+def test_default_formula_sums_all_components():
+    batch = _batch()
+    assert CompensationCalcService(MemoryRulesStore()).execute(batch, "P1", "B") == 2
+    for name in ("plancomp", "matchcomp", "ercomp"):
+        assert batch.column(name) == [117525, 50000]
+
+
+def test_custom_components_and_ordered_adjustments():
+    formula = CompensationFormula(
+        plancomp_components=["salary", "bonus", "overtime"],
+        matchcomp_components=["salary"],
+        custom_adjustments=[
+            {"target": "salary", "op": "subtract", "source": "exclcomp"},
+            {"target": "bonus", "op": "add", "source": "exclcomp"},
+            {"target": "overtime", "op": "add", "amount": "1.00"},
+        ],
+    )
+    batch = _batch()
+    batch.add_column("exclcomp", [20000, 0])
+    CompensationCalcService(MemoryRulesStore()).execute(batch, "P1", formula=formula)
+    assert batch.column("salary") == [80000, 50000]
+    assert batch.column("bonus") == [30000, 0]
+    assert batch.column("plancomp") == [112625, 50100]
+    assert batch.column("matchcomp") == [80000, 50000]
+    assert batch.column("ercomp") == [117625, 50100]
+
+
+def test_formula_read_from_client_config_and_compiled_once():
+    rules = MemoryRulesStore()
+    rules._configs["P1:B"] = {"compensationFormula": {"ercomp_components": ["salary"], "version": 3}}
+    service = CompensationCalcService(rules)
+    service.execute(_batch(), "P1", "B")
+    [(_, plan)] = service._compiled.values()
+
+    batch = _batch()
+    service.execute(batch, "P1", "B")
+    assert [p for _, p in service._compiled.values()] == [plan]
+    assert batch.column("ercomp") == [100000, 50000]
+
+
+def test_edited_formula_and_other_pay_freq_recompile():
+    rules = MemoryRulesStore()
+    rules._configs["P1:B"] = {"compensationFormula": {"ercomp_components": ["salary"]}}
+    rules._configs["P1:W"] = {"compensationFormula": {"ercomp_components": ["bonus"]}}
+    service = CompensationCalcService(rules)
+    weekly = _batch()
+    service.execute(_batch(), "P1", "B")
+    service.execute(weekly, "P1", "W")
+    assert weekly.column("ercomp") == [10000, 0]
+
+    rules._configs["P1:B"] = {"compensationFormula": {"ercomp_components": ["commissions"]}}
+    batch = _batch()
+    service.execute(batch, "P1", "B")
+    assert batch.column("ercomp") == [5000, 0]
+
+
+def test_compiled_plans_expire_after_ttl():
+    clock = FakeClock()
+    service = CompensationCalcService(MemoryRulesStore(), clock=clock, ttl=timedelta(minutes=5))
+    formula = CompensationFormula()
+    plan = service.compiled("P1", "B", formula)
+    assert service.compiled("P1", "B", formula) is plan
+    clock.advance(timedelta(minutes=6))
+    assert service.compiled("P1", "B", formula) is not plan
+
+
+def test_missing_adjustment_source_is_an_error():
+    formula = CompensationFormula(custom_adjustments=[{"target": "salary", "op": "subtract", "source": "exclcomp"}])
+    with pytest.raises(PipelineError, match="exclcomp"):
+        CompensationCalcService(MemoryRulesStore()).execute(_batch(), "P1", formula=formula)
+
+
+def test_invalid_formula_rejected_at_compile_time():
+    with pytest.raises(ValueError, match="Unsupported"):
+        compile_formula("P1", CompensationFormula(custom_adjustments=[{"target": "salary", "op": "divide"}]))
+    with pytest.raises(ValueError, match="Unknown"):
+        compile_formula("P1", CompensationFormula(plancomp_components=["salry"]))
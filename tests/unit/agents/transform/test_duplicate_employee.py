@@ -0,0 +1,91 @@
+"""Unit tests for DuplicateEmployeeService hash aggregation."""
+
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+from bluestar.agents.transform.duplicate_employee import (
+    DEFAULT_GROUP_KEY,
+    MEP_GROUP_KEY,
+    SUM_FIELDS,
+    DuplicateEmployeeService,
+)
+from bluestar.models.payroll_batch import PayrollBatch
+from bluestar.models.payroll_record import CanonicalPayrollRecord as Rec
+
+
+def test_fast_path_leaves_batch_untouched():
+    batch = PayrollBatch.from_records([Rec(planid="A", ssn="1"), Rec(planid="A", ssn="2"), Rec(planid="B", ssn="1")])
+    before = batch.columns
+    assert DuplicateEmployeeService().execute(batch) == 0
+    assert batch.columns is before
+
+
+def test_aggregates_duplicates_and_keeps_best_row():
+    batch = PayrollBatch.from_records([
+        Rec(planid="A", ssn="1", fname="bonus-row", salary=Decimal("0"), bonus=Decimal("500"),
+            deferral=Decimal("10.10"), dob=date(1980, 1, 2), doh=date(2015, 1, 1), dot=date(2024, 1, 1)),
+        Rec(planid="A", ssn="2", fname="other", salary=Decimal("50")),
+        Rec(planid="A", ssn="1", fname="salary-row", salary=Decimal("200"), deferral=Decimal("0.05"),
+            dob=date(1980, 1, 1), doh=date(2016, 1, 1), dot=date(2023, 1, 1), dor=date(2020, 5, 5)),
+        Rec(planid="A", ssn="1", fname="big-salary", salary=Decimal("300"), hours=Decimal("8.5"),
+            dot=date(2022, 1, 1)),
+    ])
+    removed = DuplicateEmployeeService().execute(batch)
+
+    assert removed == 2
+    records = batch.to_records()
+    assert [r.ssn for r in records] == ["1", "2"]
+    merged = records[0]
+    assert merged.fname == "big-salary"
+    assert merged.salary == Decimal("500.00")
+    assert merged.bonus == Decimal("500.00")
+    assert merged.deferral == Decimal("10.15")
+    assert merged.hours == Decimal("8.50")
+    assert merged.dob == date(1980, 1, 1)
+    assert merged.doh == date(2015, 1, 1)
+    assert merged.dot == date(2024, 1, 1)
+    assert merged.dor == date(2020, 5, 5)
+
+
+def test_null_dot_in_any_row_means_active():
+    batch = PayrollBatch.from_records([
+        Rec(planid="A", ssn="1", dot=date(2024, 1, 1)), Rec(planid="A", ssn="1", dot=None),
+    ])
+    DuplicateEmployeeService().execute(batch)
+    assert batch.column("dot") == [None]
+
+
+def test_mep_groups_by_ssn_across_plans():
+    records = [Rec(planid="A", ssn="1", loan=Decimal("5")), Rec(planid="B", ssn="1", loan=Decimal("7"))]
+    assert DuplicateEmployeeService().group_key == DEFAULT_GROUP_KEY
+
+    by_plan = PayrollBatch.from_records(records)
+    assert DuplicateEmployeeService().execute(by_plan) == 0
+
+    by_ssn = PayrollBatch.from_records(records)
+    assert DuplicateEmployeeService(MEP_GROUP_KEY).execute(by_ssn) == 1
+    assert by_ssn.column("loan") == [1200]
+
+
+def test_sums_all_22_financial_fields():
+    assert len(SUM_FIELDS) == 22 and "annualcomp" in SUM_FIELDS
+    batch = PayrollBatch.from_records([
+        Rec(planid="A", ssn="1", annualcomp=Decimal("1000")), Rec(planid="A", ssn="1", annualcomp=Decimal("250.50")),
+    ])
+    DuplicateEmployeeService().execute(batch)
+    assert batch.to_records()[0].annualcomp == Decimal("1250.50")
+
+
+def test_keeper_follows_stata_sort_order():
+    batch = PayrollBatch.from_records([
+        Rec(planid="A", ssn="1", fname="active-big", salary=Decimal("900")),
+        Rec(planid="A", ssn="1", fname="termed-zero", salary=Decimal("0"), bonus=Decimal("50"), dot=date(2023, 1, 1)),
+        Rec(planid="A", ssn="1", fname="termed-small", salary=Decimal("10"), dot=date(2023, 1, 1)),
+        Rec(planid="A", ssn="1", fname="termed-large", salary=Decimal("20"), dot=date(2023, 1, 1)),
+        Rec(planid="A", ssn="1", fname="termed-late", salary=Decimal("99"), dot=date(2024, 1, 1)),
+    ])
+    DuplicateEmployeeService().execute(batch)
+    assert batch.column("fname") == ["termed-large"]
+    assert batch.column("dot") == [None]
@@ -0,0 +1,123 @@
+"""Unit tests for the batch ERContribCalcService."""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from bluestar.agents.transform.er_contrib_calc import (
+    ER_CALC_TYPE,
+    PLAN_ENTRY_SQL,
+    ERContribCalcService,
+    max_er,
+)
+from bluestar.agents.transform.match_calc import ER_CONTRIB_YTD_SQL
+from bluestar.models.payroll_batch import PayrollBatch
+from bluestar.models.payroll_record import CanonicalPayrollRecord as Rec
+from bluestar.models.rules import ERContribFormula, IRSLimits
+from bluestar.persistence.memory_backend import MemoryRulesStore, MemorySQLClient
+from tests.fakes import FakeClock
+
+FORMULA = ERContribFormula(level1upto=Decimal("3"), target_field="shne", enabled=True)
+LIMITS = IRSLimits(
+    year=2026,
+    limit_401a17_comp=Decimal("345000"),
+    limit_415c_defined_contrib=Decimal("70000"),
+    limit_402g_deferral=Decimal("23500"),
+)
+PAYROLL = date(2026, 3, 15)
+
+
+class CountingSQLClient(MemorySQLClient):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: list[tuple[str, tuple]] = []
+
+    def query(self, sql, params=()):
+        self.calls.append((sql, params))
+        return super().query(sql, params)
+
+
+@pytest.fixture
+def sql():
+    client = CountingSQLClient()
+    client._responses[PLAN_ENTRY_SQL] = [
+        {"ssn": "000000001", "planentrydate": date(2020, 1, 1)},
+        {"ssn": 2, "planentrydate": "2026-04-01"},
+        {"ssn": "000000003", "planentrydate": date(2019, 1, 1)},
+        {"ssn": "000000003", "planentrydate": date(2024, 7, 1)},
+    ]
+    client._responses[ER_CONTRIB_YTD_SQL] = [{"ssn": "000000003", "ytd": Decimal("10340.00")}]
+    return client
+
+
+def _batch():
+    return PayrollBatch.from_records([
+        Rec(planid="P1", ssn="000000001", ercomp=Decimal("2000.50")),
+        Rec(planid="P1", ssn="000000002", ercomp=Decimal("2000")),  # enters after payroll
+        Rec(planid="P1", ssn="000000003", ercomp=Decimal("2000")),  # near the annual limit
+        Rec(planid="P1", ssn="000000004", ercomp=Decimal("2000")),  # no plan entry date
+    ])
+
+
+def test_max_er_is_min_of_both_limits():
+    # 3% of 345,000 = 10,350 < 70,000 - 23,500
+    assert max_er(FORMULA, LIMITS) == Decimal("1035000")
+    high = ERContribFormula(level1upto=Decimal("25"), enabled=True)
+    assert max_er(high, LIMITS) == Decimal("4650000")
+
+
+def test_eligibility_rate_and_limit(sql):
+    batch = _batch()
+    result = ERContribCalcService(MemoryRulesStore(), sql).execute(batch, "P1", PAYROLL, FORMULA, LIMITS)
+    # 2000.50 * 3% = 60.015 → 60.02; ssn 3 is clipped to 10,350 - 10,340
+    assert batch.column("shne") == [6002, 0, 1000, 0]
+    assert result.records_assigned == 2
+    [reduction] = result.reductions
+    assert reduction.ssn == "000000003"
+    assert (reduction.calculated, reduction.applied) == (Decimal("60.00"), Decimal("10.00"))
+
+
+def test_bulk_queries_and_cached_plan_limit(sql):
+    rules = MemoryRulesStore()
+    rules._calc_rules[f"GLOBAL:{ER_CALC_TYPE}"] = FORMULA.model_dump()
+    rules._irs_limits[2026] = LIMITS.model_dump()
+    service = ERContribCalcService(rules, sql)
+    service.execute(_batch(), "P1", PAYROLL)
+    assert sql.calls == [(PLAN_ENTRY_SQL, ("P1",)), (ER_CONTRIB_YTD_SQL, ("P1", "Ba", 2026))]
+
+    rules._irs_limits[2026] = {}
+    batch = _batch()
+    service.execute(batch, "P1", PAYROLL)
+    assert batch.column("shne")[0] == 6002
+
+
+def test_plan_limit_expires_and_ignores_cache_for_explicit_limits(sql):
+    rules = MemoryRulesStore()
+    rules._irs_limits[2026] = LIMITS.model_dump()
+    clock = FakeClock()
+    service = ERContribCalcService(rules, sql, clock)
+    assert service.plan_limit("P1", 2026, FORMULA) == Decimal("1035000")
+
+    lower = LIMITS.model_copy(update={"limit_401a17_comp": Decimal("100000")})
+    assert service.plan_limit("P1", 2026, FORMULA, lower) == Decimal("300000")
+    assert service.plan_limit("P1", 2026, FORMULA) == Decimal("1035000")
+
+    rules._irs_limits[2026] = lower.model_dump()
+    clock.advance(timedelta(hours=2))
+    assert service.plan_limit("P1", 2026, FORMULA) == Decimal("300000")
+
+
+def test_off_calendar_plan_uses_prior_year(sql):
+    formula = FORMULA.model_copy(update={"off_calendar_year": True})
+    ERContribCalcService(MemoryRulesStore(), sql).execute(_batch(), "P1", PAYROLL, formula, LIMITS)
+    assert (ER_CONTRIB_YTD_SQL, ("P1", "Ba", 2025)) in sql.calls
+
+
+def test_disabled_formula_is_a_no_op(sql):
+    batch = _batch()
+    result = ERContribCalcService(MemoryRulesStore(), sql).execute(batch, "P1", PAYROLL, ERContribFormula())
+    assert not result.enabled
+    assert sql.calls == []
@@ -0,0 +1,130 @@
+"""Unit tests for the single-scan FileExportService."""
+
+from __future__ import annotations
+
+import csv
+import io
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from bluestar.agents.transform.file_export import CsvRowEncoder, FileExportService
+from bluestar.models.payroll_batch import PayrollBatch
+from bluestar.models.payroll_record import CanonicalPayrollRecord as Rec
+from bluestar.persistence.memory_backend import MemoryFileStore, MemoryFileWriter
+
+PAYROLL = date(2026, 3, 13)
+
+
+def _rows(store: MemoryFileStore, path: str) -> list[dict[str, str]]:
+    return list(csv.DictReader(io.StringIO(store.read(path).decode())))
+
+
+def _batch(planids=("P1", "P1", "P1")):
+    return PayrollBatch.from_records([
+        Rec(planid=planids[0], ssn="000000001", planhold="False", deferral=Decimal("-12.05"), dob=date(1980, 1, 2)),
+        Rec(planid=planids[1], ssn="000000002", planhold="TrueEligRun", loan=Decimal("50"), lname="O'Neil, Jr"),
+        Rec(planid=planids[2], ssn="12", planhold="False", badssn="Y", loan=Decimal("1.5")),
+    ])
+
+
+def test_single_plan_outputs_and_counts():
+    store = MemoryFileStore()
+    files = FileExportService(store).execute(_batch(), "P1", "B", PAYROLL, prefix="validated/b1/")
+    counts = {f.filename: f.record_count for f in files}
+    assert counts == {
+        "2026-03-13 P1_B_PayrollALL.csv": 2,
+        "2026-03-13 P1_B_BadSSN.csv": 1,
+        "2026-03-13 P1_B_Loans.csv": 2,
+        "HOLD-2026-03-13 P1_B_PayrollALL.csv": 1,
+        "2026-03-13 P1_B_PlanHOLD.csv": 1,
+    }
+    payroll = _rows(store, "validated/b1/2026-03-13 P1_B_PayrollALL.csv")
+    assert [r["ssn"] for r in payroll] == ["000000001", "12"]
+    assert payroll[0]["deferral"] == "-12.05"
+    assert payroll[0]["dob"] == "1980-01-02"
+    assert payroll[0]["dot"] == ""
+    held = _rows(store, "validated/b1/HOLD-2026-03-13 P1_B_PayrollALL.csv")
+    assert held[0]["lname"] == "O'Neil, Jr"
+    assert [r["loan"] for r in _rows(store, "validated/b1/2026-03-13 P1_B_Loans.csv")] == ["50.00", "1.50"]
+
+
+def test_multi_plan_batches_get_per_plan_files():
+    store = MemoryFileStore()
+    files = FileExportService(store).execute(_batch(("P1", "P2", "P2")), "P1", "B", PAYROLL)
+    per_plan = {f.filename: (f.plan_id, f.record_count) for f in files if f.filename.startswith("files/")}
+    assert per_plan == {
+        "files/2026-03-13 P1_B_PayrollALL.csv": ("P1", 1),
+        "files/HOLD-2026-03-13 P2_B_PayrollALL.csv": ("P2", 1),
+        "files/2026-03-13 P2_B_PayrollALL.csv": ("P2", 1),
+    }
+
+
+def test_empty_outputs_still_written_with_header():
+    store = MemoryFileStore()
+    batch = PayrollBatch.from_records([Rec(planid="P1", ssn="000000001")])
+    FileExportService(store).execute(batch, "P1", "W", PAYROLL)
+    assert store.read("2026-03-13 P1_W_BadSSN.csv").startswith(b"planid,planidfreq,")
+    assert _rows(store, "2026-03-13 P1_W_BadSSN.csv") == []
+
+
+def test_failure_aborts_every_stream():
+    store = MemoryFileStore()
+    batch = _batch()
+    batch.columns["loan"][1] = None  # unorderable → fails mid-scan
+    with pytest.raises(TypeError):
+        FileExportService(store).execute(batch, "P1", "B", PAYROLL)
+    assert store.list_files("") == []
+
+
+def test_encoder_formats_money_and_quotes():
+    enc = CsvRowEncoder(("planid", "salary", "lname"))
+    assert enc.header() == b"planid,salary,lname\n"
+    assert enc.encode(("P1", -5, 'a,"b"')) == b'P1,-0.05,"a,""b"""\n'
+
+
+def test_plan_hold_summary_lists_reasons():
+    store = MemoryFileStore()
+    batch = _batch()
+    batch.columns["clientid"] = ["C1", "C2", "C3"]
+    batch.columns["planholdnote"] = ["", "Eligibility run pending", ""]
+    FileExportService(store).execute(batch, "P1", "B", PAYROLL)
+    assert _rows(store, "2026-03-13 P1_B_PlanHOLD.csv") == [{
+        "planid": "P1", "clientid": "C2", "planhold": "TrueEligRun",
+        "planholdnote": "Eligibility run pending", "records": "1",
+    }]
+
+
+class FailingWriter(MemoryFileWriter):
+    def __init__(self, store, path) -> None:
+        super().__init__(store._files, path)
+        self.store = store
+        self.path = path
+
+    def close(self):
+        if self.path == self.store.fail_path:
+            raise OSError("upload failed")
+        return super().close()
+
+    def abort(self):
+        self.store.aborted.append(self.path)
+        super().abort()
+
+
+class FailingCloseStore(MemoryFileStore):
+    def __init__(self, fail_path: str) -> None:
+        super().__init__()
+        self.fail_path = fail_path
+        self.aborted: list[str] = []
+
+    def open_write(self, path, content_type="application/octet-stream"):
+        return FailingWriter(self, path)
+
+
+def test_close_failure_aborts_the_rest_and_removes_committed_files():
+    store = FailingCloseStore("2026-03-13 P1_B_Loans.csv")
+    with pytest.raises(OSError, match="upload failed"):
+        FileExportService(store).execute(_batch(), "P1", "B", PAYROLL)
+    assert store.list_files("") == []
+    assert store.aborted == ["HOLD-2026-03-13 P1_B_PayrollALL.csv", "2026-03-13 P1_B_PlanHOLD.csv"]
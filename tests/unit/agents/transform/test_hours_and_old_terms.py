@@ -0,0 +1,45 @@
+"""Unit tests for the HoursEstimationService and DropOldTermsService filter stages."""
+
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+from bluestar.agents.transform.drop_old_terms import DropOldTermsService
+from bluestar.agents.transform.hours_estimation import HoursEstimationService
+from bluestar.models.payroll_batch import PayrollBatch
+from bluestar.models.payroll_record import CanonicalPayrollRecord as Rec
+
+PAYROLL = date(2026, 6, 30)
+
+
+def test_hours_estimated_capped_and_bonus_only_stripped():
+    batch = PayrollBatch.from_records([
+        Rec(payfreq="B", salary=Decimal("500"), overtime=Decimal("0.05")),  # 50.005 → 50.01
+        Rec(payfreq="W", salary=Decimal("2000")),  # capped at 45
+        Rec(payfreq="X", salary=Decimal("5000")),  # unknown payfreq → 90
+        Rec(payfreq="B", hours=Decimal("8"), bonus=Decimal("100")),  # bonus only
+        Rec(payfreq="M", hours=Decimal("160"), salary=Decimal("4000")),  # untouched
+    ])
+    counts = HoursEstimationService().execute(batch)
+    assert counts == {"estimated": 3, "bonus_only": 1}
+    assert batch.column("hours") == [5001, 4500, 9000, 0, 16000]
+
+
+def test_drop_old_terms_is_lazy():
+    batch = PayrollBatch.from_records([
+        Rec(ssn="1", dot=date(2025, 1, 1)),  # old term, nothing paid → dropped
+        Rec(ssn="2", dot=date(2026, 3, 1)),  # recent term
+        Rec(ssn="3", dot=date(2025, 1, 1), loan=Decimal("25")),  # still repaying a loan
+        Rec(ssn="4"),  # active
+        Rec(ssn="5", dot=date(2024, 12, 31), commissions=Decimal("100")),  # no salary or hours → dropped
+    ])
+    ssn = batch.raw_column("ssn")
+    assert DropOldTermsService().execute(batch, PAYROLL) == 2
+    assert len(batch) == 3
+    assert batch.raw_column("ssn") is ssn
+
+    # mask kernel keeps the selection pending; dropped row 5's commissions are not counted
+    assert HoursEstimationService().execute(batch) == {"estimated": 0, "bonus_only": 0}
+    assert batch.selection == [1, 2, 3]
+    assert [r.ssn for r in batch.to_records()] == ["2", "3", "4"]
@@ -0,0 +1,117 @@
+"""Unit tests for the batch MatchCalcService."""
+
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from bluestar.agents.transform.match_calc import (
+    ER_CONTRIB_YTD_SQL,
+    MATCH_CALC_TYPE,
+    MatchCalcService,
+    limitation_year,
+)
+from bluestar.models.payroll_batch import PayrollBatch
+from bluestar.models.payroll_record import CanonicalPayrollRecord as Rec
+from bluestar.models.rules import IRSLimits, MatchFormula
+from bluestar.persistence.memory_backend import MemoryRulesStore, MemorySQLClient
+
+SAFE_HARBOR = MatchFormula(
+    level1pct=Decimal("100"), level1upto=Decimal("3"),
+    level2pct=Decimal("50"), level2upto=Decimal("5"),
+    target_source="shmatch", enabled=True,
+)
+LIMITS = IRSLimits(year=2026, limit_401a17_comp=Decimal("345000"))
+
+
+class CountingSQLClient(MemorySQLClient):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: list[tuple[str, tuple]] = []
+
+    def query(self, sql, params=()):
+        self.calls.append((sql, params))
+        return super().query(sql, params)
+
+
+@pytest.fixture
+def sql():
+    client = CountingSQLClient()
+    client._responses[ER_CONTRIB_YTD_SQL] = [{"ssn": 4, "ytd": Decimal("13790.00")}]
+    return client
+
+
+def _batch():
+    return PayrollBatch.from_records([
+        Rec(planid="P1", ssn="000000001", matchcomp=Decimal("1000"), deferral=Decimal("60")),
+        Rec(
+            planid="P1", ssn="000000002", matchcomp=Decimal("1000"),
+            deferral=Decimal("20"), rothdeferral=Decimal("20"),
+        ),
+        Rec(planid="P1", ssn="000000003", matchcomp=Decimal("1000"), deferral=Decimal("20")),
+        Rec(planid="P1", ssn="000000004", matchcomp=Decimal("1000"), deferral=Decimal("60")),
+        Rec(planid="P1", ssn="000000005", matchcomp=Decimal("0"), deferral=Decimal("60")),
+        Rec(planid="P1", ssn="000000006", matchcomp=Decimal("1000"), deferral=Decimal("60"), shmatch=Decimal("1")),
+    ])
+
+
+def test_two_tier_formula_and_annual_limit(sql):
+    batch = _batch()
+    result = MatchCalcService(MemoryRulesStore(), sql).execute(
+        batch, "P1", date(2026, 3, 15), formula=SAFE_HARBOR, limits=LIMITS
+    )
+    # 6% → 3% + 1%; 4% (deferral + Roth) → 3% + 0.5%; 2% → 2%; ytd-limited; no comp; pre-populated
+    assert batch.column("shmatch") == [4000, 3500, 2000, 1000, 0, 100]
+    assert batch.column("match") == [0] * 6
+    assert result.records_assigned == 4
+    assert result.total_assigned == Decimal("105.00")  # the pre-populated 1.00 was not assigned here
+    [reduction] = result.reductions
+    assert reduction.ssn == "000000004"
+    assert reduction.calculated == Decimal("40.00")
+    assert reduction.annual_limit == Decimal("13800")
+    assert reduction.applied == Decimal("10.00")
+
+
+def test_ytd_prefetched_once_per_plan(sql):
+    batch = PayrollBatch.from_records([
+        Rec(planid=p, ssn=f"00000000{i}", matchcomp=Decimal("100"), deferral=Decimal("1"))
+        for i, p in enumerate(["P1", "P2", "P1", "P2", "P1"])
+    ])
+    MatchCalcService(MemoryRulesStore(), sql).execute(batch, "P1", date(2026, 3, 15), SAFE_HARBOR, LIMITS)
+    assert sql.calls == [(ER_CONTRIB_YTD_SQL, ("P1", "Ma", 2026)), (ER_CONTRIB_YTD_SQL, ("P2", "Ma", 2026))]
+
+
+def test_rounds_once_half_up():
+    batch = PayrollBatch.from_records([
+        Rec(planid="P1", ssn="000000001", matchcomp=Decimal("333.33"), deferral=Decimal("10.01")),
+        Rec(planid="P1", ssn="000000002", matchcomp=Decimal("100"), deferral=Decimal("3.01")),
+    ])
+    # 9.9999 + (10.01 - 9.9999) * 50% = 10.00495 → 10.00; 3.00 + 0.01 * 50% = 3.005 → 3.01
+    assert MatchCalcService.calculate(batch, SAFE_HARBOR) == [1000, 301]
+
+
+def test_formula_and_limits_loaded_from_rules(sql):
+    rules = MemoryRulesStore()
+    rules._calc_rules[f"GLOBAL:{MATCH_CALC_TYPE}"] = SAFE_HARBOR.model_dump() | {"off_calendar_year": True}
+    rules._irs_limits[2025] = {"limit_401a17_comp": "340000"}
+    batch = _batch()
+    result = MatchCalcService(rules, sql).execute(batch, "P1", date(2026, 3, 15))
+    assert sql.calls[0][1] == ("P1", "Ma", 2025)
+    assert result.reductions[0].annual_limit == Decimal("13600")
+
+
+def test_disabled_formula_is_a_no_op(sql):
+    batch = _batch()
+    result = MatchCalcService(MemoryRulesStore(), sql).execute(
+        batch, "P1", date(2026, 3, 15), formula=MatchFormula()
+    )
+    assert not result.enabled
+    assert sql.calls == []
+    assert batch.column("match") == [0] * 6
+
+
+def test_limitation_year():
+    assert limitation_year(date(2026, 1, 5), False) == 2026
+    assert limitation_year(date(2026, 1, 5), True) == 2025
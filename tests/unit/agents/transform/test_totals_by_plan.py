@@ -0,0 +1,63 @@
+"""Unit tests for TotalsByPlanService and the fused 1700/1800/1900 scan."""
+
+from __future__ import annotations
+
+from decimal import Decimal
+
+from bluestar.agents.transform.negative_payroll import NegativePayrollService
+from bluestar.agents.transform.totals_by_plan import TotalsByPlanService
+from bluestar.models.payroll_batch import PayrollBatch
+from bluestar.models.payroll_record import CanonicalPayrollRecord as Rec
+from bluestar.models.pipeline import StepStatus
+
+
+def _records():
+    return [
+        Rec(planid="A", identifier="LOC1", deferral=Decimal("100"), match=Decimal("-25.50"), salary=Decimal("2000")),
+        Rec(planid="A", identifier="LOC2", deferral=Decimal("50.25"), loan=Decimal("10")),
+        Rec(planid="B", salary=Decimal("1500"), deferral=Decimal("-5")),
+        Rec(planid="C"),
+    ]
+
+
+def test_fused_matches_sequential_steps():
+    sequential = PayrollBatch.from_records(_records())
+    service = TotalsByPlanService()
+    incl = service.execute(sequential)
+    changed = NegativePayrollService().execute(sequential)
+    excl = service.execute(sequential)
+
+    fused_batch = PayrollBatch.from_records(_records())
+    fused = service.execute_fused(fused_batch)
+
+    assert fused.inclneg == incl
+    assert fused.exclneg == excl
+    assert fused.negative_records == changed == 2
+    assert fused_batch.columns == sequential.columns
+
+
+def test_totals_include_then_exclude_negatives():
+    fused = TotalsByPlanService().execute_fused(PayrollBatch.from_records(_records()))
+    plan_a_incl = fused.inclneg.by_plan[0]
+    plan_a_excl = fused.exclneg.by_plan[0]
+    assert plan_a_incl.plan_id == "A"
+    assert plan_a_incl.match == Decimal("-25.50")
+    assert plan_a_incl.grand_total == Decimal("134.75")
+    assert plan_a_excl.match == Decimal("0")
+    assert plan_a_excl.grand_total == Decimal("160.25")
+    assert [(t.identifier, t.grand_total) for t in fused.exclneg.by_identifier] == [
+        ("LOC1", Decimal("100.00")), ("LOC2", Decimal("60.25")),
+    ]
+
+
+def test_no_payroll_flags_census_only_plans():
+    fused = TotalsByPlanService().execute_fused(PayrollBatch.from_records(_records()))
+    # B has salary so it is not census-only even though its contributions net to zero after 1800
+    assert fused.exclneg.no_payroll_plans == ["C"]
+
+
+def test_fused_emits_state_per_logical_step():
+    fused = TotalsByPlanService().execute_fused(PayrollBatch.from_records(_records()))
+    assert [s.step_order for s in fused.step_states] == [1700, 1800, 1900]
+    assert all(s.status == StepStatus.COMPLETED and s.record_count == 4 for s in fused.step_states)
+    assert fused.step_states[0].end_time == fused.step_states[1].start_time
@@ -0,0 +1,110 @@
+"""Unit tests for the streaming XMLGeneratorService."""
+
+from __future__ import annotations
+
+import xml.etree.ElementTree as ET
+from datetime import UTC, date, datetime
+
+import pytest
+
+from bluestar.agents.business_calendar import BusinessCalendar
+from bluestar.agents.transform.xml_generator import (
+    PAY_SCHED_SQL,
+    XMLGeneratorService,
+    plan_year_end,
+)
+from bluestar.persistence.memory_backend import MemoryFileStore, MemoryRulesStore, MemorySQLClient
+from tests.fakes import FakeClock
+
+EFFECTIVE = date(2026, 3, 13)
+
+
+def calendar_on(day: date) -> BusinessCalendar:
+    return BusinessCalendar(FakeClock(datetime(day.year, day.month, day.day, 15, tzinfo=UTC)))
+
+
+class CountingSQLClient(MemorySQLClient):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: list[tuple[str, tuple]] = []
+
+    def query(self, sql, params=()):
+        self.calls.append((sql, params))
+        return super().query(sql, params)
+
+
+@pytest.fixture
+def sql():
+    client = CountingSQLClient()
+    client._responses[PAY_SCHED_SQL] = [{"freqcode": "B ", "sequencenumber": 6}]
+    return client
+
+
+@pytest.fixture
+def rules():
+    store = MemoryRulesStore()
+    store._configs["P1:B"] = {"planYEmmdd": "06-30", "ein": "12-3456789"}
+    return store
+
+
+def test_streams_relius_document(rules, sql):
+    files = MemoryFileStore()
+    service = XMLGeneratorService(rules, sql, files, calendar=calendar_on(date(2026, 3, 13)))
+    export = service.execute(["P1", "P1"], "B", EFFECTIVE, "\\\\share\\P1 PayrollALL.csv", prefix="out/")
+
+    assert export.filename == "2026-03-13 P1_B_PayrollXML.xml"
+    assert export.record_count == 1
+    root = ET.fromstring(files.read("out/2026-03-13 P1_B_PayrollXML.xml"))
+    assert root.tag == "REQUESTS" and root.get("ActionCode") == "P"
+    request = root.find("IMPORT_PAYROLL/REQUEST_PAYROLL")
+    assert request.get("EmployerIdentificationNumber") == "12-3456789"
+    info = request.find("PAYROLL_PARAMETER_INFO")
+    assert info.findtext("YearEndDate") == "2026-06-30"
+    assert info.find("FrequencyCode").get("tc") == "B"
+    assert info.findtext("PayrollFrequencySequenceNumber") == "6"
+    assert info.findtext("DERName") == "1Payroll DER ALL"
+    assert info.findtext("DERFileName") == "\\\\share\\P1 PayrollALL.csv"
+    assert info.findtext("AllocationEffectiveDate") == "2026-03-16"  # Friday → Monday
+    assert [child.tag for child in info][-2:] == ["AllocationEffectiveDate", "ContributionPercentEffectiveDate"]
+
+
+def test_schedule_looked_up_once_per_plan_per_run(rules, sql):
+    service = XMLGeneratorService(rules, sql, MemoryFileStore(), calendar=calendar_on(EFFECTIVE))
+    service.execute(["P1", "P1"], "B", EFFECTIVE, "a.csv")
+    service.execute(["P1"], "B", EFFECTIVE, "b.csv")
+    assert sql.calls == [(PAY_SCHED_SQL, ("P1", EFFECTIVE))] * 2
+
+
+def test_missing_schedule_detail_writes_manual_load_file_until_added(rules):
+    files, sql = MemoryFileStore(), MemorySQLClient()
+    service = XMLGeneratorService(rules, sql, files, calendar=calendar_on(EFFECTIVE))
+    export = service.execute(["P1"], "B", EFFECTIVE, "a.csv")
+    assert export.filename.endswith("_PayrollXML_LoadFileManually.txt")
+    assert export.file_type == "txt"
+    assert files.read(export.s3_path).startswith(b"<?xml")
+
+    sql._responses[PAY_SCHED_SQL] = [{"freqcode": "B", "sequencenumber": 6}]
+    export = service.execute(["P1"], "B", EFFECTIVE, "a.csv")
+    assert export.filename.endswith("_PayrollXML.xml")
+    assert export.file_type == "xml"
+
+
+def test_allocation_date_follows_today_across_runs(rules, sql):
+    clock = FakeClock(datetime(2026, 3, 13, 15, tzinfo=UTC))
+    service = XMLGeneratorService(rules, sql, MemoryFileStore(), calendar=BusinessCalendar(clock))
+    assert service.plan_parameters("P1", "B", EFFECTIVE).allocation_date == "2026-03-16"
+    clock.set(datetime(2026, 3, 16, 15, tzinfo=UTC))
+    assert service.plan_parameters("P1", "B", EFFECTIVE).allocation_date == "2026-03-17"
+
+
+def test_plan_year_end_rolls_forward():
+    assert plan_year_end(date(2026, 3, 13), "12-31") == date(2026, 12, 31)
+    assert plan_year_end(date(2026, 7, 1), "06-30") == date(2027, 6, 30)
+    assert plan_year_end(date(2026, 6, 30), "06/30") == date(2026, 6, 30)
+    assert plan_year_end(date(2026, 3, 13), "02-29") == date(2027, 2, 28)
+    assert plan_year_end(date(2027, 3, 13), "02-29") == date(2028, 2, 29)
+
+
+def test_allocation_date_never_before_effective_date(rules, sql):
+    service = XMLGeneratorService(rules, sql, MemoryFileStore(), calendar=calendar_on(date(2026, 3, 2)))
+    assert service.plan_parameters("P1", "B", EFFECTIVE).allocation_date == "2026-03-13"
@@ -0,0 +1,93 @@
+"""Unit tests for the batch EmploymentStatusService."""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+
+import pytest
+
+from bluestar.agents.validator.employment_status import (
+    JOB_STATUS_SQL,
+    ORIGINAL_DOH_SQL,
+    RULES,
+    EmploymentStatusService,
+)
+from bluestar.models.payroll_batch import PayrollBatch
+from bluestar.models.payroll_record import CanonicalPayrollRecord
+from bluestar.persistence.memory_backend import MemorySQLClient
+
+
+class CountingSQLClient(MemorySQLClient):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: list[tuple[str, tuple]] = []
+
+    def query(self, sql, params=()):
+        self.calls.append((sql, params))
+        return super().query(sql, params)
+
+
+@pytest.fixture
+def sql():
+    client = CountingSQLClient()
+    client._responses[JOB_STATUS_SQL] = [
+        {"ssn": "000000001", "eecodestatus": "A", "eecodestatussubcd": "", "eecodestartdate": None},
+        {"ssn": 2, "eecodestatus": "H", "eecodestatussubcd": "R", "eecodestartdate": datetime(2023, 6, 1)},
+        {"ssn": "000000003", "eecodestatus": "T", "eecodestatussubcd": "", "eecodestartdate": date(2019, 1, 1)},
+        {"ssn": "000000004", "eecodestatus": "H", "eecodestatussubcd": "O", "eecodestartdate": None},
+    ]
+    client._responses[ORIGINAL_DOH_SQL] = [{"ssn": "000000005", "dohoriginal": "2010-03-15"}]
+    return client
+
+
+def _batch(*records: CanonicalPayrollRecord) -> PayrollBatch:
+    return PayrollBatch.from_records(list(records))
+
+
+def test_reference_loaded_once_per_plan(sql):
+    batch = _batch(*(CanonicalPayrollRecord(planid="ACME", ssn=f"{i:09d}") for i in range(50)))
+    EmploymentStatusService(sql).execute(batch)
+    assert sql.calls == [(JOB_STATUS_SQL, ("ACME",)), (ORIGINAL_DOH_SQL, ("ACME",))]
+
+
+def test_rules_applied_and_counted(sql):
+    batch = _batch(
+        # rehire without DOT (active status, dor set, no dot)
+        CanonicalPayrollRecord(planid="ACME", ssn="000000001", doh=date(2015, 1, 1), dor=date(2022, 1, 1)),
+        # valid rehire kept: H/R with dor == eecodestartdate
+        CanonicalPayrollRecord(planid="ACME", ssn="000000002", doh=date(2015, 1, 1), dor=date(2023, 6, 1)),
+        # termed after hire: dor set from doh; invalid dot cleared
+        CanonicalPayrollRecord(planid="ACME", ssn="000000003", doh=date(2020, 1, 1), dot=date(1900, 1, 1)),
+        # dor == doh with hired-original status
+        CanonicalPayrollRecord(planid="ACME", ssn="000000004", doh=date(2018, 1, 1), dor=date(2018, 1, 1)),
+        # no Relius status; DOH replaced from originalDOH; dor before doh cleared
+        CanonicalPayrollRecord(planid="ACME", ssn="000000005", doh=date(2012, 1, 1), dor=date(2011, 1, 1)),
+        # dot after dor supersedes
+        CanonicalPayrollRecord(planid="ACME", ssn="000000006", doh=date(2010, 1, 1), dot=date(2024, 1, 1),
+                               dor=date(2020, 1, 1)),
+    )
+    counts = EmploymentStatusService(sql).execute(batch)
+
+    assert list(counts) == list(RULES)
+    assert counts == {
+        "clear_invalid_dot": 1,
+        "clear_invalid_dor": 0,
+        "dor_before_doh": 1,
+        "dor_equals_doh_hired_original": 1,
+        "dor_from_doh_after_term": 1,
+        "rehire_without_dot": 1,
+        "dot_supersedes_dor": 1,
+        "replace_doh_with_original": 1,
+    }
+    assert batch.column("rehirewithoutdot") == [1, 0, 0, 0, 0, 0]
+    assert batch.column("dor") == [None, date(2023, 6, 1), date(2020, 1, 1), None, None, None]
+    assert batch.column("dot")[2] is None
+    assert batch.column("doh")[4] == date(2010, 3, 15)
+
+
+def test_unmatched_record_is_flagged_as_rehire_without_dot(sql):
+    batch = _batch(CanonicalPayrollRecord(planid="ACME", ssn="000000099", doh=date(2015, 1, 1), dor=date(2022, 1, 1)))
+    counts = EmploymentStatusService(sql).execute(batch)
+    assert counts["rehire_without_dot"] == 1
+    assert batch.column("rehirewithoutdot") == [1]
+    assert batch.column("dor") == [None]
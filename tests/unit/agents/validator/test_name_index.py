@@ -0,0 +1,89 @@
+"""Unit tests for NameEquivalenceIndex (sort-mismatch nickname exception)."""
+
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+from bluestar.agents.validator.name_index import NameEquivalenceIndex, normalize_name, soundex
+from bluestar.persistence.memory_backend import MemoryRulesStore
+
+DOB = date(1980, 5, 17)
+
+
+@pytest.fixture
+def index():
+    return NameEquivalenceIndex()
+
+
+class TestNormalization:
+    def test_normalize_strips_punctuation_and_case(self):
+        assert normalize_name(" O'Brien-Smith ") == "obriensmith"
+
+    @pytest.mark.parametrize(("name", "code"), [
+        ("robert", "R163"), ("rupert", "R163"), ("ashcraft", "A261"), ("tymczak", "T522"), ("lee", "L000"),
+    ])
+    def test_soundex(self, name, code):
+        assert soundex(name) == code
+
+
+class TestKeys:
+    def test_nickname_maps_to_canonical(self, index):
+        assert index.key("BOB").canonical == "robert"
+        assert index.key("Robert").canonical == "robert"
+
+    def test_key_is_memoized(self, index):
+        assert index.key("Bobby") is index.key("Bobby")
+
+    def test_key_cache_is_bounded(self):
+        index = NameEquivalenceIndex(cache_size=2)
+        for name in ("Ann", "Bob", "Cal"):
+            index.key(name)
+        assert index._key.cache_info().currsize == 2
+        index.clear_cache()
+        assert index._key.cache_info().currsize == 0
+
+    def test_rules_store_extends_defaults(self):
+        store = MemoryRulesStore()
+        store._validation_rules["NICKNAMES"] = [{"canonical": "Eustace", "nicknames": ["Stacey"]}]
+        index = NameEquivalenceIndex.from_rules_store(store)
+        assert index.key("stacey").canonical == "eustace"
+        assert index.key("bob").canonical == "robert"
+
+    def test_relius_keys_indexed_by_ssn(self, index):
+        keys = index.relius_keys([
+            {"ssn": "123456789", "reliusfname": "ROBERT", "reliuslname": "SMITH", "reliusdob": DOB},
+        ])
+        assert keys["123456789"].fname.canonical == "robert"
+
+
+class TestSortException:
+    def test_nickname_with_matching_dob(self, index):
+        file_p = index.person_key("Bob", "Jones", DOB)
+        relius_p = index.person_key("ROBERT", "SMITH", DOB)
+        assert NameEquivalenceIndex.is_sort_exception(file_p, relius_p)
+
+    def test_listed_spelling_variant(self, index):
+        assert index.is_sort_exception(index.person_key("Jon", "X", DOB), index.person_key("John", "Y", DOB))
+
+    @pytest.mark.parametrize(("a", "b"), [("Jon", "Jane"), ("Ann", "Amy")])
+    def test_same_soundex_is_not_equivalent(self, index, a, b):
+        assert index.key(a).phonetic == index.key(b).phonetic
+        assert not index.is_sort_exception(index.person_key(a, "X", DOB), index.person_key(b, "Y", DOB))
+
+    def test_containment_rule_preserved(self, index):
+        assert index.is_sort_exception(index.person_key("Mary Ann", "X", DOB), index.person_key("Mary", "Y", DOB))
+
+    def test_last_name_match(self, index):
+        assert index.is_sort_exception(index.person_key("Zed", "Smith", DOB), index.person_key("Alice", "SMITH", DOB))
+
+    def test_dob_mismatch_never_excepted(self, index):
+        assert not index.is_sort_exception(
+            index.person_key("Bob", "Smith", DOB), index.person_key("Robert", "Smith", date(1981, 5, 17))
+        )
+
+    def test_different_people_not_excepted(self, index):
+        assert not index.is_sort_exception(
+            index.person_key("Alice", "Jones", DOB), index.person_key("Karen", "Smith", DOB)
+        )
@@ -0,0 +1,114 @@
+"""Unit tests for the in-process fast-path orchestrator."""
+
+from __future__ import annotations
+
+import json
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from bluestar.agents.transform.hours_estimation import HoursEstimationService
+from bluestar.core.exceptions import PipelineError, RetryableStepError, StepFailedError
+from bluestar.core.protocols import IOrchestrator
+from bluestar.models.payroll_batch import PayrollBatch
+from bluestar.models.payroll_record import CanonicalPayrollRecord as Rec
+from bluestar.orchestration.inprocess_orchestrator import InProcessOrchestrator, StepContext
+from tests.fakes import MemoryRulesStore
+
+SEED = Path(__file__).resolve().parents[3] / "config" / "pipeline_seed.json"
+
+
+class RecordingRemote:
+    def __init__(self) -> None:
+        self.dispatched: list[str] = []
+
+    async def dispatch_step(self, batch_id, step_order, agent, parameters):
+        self.dispatched.append(parameters["subroutine_name"])
+        return {"record_count": 2}
+
+    async def run_pipeline(self, batch_id, plan_id, pay_freq, s3_path):
+        raise NotImplementedError
+
+
+class RecordingState:
+    def __init__(self) -> None:
+        self.steps: dict[int, str] = {}
+
+    async def get_batch_state(self, batch_id):
+        return {}
+
+    async def update_step_state(self, batch_id, step_order, status, **metadata):
+        self.steps[step_order] = status
+
+    async def update_batch_state(self, batch_id, status, **metadata):
+        pass
+
+
+def _rules():
+    rules = MemoryRulesStore()
+    rules._pipeline_steps["DEFAULT:BiWeeklyFri"] = json.loads(SEED.read_text())["steps"]
+    return rules
+
+
+def _fix_hours(ctx: StepContext):
+    return HoursEstimationService().execute(ctx.batch) | {"warning_count": 0}
+
+
+async def _noop(ctx: StepContext):
+    ctx.outputs[ctx.subroutine_name] = True
+    return {}
+
+
+async def test_deterministic_steps_run_locally_and_model_steps_cross_queues():
+    remote, state = RecordingRemote(), RecordingState()
+    handlers = {name: _noop for name in ("FILE_INGEST", "FILE_VALIDATION", "BAD_SSN", "FORMAT_DATES_STRINGS")}
+    handlers["FIX_HOURS"] = _fix_hours
+    orchestrator = InProcessOrchestrator(_rules(), handlers, remote=remote, state=state)
+    assert isinstance(orchestrator, IOrchestrator)
+    orchestrator.attach("b1", PayrollBatch.from_records([
+        Rec(salary=Decimal("500"), payfreq="W"), Rec(bonus=Decimal("10"), hours=Decimal("8")),
+    ]))
+
+    result = await orchestrator.run_pipeline("b1", "DEFAULT", "BiWeeklyFri", "s3://in/b1.csv")
+
+    assert result["status"] == "COMPLETED"
+    assert result["record_count"] == 2
+    assert "FILE_INGEST" in remote.dispatched  # needs the IDP model
+    assert not {"FILE_VALIDATION", "BAD_SSN", "FORMAT_DATES_STRINGS", "FIX_HOURS"} & set(remote.dispatched)
+    assert orchestrator.local_steps == 4
+    assert orchestrator.remote_steps == len(remote.dispatched)
+    assert orchestrator.batch("b1").column("hours") == [4500, 0]
+    # Same per-step state records as a fully queued run: every step has one.
+    assert len(state.steps) == len(result["steps"]) == 27
+    steps = {s["step_order"]: s for s in result["steps"]}
+    assert steps[1500]["record_count"] == 2
+
+
+async def test_requires_model_override_and_missing_remote():
+    orchestrator = InProcessOrchestrator(MemoryRulesStore(), {"BAD_SSN": _noop})
+    assert orchestrator.runs_locally("BAD_SSN", {})
+    assert not orchestrator.runs_locally("BAD_SSN", {"requiresModel": True})
+    with pytest.raises(PipelineError, match="no remote orchestrator"):
+        await orchestrator.dispatch_step("b1", 900, "VALIDATOR", {"subroutine_name": "BAD_SSN", "requiresModel": True})
+
+
+async def test_local_step_errors_are_never_retried():
+    calls = []
+
+    def flaky(ctx: StepContext):
+        calls.append(ctx.step_order)
+        ctx.batch.raw_column("hours")[0] = Decimal("1")
+        raise RetryableStepError("lost the SQL connection")
+
+    rules = MemoryRulesStore()
+    rules._pipeline_steps["DEFAULT:BiWeeklyFri"] = [
+        {"stepOrder": 1500, "subroutineName": "FIX_HOURS", "agent": "TRANSFORMATION"},
+    ]
+    orchestrator = InProcessOrchestrator(rules, {"FIX_HOURS": flaky}, retry_backoff=0)
+    orchestrator.attach("b1", PayrollBatch.from_records([Rec()]))
+    result = await orchestrator.run_pipeline("b1", "DEFAULT", "BiWeeklyFri", "s3://in/b1.csv")
+    assert result["status"] == "FAILED"
+    assert calls == [1500]
+    with pytest.raises(StepFailedError, match="lost the SQL connection"):
+        await orchestrator.dispatch_step("b1", 1500, "TRANSFORMATION", {"subroutine_name": "FIX_HOURS"})
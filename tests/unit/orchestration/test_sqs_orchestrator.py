@@ -0,0 +1,177 @@
+"""Unit tests for the SQS orchestrator against the in-memory queue stand-in."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+
+from bluestar.core.exceptions import StepFailedError
+from bluestar.orchestration import sqs_orchestrator
+from bluestar.orchestration.sqs_orchestrator import BatchSender, PayloadOffload, SQSOrchestrator, SQSStepWorker
+from tests.fakes import MemoryCacheBackend, MemoryRulesStore, MemorySQSClient
+
+QUEUES = {"IDP": "q/idp", "VALIDATOR": "q/validator"}
+REPLIES = "q/orchestrator"
+
+
+@asynccontextmanager
+async def _workers(*workers):
+    tasks = [asyncio.create_task(w.run()) for w in workers]
+    try:
+        yield
+    finally:
+        for worker in workers:
+            worker.stop()
+        await asyncio.gather(*tasks)
+
+
+def _echo(request):
+    return {"record_count": len(request["parameters"].get("blob", "")) or 7}
+
+
+async def test_pipeline_runs_over_batched_queues():
+    rules = MemoryRulesStore()
+    rules._pipeline_steps["P1:W"] = [
+        {"stepOrder": 100, "subroutineName": "FILE_INGEST", "agent": "IDP", "dependsOn": []},
+        *(
+            {"stepOrder": o, "subroutineName": f"CHECK_{o}", "agent": "VALIDATOR", "dependsOn": ["FILE_INGEST"]}
+            for o in (200, 300, 400, 500)
+        ),
+    ]
+    client = MemorySQSClient()
+    orchestrator = SQSOrchestrator(client, QUEUES, REPLIES, rules, wait_time=0.05, default_limit=4)
+    idp = SQSStepWorker(client, QUEUES["IDP"], _echo, wait_time=0.05)
+    validator = SQSStepWorker(client, QUEUES["VALIDATOR"], _echo, wait_time=0.05)
+
+    async with _workers(idp, validator):
+        result = await orchestrator.run_pipeline("b1", "P1", "W", "")
+
+    assert result["status"] == "COMPLETED"
+    assert [s["record_count"] for s in result["steps"]] == [7] * 5
+    assert (idp.handled, validator.handled) == (1, 4)
+    # four validator steps and their four replies each went out as one batch
+    assert client.calls["send_message_batch"] == 4
+    assert all(client.depth(q) == 0 for q in (*QUEUES.values(), REPLIES))
+
+
+async def test_large_payloads_travel_by_reference():
+    client, cache = MemorySQSClient(), MemoryCacheBackend()
+    offload = PayloadOffload(cache, threshold=1024)
+    orchestrator = SQSOrchestrator(client, QUEUES, REPLIES, MemoryRulesStore(), offload=offload, wait_time=0.05)
+    seen: list[str] = []
+    worker = SQSStepWorker(client, QUEUES["IDP"], _echo, offload=offload, wait_time=0.05)
+    original = client.send_message_batch
+
+    def spy(QueueUrl, Entries):
+        seen.extend(e["MessageBody"] for e in Entries)
+        return original(QueueUrl=QueueUrl, Entries=Entries)
+
+    client.send_message_batch = spy
+    async with _workers(worker):
+        result = await orchestrator.dispatch_step("b1", 100, "IDP", {"blob": "x" * 5000})
+
+    assert result == {"record_count": 5000}
+    assert "payloadRef" in json.loads(seen[0]) and len(seen[0]) < 100
+    assert cache._store == {}  # consumed payloads are discarded
+
+
+async def test_heartbeat_keeps_a_long_step_invisible():
+    client = MemorySQSClient()
+
+    async def slow(request):
+        await asyncio.sleep(0.35)
+        return {}
+
+    worker = SQSStepWorker(client, QUEUES["IDP"], slow, visibility_timeout=0.2, wait_time=0.05)
+    other = SQSStepWorker(client, QUEUES["IDP"], slow, visibility_timeout=0.2, wait_time=0.05)
+    await BatchSender(client).send(QUEUES["IDP"], json.dumps({"correlationId": "x", "replyTo": REPLIES}))
+
+    assert await worker.poll_once() == 1
+    assert worker.heartbeats >= 1
+    assert await other.poll_once() == 0  # deleted, never redelivered
+    assert client.depth(REPLIES) == 1
+
+
+async def test_step_error_is_raised_to_the_executor():
+    client = MemorySQSClient()
+
+    def broken(request):
+        raise ValueError("bad vendor file")
+
+    orchestrator = SQSOrchestrator(client, QUEUES, REPLIES, MemoryRulesStore(), wait_time=0.05)
+    async with _workers(SQSStepWorker(client, QUEUES["IDP"], broken, wait_time=0.05)):
+        with pytest.raises(StepFailedError, match="bad vendor file"):
+            await orchestrator.dispatch_step("b1", 100, "IDP", {"subroutine_name": "FILE_INGEST"})
+
+
+async def test_sender_splits_into_batches_of_ten():
+    client = MemorySQSClient()
+    sender = BatchSender(client)
+    ids = await asyncio.gather(*(sender.send("q/x", str(i)) for i in range(23)))
+    assert len(set(ids)) == 23
+    assert client.calls["send_message_batch"] == 3
+
+
+class FlakyReceiveClient(MemorySQSClient):
+    def __init__(self) -> None:
+        super().__init__()
+        self.fail_receives = 1
+
+    def receive_message(self, QueueUrl, **kwargs):
+        if QueueUrl == REPLIES and self.fail_receives:
+            self.fail_receives -= 1
+            raise ConnectionError("endpoint unreachable")
+        return super().receive_message(QueueUrl, **kwargs)
+
+
+async def test_receiver_survives_bad_replies_and_receive_errors(monkeypatch):
+    monkeypatch.setattr(sqs_orchestrator, "RECEIVE_RETRY_DELAY", 0)
+    client, cache = FlakyReceiveClient(), MemoryCacheBackend()
+    client.send_message_batch(REPLIES, [{"Id": "0", "MessageBody": json.dumps({"payloadRef": "redis://gone"})}])
+    orchestrator = SQSOrchestrator(
+        client, QUEUES, REPLIES, MemoryRulesStore(), offload=PayloadOffload(cache), wait_time=0.05, step_timeout=5
+    )
+    async with _workers(SQSStepWorker(client, QUEUES["IDP"], _echo, wait_time=0.05)):
+        result = await orchestrator.dispatch_step("b1", 100, "IDP", {"subroutine_name": "FILE_INGEST"})
+    assert result == {"record_count": 7}
+    assert client.fail_receives == 0
+    assert client.depth(REPLIES) == 1  # the unreadable reply is left for redelivery
+
+
+async def test_worker_deletes_the_messages_it_handled():
+    client, cache = MemorySQSClient(), MemoryCacheBackend()
+    good = {"correlationId": "x:b1:100", "parameters": {}, "replyTo": REPLIES}
+    client.send_message_batch(QUEUES["IDP"], [
+        {"Id": "0", "MessageBody": json.dumps({"payloadRef": "redis://gone"})},
+        {"Id": "1", "MessageBody": json.dumps(good)},
+    ])
+    worker = SQSStepWorker(client, QUEUES["IDP"], _echo, offload=PayloadOffload(cache), wait_time=0.05)
+    assert await worker.poll_once() == 1
+    assert client.depth(QUEUES["IDP"]) == 1  # only the unreadable message remains
+    assert client.depth(REPLIES) == 1
+
+
+async def test_payload_kept_when_its_message_is_not_deleted():
+    class PartialDeleteClient(MemorySQSClient):
+        def delete_message_batch(self, QueueUrl, Entries):
+            super().delete_message_batch(QueueUrl, Entries[1:])
+            return {
+                "Successful": [{"Id": e["Id"]} for e in Entries[1:]],
+                "Failed": [{"Id": Entries[0]["Id"], "Code": "ReceiptHandleIsInvalid"}],
+            }
+
+    client, cache = PartialDeleteClient(), MemoryCacheBackend()
+    for key in ("k0", "k1"):
+        body = {"correlationId": f"x:b1:{key}", "parameters": {}, "replyTo": REPLIES}
+        cache.setex(f"sqs:payload:{key}", 60, json.dumps(body))
+    client.send_message_batch(QUEUES["IDP"], [
+        {"Id": str(i), "MessageBody": json.dumps({"payloadRef": f"redis://sqs:payload:{key}"})}
+        for i, key in enumerate(("k0", "k1"))
+    ])
+    worker = SQSStepWorker(client, QUEUES["IDP"], _echo, offload=PayloadOffload(cache), wait_time=0.05)
+    assert await worker.poll_once() == 2
+    assert cache.get("sqs:payload:k0") is not None  # still referenced by the undeleted message
+    assert cache.get("sqs:payload:k1") is None
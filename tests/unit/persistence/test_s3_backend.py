@@ -65,3 +65,31 @@ class TestListFiles:
             s3_backend.write(f"bulk/{i:04d}.txt", b"x")
         result = s3_backend.list_files("bulk/")
         assert len(result) == 1050
+
+    def test_delete_removes_object(self, s3_backend):
+        s3_backend.write("prefix/a.csv", b"1")
+        s3_backend.delete("prefix/a.csv")
+        assert s3_backend.list_files("prefix/") == []
+
+
+class TestOpenWrite:
+    def test_small_stream_uses_single_put(self, s3_backend):
+        with s3_backend.open_write("out/small.csv", "text/csv") as writer:
+            writer.write(b"a,b\n")
+            writer.write(b"1,2\n")
+        assert s3_backend.read("out/small.csv") == b"a,b\n1,2\n"
+
+    def test_large_stream_uses_multipart(self, s3_backend):
+        chunk = b"x" * (3 * 1024 * 1024)
+        with s3_backend.open_write("out/large.bin", part_size=1) as writer:
+            for _ in range(4):
+                writer.write(chunk)
+            assert len(writer._parts) == 2  # parts flushed at the 5 MiB minimum
+        assert s3_backend.read("out/large.bin") == chunk * 4
+
+    def test_exception_aborts_upload(self, s3_backend):
+        with pytest.raises(RuntimeError):
+            with s3_backend.open_write("out/failed.csv") as writer:
+                writer.write(b"partial")
+                raise RuntimeError("boom")
+        assert s3_backend.list_files("out/") == []
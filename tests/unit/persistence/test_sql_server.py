@@ -0,0 +1,71 @@
+"""Unit tests for SQLServerClient bulk execution (pyodbc connection mocked)."""
+
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from bluestar.core.exceptions import SQLServerError
+from bluestar.persistence.sql_server import SQLServerClient
+
+SP = "Stata_Save_DepWDDetail"
+
+
+@pytest.fixture
+def conns(monkeypatch):
+    opened: list[MagicMock] = []
+
+    def connect(self):
+        opened.append(MagicMock())
+        return opened[-1]
+
+    monkeypatch.setattr(SQLServerClient, "_connect", connect)
+    return opened
+
+
+def test_execute_sp_many_uses_fast_executemany_in_one_transaction(conns):
+    rows = [{"DepWDDetailID": 1, "TotalAmt": 10}, {"DepWDDetailID": 2, "TotalAmt": 20}]
+    assert SQLServerClient("dsn").execute_sp_many(SP, rows) == 2
+    [conn] = conns
+    cursor = conn.cursor.return_value
+    assert cursor.fast_executemany is True
+    cursor.executemany.assert_called_once_with(
+        "EXEC [dbo].[Stata_Save_DepWDDetail] @DepWDDetailID = ?, @TotalAmt = ?", [(1, 10), (2, 20)]
+    )
+    conn.commit.assert_called_once()
+    conn.close.assert_not_called()
+
+
+def test_connections_are_pooled(conns):
+    client = SQLServerClient("dsn", pool_size=2)
+    client.execute_sp_many(SP, [{"a": 1}])
+    client.execute_sp_many(SP, [{"a": 2}])
+    assert len(conns) == 1
+    client.close()
+    conns[0].close.assert_called_once()
+
+
+def test_execute_sp_many_rolls_back_and_discards_the_connection(conns):
+    client = SQLServerClient("dsn")
+    client.execute_sp_many(SP, [{"a": 1}])
+    conns[0].cursor.return_value.executemany.side_effect = RuntimeError("deadlock")
+    with pytest.raises(SQLServerError):
+        client.execute_sp_many(SP, [{"a": 1}])
+    conns[0].rollback.assert_called_once()
+    conns[0].close.assert_called_once()
+    client.execute_sp_many(SP, [{"a": 1}])
+    assert len(conns) == 2
+
+
+def test_unknown_procedure_is_refused(conns):
+    with pytest.raises(SQLServerError, match="not allowed"):
+        SQLServerClient("dsn").execute_sp_many("x]; DROP TABLE DepWDDetail; --", [{"a": 1}])
+    with pytest.raises(SQLServerError, match="Invalid parameter"):
+        SQLServerClient("dsn").execute_sp_many(SP, [{"a = 1; --": 1}])
+    assert conns == []
+
+
+def test_execute_sp_many_empty_is_a_no_op(conns):
+    assert SQLServerClient("dsn").execute_sp_many(SP, []) == 0
+    assert conns == []
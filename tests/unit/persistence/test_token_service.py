@@ -0,0 +1,66 @@
+"""Unit tests for the batched Token Service client against the local stub server."""
+
+from __future__ import annotations
+
+import httpx
+import pytest
+
+from bluestar.core.exceptions import TokenServiceError
+from bluestar.persistence.token_service import BankDataVault, HTTPTokenService
+from tests.fakes import MemoryTokenService, StubTokenServer
+
+KEYS = [(f"S{i}", "A", "B") for i in range(8)]
+
+
+def test_resolve_single():
+    with StubTokenServer() as server, HTTPTokenService(server.url) as tokens:
+        data = tokens.resolve("S1", "A", "B")
+    assert data["bankacctno"] == "S1AB"
+    assert server.nacha_headers == 1
+
+
+def test_resolve_many_is_concurrent_and_deduplicated():
+    # Every response waits until all eight lookups are in flight together.
+    with StubTokenServer(barrier=8) as server, HTTPTokenService(server.url, max_connections=8) as tokens:
+        vault = tokens.resolve_many(KEYS + KEYS[:3])
+    assert len(vault) == 8 and not vault.failed
+    assert server.requests == 8
+    assert server.peak_concurrency == 8
+    assert vault[("S3", "A", "B")]["bankname"] == "Stub Bank"
+
+
+def test_errors_and_deadline_recorded_as_failures():
+    slow, bad = ("S1", "A", "B"), ("S2", "A", "B")
+    with StubTokenServer(delays={slow: 2}, failures={bad: 503}) as server, HTTPTokenService(server.url) as tokens:
+        vault = tokens.resolve_many(KEYS[:4], deadline=0.5)
+    assert set(vault) == {("S0", "A", "B"), ("S3", "A", "B")}
+    assert "503" in vault.failed[bad]
+    assert slow in vault.failed
+
+
+def test_non_object_response_is_an_error():
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json=["not", "an", "object"]))
+    tokens = HTTPTokenService("http://tokens", client=httpx.Client(base_url="http://tokens", transport=transport))
+    with pytest.raises(TokenServiceError, match="list, not an object"):
+        tokens.resolve("S1", "A", "B")
+
+
+def test_vault_zeroizes_on_exit():
+    vault = BankDataVault()
+    vault.put(("S1", "A", "B"), {"bankacctno": "123456789"})
+    buf = vault._data[("S1", "A", "B")]["bankacctno"]
+    with vault:
+        assert vault[("S1", "A", "B")]["bankacctno"] == "123456789"
+    assert buf == bytearray(9)
+    assert len(vault) == 0 and vault.closed
+    assert "123456789" not in repr(vault)
+    with pytest.raises(TokenServiceError):
+        vault.put(("S1", "A", "B"), {})
+
+
+def test_memory_token_service_matches_protocol_shape():
+    tokens = MemoryTokenService()
+    tokens._bank_data[("S1", "A", "B")] = {"bankaba": "1"}
+    vault = tokens.resolve_many([("S1", "A", "B"), ("S9", "A", "B")])
+    assert vault[("S1", "A", "B")]["bankaba"] == "1"
+    assert list(vault.failed) == [("S9", "A", "B")]
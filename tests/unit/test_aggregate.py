@@ -0,0 +1,33 @@
+"""Tests for the declarative batch aggregation operator."""
+
+from __future__ import annotations
+
+from bluestar.models.aggregate import AggregateSpec, aggregate
+from bluestar.models.payroll_batch import PayrollBatch
+
+
+def _batch():
+    return PayrollBatch({
+        "plan": ["A", "B", "A", "C", "A"],
+        "name": ["x", "y", "z", "w", "v"],
+        "ee": [100, 5, 250, 0, -50],
+        "er": [10, -5, 0, 0, 0],
+    })
+
+
+def test_groups_in_first_seen_order_with_exact_sums():
+    spec = AggregateSpec(group_by=("plan",), first=("name",), outputs={"total": ("ee", "er"), "ee_amt": ("ee",)})
+    out = aggregate(_batch(), spec)
+    assert len(out) == 3
+    assert out.column("plan") == ["A", "B", "C"]
+    assert out.column("name") == ["x", "y", "w"]
+    assert out.column("ee") == [300, 5, 0]
+    assert out.column("total") == [310, 0, 0]
+    assert out.column("ee_amt") == [300, 5, 0]
+
+
+def test_drop_if_zero_uses_source_sums_not_outputs():
+    spec = AggregateSpec(group_by=("plan",), outputs={"total": ("ee", "er")}, drop_if_zero=("ee", "er"))
+    out = aggregate(_batch(), spec)
+    # B nets to zero but has non-zero sources; C is all zero
+    assert out.column("plan") == ["A", "B"]
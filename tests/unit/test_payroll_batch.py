@@ -0,0 +1,59 @@
+"""Tests for the columnar PayrollBatch."""
+
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from bluestar.models.payroll_batch import PayrollBatch, from_cents, mul_cents, to_cents
+from bluestar.models.payroll_record import CanonicalPayrollRecord
+
+
+def test_round_trip_preserves_records():
+    records = [
+        CanonicalPayrollRecord(planid="ACME", ssn="123456789", salary=Decimal("1000.50"), doh=date(2020, 1, 1)),
+        CanonicalPayrollRecord(planid="ACME", ssn="987654321", deferral=Decimal("-12.34")),
+    ]
+    batch = PayrollBatch.from_records(records)
+    assert batch.column("salary") == [100050, 0]
+    assert batch.to_records() == records
+
+
+def test_fixed_point_rounds_half_away_from_zero():
+    assert to_cents(Decimal("1.005")) == 101
+    assert to_cents(Decimal("-1.005")) == -101
+    assert from_cents(-101) == Decimal("-1.01")
+    assert mul_cents(10000, Decimal("0.035")) == 350
+
+
+def test_take_selects_rows_in_order():
+    batch = PayrollBatch({"ssn": ["a", "b", "c"], "salary": [1, 2, 3]})
+    assert batch.take([2, 0]).columns == {"ssn": ["c", "a"], "salary": [3, 1]}
+
+
+def test_add_column_length_checked():
+    batch = PayrollBatch({"ssn": ["a", "b"]})
+    with pytest.raises(ValueError):
+        batch.add_column("sefaid1", ["x"])
+
+
+def test_select_is_lazy_and_composes():
+    batch = PayrollBatch({"ssn": ["a", "b", "c", "d"], "salary": [1, 2, 3, 4]})
+    salary = batch.raw_column("salary")
+    assert batch.select([True, False, True, True]) == 1
+    assert batch.select([True, True, False, True]) == 1
+    assert len(batch) == 2
+    assert batch.selection == [0, 3]
+    assert batch.raw_column("salary") is salary  # no copy until dense access
+
+    assert batch.column("ssn") == ["a", "d"]
+    assert batch.selection is None
+    assert batch.physical_length == 2
+
+
+def test_select_mask_length_checked():
+    batch = PayrollBatch({"ssn": ["a", "b"]})
+    with pytest.raises(ValueError):
+        batch.select([True])